@@ -0,0 +1,335 @@
+"""Micro-benchmarks des noyaux de calcul (sans Streamlit).
+
+    python benchmarks/bench_noyaux.py                 # mesure et compare à la référence
+    python benchmarks/bench_noyaux.py --enregistrer   # (ré)écrit la référence
+    python benchmarks/bench_noyaux.py -k theis --max-taille 100000
+
+Chaque noyau est exécuté sur des jeux synthétiques de taille croissante ; on
+retient le meilleur temps, le débit (éléments/s) et le pic d'allocation
+(tracemalloc). Un débit inférieur à la référence de plus de --tolerance est
+signalé comme régression (code de sortie 1).
+
+La référence dépend de la machine et n'est pas versionnée : on l'enregistre
+une fois sur la machine de mesure (ou l'agent d'intégration continue), avec
+--enregistrer, et on la régénère après un changement de matériel ou de
+versions de numpy / scipy. Sans référence, ou si un noyau mesuré n'y figure
+pas, le script échoue (code de sortie 2) sauf avec --sans-reference.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+import pandas as pd
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+import calcul_I_exploration_eaux_souterraines as c_I  # noqa: E402
+import calcul_II_1_techniques_de_forage as c_II_1  # noqa: E402
+import calcul_II_2_technique_de_forage_facturation as c_II_2  # noqa: E402
+import calcul_III_equipement_et_mise_en_production as c_III  # noqa: E402
+import calcul_IV_1_1_essais_par_paliers as c_IV_1_1  # noqa: E402
+import calcul_IV_1_2_essais_longue_duree as c_IV_1_2  # noqa: E402
+import calcul_IV_2_regime_permanent as c_IV_2  # noqa: E402
+
+REFERENCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reference.json")
+POINTS = [10, 1_000, 100_000, 1_000_000]
+PUITS = [1, 100, 10_000]
+DUREE_MIN = 0.2
+
+rng = np.random.default_rng(0)
+# Les ajustements sur données bruitées émettent des avertissements numériques attendus
+warnings.simplefilter("ignore", RuntimeWarning)
+
+
+# === Jeux synthétiques ===
+def _paliers(n_puits, n_paliers=8):
+    Q = np.tile(np.linspace(10, 100, n_paliers), n_puits)
+    a = np.repeat(rng.uniform(0.01, 0.1, n_puits), n_paliers)
+    b = np.repeat(rng.uniform(1e-4, 1e-3, n_puits), n_paliers)
+    s = a * Q + b * Q**2 + rng.normal(0, 0.01, Q.size)
+    return pd.DataFrame({"well_id": np.repeat(np.arange(n_puits), n_paliers), "Q": Q, "s": s,
+                         "t": np.tile(np.arange(n_paliers) * 60.0, n_puits)})
+
+def _pompage(n):
+    t = np.geomspace(1 / 60, 72, n)
+    return t, c_IV_1_2.theis(200, t, 110, 250, 1e-4) + rng.normal(0, 0.005, n)
+
+def _sites(n):
+    d = c_II_1.DEFAUTS
+    return pd.DataFrame({
+        "profondeur": rng.uniform(5, 200, n),
+        "type_sol": rng.choice(['sable', 'limon', 'argile', 'grès', 'roche dure'], n),
+        "debit": rng.uniform(1, 400, n),
+        "qualite_eau": rng.choice(['claire', 'chargée en sable'], n),
+        "stabilite_terrain": rng.choice(['stable', 'instable'], n),
+        "environnement": rng.choice(['urbain', 'rural'], n),
+        "hauteur_manometrique": rng.uniform(10, 200, n), "rendement": d["rendement"],
+        "region": rng.choice(list(c_II_1.dispo), n),
+        "type_tube": rng.choice(list(c_II_1.ALPHA_TUBES), n),
+        "epaisseur": rng.uniform(2, 20, n), "diametre": rng.uniform(50, 500, n),
+    })
+
+def _campagne(n):
+    return pd.DataFrame({"well_id": np.arange(n), "region": rng.choice(list(c_II_2.region_tarifs), n),
+                         "profondeur": rng.uniform(30, 200, n)})
+
+
+# === Catalogue : nom -> (tailles, préparation(n) -> fonction sans argument) ===
+def _ajustements_a_froid(modele, n):
+    # Le cache des ajustements est vidé à chaque passage : on mesure curve_fit
+    df = _paliers(n)
+    series = [(g["Q"].to_numpy(), g["s"].to_numpy()) for _, g in df.groupby("well_id")]
+    def lancer():
+        c_IV_1_1.vider_cache()
+        return [modele(Q, s) for Q, s in series]
+    return lancer
+
+def _bench_rorabaugh(n):
+    return _ajustements_a_froid(c_IV_1_1.rorabaugh, n)
+
+def _bench_gosselin(n):
+    return _ajustements_a_froid(c_IV_1_1.gosselin, n)
+
+def _bench_paliers_lot(n):
+    df = _paliers(n)
+    return lambda: c_IV_1_1.interpreter_lot(df, non_lineaire=False)
+
+def _bench_jacob(n):
+    t, s = _pompage(n)
+    return lambda: c_IV_1_2.jacob(200, t, s, 110)
+
+def _bench_theis_W(n):
+    u = np.geomspace(1e-10, 30, n)
+    return lambda: c_IV_1_2.theis_W(u)
+
+def _bench_ajuster_theis(n):
+    t, s = _pompage(n)
+    return lambda: c_IV_1_2.ajuster_theis(200, t, s, 110)
+
+def _bench_hantush_W(n):
+    u, beta = np.geomspace(1e-10, 30, n), rng.uniform(0.01, 2, n)
+    return lambda: c_IV_1_2.hantush_W(u, beta)
+
+def _bench_boulton(n):
+    t = np.geomspace(1 / 60, 72, n)
+    vrai = {"T": 300, "S": 1e-3, "Sy": 0.1, "r/B": 0.2}
+    s = c_IV_1_2.rabattement_transitoire("Boulton (débit retardé)", 200, t, 30, vrai) + rng.normal(0, 0.005, n)
+    return lambda: c_IV_1_2.ajuster_modele("Boulton (débit retardé)", 200, t, s, 30)
+
+def _bench_decimer_log(n):
+    t, s = _pompage(n)
+    return lambda: c_IV_1_2.decimer_log(t, s)
+
+def _bench_derivee_bourdet(n):
+    t, s = _pompage(n)
+    return lambda: c_IV_1_2.derivee_bourdet(t, s, 0.2)
+
+def _bench_regimes(n):
+    t, s = _pompage(n)
+    t, _, ds = c_IV_1_2.derivee_bourdet(t, s, 0.2)
+    return lambda: c_IV_1_2.detecter_regimes(t, ds, 200)
+
+def _bench_bootstrap_paliers(n):
+    Q = np.linspace(10, 100, 10)
+    s = 0.06 * Q + 6e-4 * Q**2 + rng.normal(0, 0.05, 10)
+    return lambda: c_IV_1_1.bootstrap_paliers(Q, s, 20.0, "libre", n, n_workers=1)
+
+def _bench_bootstrap_essai(n):
+    t = np.geomspace(0.02, 48, 2000)
+    s = c_IV_1_2.theis(100, t, 30, 250, 2e-4) + rng.normal(0, 0.02, len(t))
+    return lambda: c_IV_1_2.bootstrap_essai("Nappe captive", 100, t, s, 30, n_tirages=n, n_workers=1)
+
+def _bench_thiem(n):
+    r = rng.uniform(0.1, 500, n)
+    return lambda: c_IV_2.thiem(100, 500, r, 1000)
+
+def _bench_de_glee(n):
+    r = rng.uniform(0.1, 500, n)
+    return lambda: c_IV_2.de_glee(100, 500, r, 800)
+
+def _bench_dietz(n):
+    r = rng.uniform(0.1, 500, n)
+    return lambda: c_IV_2.dietz(100, 500, r, 200)
+
+def _bench_champ(n):
+    puits = rng.uniform(0, 2000, (n, 2))
+    Q = np.full(n, 50.0)
+    return lambda: c_IV_2.grille_rabattement(puits, Q, 500, (0, 2000, 0, 2000), (100, 100), R=3000.0)
+
+def _bench_optimisation(n):
+    # Matrice d'influence en cache : on mesure la résolution pour une nouvelle cible
+    puits = pd.DataFrame({"x": rng.uniform(0, 5000, n), "y": rng.uniform(0, 5000, n), "s_max": 8.0,
+                          "puissance_kW": 15.0, "hmt": 60.0, "rendement": 0.7})
+    c_IV_2.optimiser_champ(puits, 500.0, R=1500.0)
+    return lambda: c_IV_2.optimiser_champ(puits, 500.0, R=1500.0, budget_kW=5.0 * n)
+
+def _bench_monte_carlo(n):
+    lois = {"Q": ("Normale", 100, 10), "T": ("Lognormale", 500, 0.5),
+            "r1": ("Fixe", 0.2, 0), "R": ("Uniforme", 300, 800)}
+    return lambda: c_IV_2.monte_carlo_contexte("Nappe captive sans réalimentation", lois, n,
+                                               graine=0, n_workers=1)
+
+def _bench_ves_direct(n):
+    rho, h = rng.uniform(1, 1000, (n, 4)), rng.uniform(1, 50, (n, 3))
+    espacements = np.geomspace(1, 1000, 30)
+    return lambda: c_I.resistivite_apparente(rho, h, espacements)
+
+def _bench_ves_inversion(n):
+    espacements = np.geomspace(1, 300, 20)
+    sondages = {i: (espacements, c_I.resistivite_apparente(rng.uniform([10, 5, 100], [300, 50, 1000]),
+                                                           rng.uniform([1, 5], [5, 20]), espacements))
+                for i in range(n)}
+    return lambda: c_I.inverser_lot(sondages, 3, n_departs=1, n_workers=1)
+
+def _bench_puissance(n):
+    debit, hmt = rng.uniform(1, 400, n), rng.uniform(10, 200, n)
+    return lambda: c_II_1.puissance_pompe(debit, hmt, 0.65)
+
+def _bench_ecrasement(n):
+    tubes = rng.choice(list(c_II_1.ALPHA_TUBES), n)
+    e, D = rng.uniform(2, 20, n), rng.uniform(50, 500, n)
+    return lambda: c_II_1.pression_ecrasement(tubes, e, D)
+
+def _bench_recommandations(n):
+    sites = _sites(n)
+    return lambda: c_II_1.recommander_lot(sites)
+
+def _bench_programme(n):
+    # 4 intervalles par forage : tube cimenté, tube, crépine, tube de décantation
+    forages = np.repeat([f"F{i}" for i in range(n)], 4)
+    bornes = np.cumsum(rng.uniform(5, 30, (n, 4)), axis=1)
+    de = np.c_[np.zeros(n), bornes[:, :3]].ravel()
+    programme = pd.DataFrame({"forage": forages, "de": de, "a": bornes.ravel(),
+                              "element": np.tile(["tube", "tube", "crepine", "tube"], n),
+                              "D_tube_pouce": np.tile([8.0, 6.0, 6.0, 6.0], n), "D_trou_pouce": 12.0,
+                              "annulaire": np.tile(["ciment", "aucun", "gravier", "gravier"], n)})
+    return lambda: c_III.conception_lot(programme)
+
+def _bench_campagne(n):
+    puits = _campagne(n)
+    return lambda: c_II_2.simuler_campagne(puits, n_scenarios=10_000, n_foreuses=10, graine=0)
+
+CATALOGUE = {
+    "IV.1.1 rorabaugh (puits)": ([1, 10, 100], _bench_rorabaugh),
+    "IV.1.1 gosselin (puits)": ([1, 10, 100], _bench_gosselin),
+    "IV.1.1 interpreter_lot quadratique (puits)": (PUITS, _bench_paliers_lot),
+    "IV.1.2 jacob (points)": (POINTS, _bench_jacob),
+    "IV.1.2 theis_W (points)": (POINTS, _bench_theis_W),
+    "IV.1.2 ajuster_theis (points)": (POINTS[:-1], _bench_ajuster_theis),
+    "IV.1.2 decimer_log (points)": (POINTS, _bench_decimer_log),
+    "IV.1.2 hantush_W (points)": (POINTS, _bench_hantush_W),
+    "IV.1.2 derivee_bourdet (points)": (POINTS, _bench_derivee_bourdet),
+    "IV.1.2 detecter_regimes (points)": (POINTS, _bench_regimes),
+    "IV.1.2 ajuster_modele Boulton (points)": (POINTS[:-1], _bench_boulton),
+    "IV.1.1 bootstrap_paliers (tirages)": ([100, 1_000, 5_000], _bench_bootstrap_paliers),
+    "IV.1.2 bootstrap_essai captive (tirages)": ([100, 1_000, 5_000], _bench_bootstrap_essai),
+    "IV.2 thiem (points)": (POINTS, _bench_thiem),
+    "IV.2 de_glee (points)": (POINTS, _bench_de_glee),
+    "IV.2 dietz (points)": (POINTS, _bench_dietz),
+    "IV.2 champ 100x100 (puits)": ([1, 100, 1_000], _bench_champ),
+    "IV.2 optimiser_champ (puits)": ([10, 100, 500], _bench_optimisation),
+    "IV.2 monte_carlo_contexte (tirages)": (POINTS, _bench_monte_carlo),
+    "I resistivite_apparente 4 couches x 30 espacements (modèles)": ([1, 100, 10_000], _bench_ves_direct),
+    "I inverser_lot 3 couches (sondages)": ([1, 10, 100], _bench_ves_inversion),
+    "II.1 puissance_pompe (puits)": (POINTS, _bench_puissance),
+    "II.1 pression_ecrasement (puits)": (POINTS, _bench_ecrasement),
+    "II.1 recommander_lot (puits)": (PUITS, _bench_recommandations),
+    "II.2 simuler_campagne (puits)": (PUITS, _bench_campagne),
+    "III conception_lot (forages)": (PUITS, _bench_programme),
+}
+
+
+# === Mesure ===
+def mesurer(fonction, duree_min=DUREE_MIN):
+    fonction()  # échauffement (caches, tables)
+    meilleur, total, repetitions = np.inf, 0.0, 0
+    while total < duree_min or repetitions < 3:
+        debut = time.perf_counter()
+        fonction()
+        ecoule = time.perf_counter() - debut
+        meilleur, total, repetitions = min(meilleur, ecoule), total + ecoule, repetitions + 1
+    tracemalloc.start()
+    fonction()
+    pic = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return meilleur, pic
+
+def executer(filtre=None, max_taille=None):
+    resultats = {}
+    for nom, (tailles, preparer) in CATALOGUE.items():
+        if filtre and filtre.lower() not in nom.lower():
+            continue
+        for n in tailles:
+            if max_taille and n > max_taille:
+                continue
+            temps, pic = mesurer(preparer(n))
+            cle = f"{nom}[{n}]"
+            resultats[cle] = {"taille": n, "temps_s": temps, "debit_par_s": n / temps,
+                              "pic_memoire_octets": pic}
+            print(f"{cle:60s} {temps * 1e3:10.3f} ms {n / temps:14.1f} /s {pic / 1024**2:9.2f} Mo")
+    return resultats
+
+def comparer(resultats, reference, tolerance):
+    regressions = []
+    for cle, r in resultats.items():
+        ref = reference.get(cle)
+        if ref and r["debit_par_s"] < ref["debit_par_s"] * (1 - tolerance):
+            regressions.append((cle, ref["debit_par_s"], r["debit_par_s"]))
+    return regressions
+
+def environnement():
+    return {"python": platform.python_version(), "numpy": np.__version__,
+            "machine": platform.machine(), "processeur": platform.processor(),
+            "coeurs": os.cpu_count()}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmarks des noyaux SoufiLab")
+    parser.add_argument("-k", "--filtre", help="ne lancer que les noyaux dont le nom contient ce texte")
+    parser.add_argument("--max-taille", type=int, help="taille maximale des jeux de données")
+    parser.add_argument("--reference", default=REFERENCE, help="fichier JSON de référence")
+    parser.add_argument("--enregistrer", action="store_true", help="écrire les mesures comme référence")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="baisse de débit tolérée avant de signaler une régression (0.25 = 25 %%)")
+    parser.add_argument("--sans-reference", action="store_true",
+                        help="mesurer sans échouer si la référence manque (pas de comparaison)")
+    args = parser.parse_args(argv)
+
+    resultats = executer(args.filtre, args.max_taille)
+
+    if args.enregistrer:
+        reference = {}
+        if os.path.exists(args.reference):
+            with open(args.reference, encoding="utf-8") as f:
+                reference = json.load(f).get("resultats", {})
+        reference.update(resultats)
+        with open(args.reference, "w", encoding="utf-8") as f:
+            json.dump({"environnement": environnement(), "resultats": reference}, f, indent=2, ensure_ascii=False)
+        print(f"Référence écrite : {args.reference}")
+        return 0
+
+    if not os.path.exists(args.reference):
+        print(f"Pas de référence ({args.reference}) : relancer avec --enregistrer pour en créer une.")
+        return 0 if args.sans_reference else 2
+    with open(args.reference, encoding="utf-8") as f:
+        reference = json.load(f)
+    absents = [cle for cle in resultats if cle not in reference["resultats"]]
+    for cle in absents:
+        print(f"SANS RÉFÉRENCE {cle}")
+    regressions = comparer(resultats, reference["resultats"], args.tolerance)
+    for cle, avant, apres in regressions:
+        print(f"RÉGRESSION {cle} : {avant:.1f} /s → {apres:.1f} /s ({apres / avant - 1:+.0%})")
+    if regressions:
+        return 1
+    print("Aucune régression par rapport à la référence.")
+    return 2 if absents and not args.sans_reference else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
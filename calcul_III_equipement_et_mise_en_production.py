@@ -0,0 +1,179 @@
+import numpy as np
+import pandas as pd
+
+# === Calculs d'équipement et de mise en production (sans Streamlit) ===
+# Formules de la section III, vectorisées : un scalaire pour le formulaire,
+# des colonnes entières pour le traitement par lot.
+
+# Valeurs par défaut du formulaire, utilisées pour les colonnes absentes d'un lot
+DEFAUTS = {
+    "tube_diametre_mm": 150.0, "hauteur_crepine": 6.0, "coeff_ouverture": 20.0,
+    "D_trou_pouce": 8.0, "D_tube_pouce": 6.0, "hauteur_gravier": 10.0,
+    "eau_L": 50.0, "ciment_kg": 100.0,
+}
+
+
+def debit_crepine(tube_diametre_mm, hauteur_crepine, coeff_ouverture):
+    # q = 3,4 · φ · C (m³/h par mètre de crépine), C en %
+    phi = np.asarray(tube_diametre_mm, dtype=float) / 1000
+    q = 3.4 * phi * np.asarray(coeff_ouverture, dtype=float) / 100
+    return q, q * hauteur_crepine
+
+def volume_gravier(D_trou_pouce, D_tube_pouce, hauteur_gravier):
+    # Volume théorique en litres, diamètres en pouces
+    D, d = np.asarray(D_trou_pouce, dtype=float), np.asarray(D_tube_pouce, dtype=float)
+    return 0.28 * hauteur_gravier * (D**2 - d**2)
+
+def volume_laitier(eau_L, ciment_kg):
+    return np.asarray(eau_L, dtype=float) + np.asarray(ciment_kg, dtype=float) * 0.25
+
+def equipement_lot(forages):
+    # Une ligne par forage, colonnes de DEFAUTS (valeurs par défaut si absentes)
+    p = {c: (forages[c].to_numpy(dtype=float) if c in forages else np.full(len(forages), v))
+         for c, v in DEFAUTS.items()}
+    q, debit_total = debit_crepine(p["tube_diametre_mm"], p["hauteur_crepine"], p["coeff_ouverture"])
+    return pd.DataFrame({
+        "debit_crepine_m3h_m": q, "debit_crepine_m3h": debit_total,
+        "volume_gravier_L": volume_gravier(p["D_trou_pouce"], p["D_tube_pouce"], p["hauteur_gravier"]),
+        "volume_laitier_L": volume_laitier(p["eau_L"], p["ciment_kg"]),
+    }, index=forages.index)
+
+# === Programme d'équipement (plusieurs forages, table d'intervalles) ===
+# Une ligne par intervalle de la colonne : forage, de / a (m de profondeur),
+# element (tube plein ou crépine), D_tube_pouce, et au besoin D_trou_pouce,
+# coeff_ouverture (crépines), annulaire (remplissage de l'espace annulaire sur
+# l'intervalle) et Q_conception (m³/h). Tous les intervalles de tous les
+# forages sont calculés en un seul passage, puis sommés par forage (bincount)
+# et par article pour le bordereau des fournitures.
+COLONNES_PROGRAMME = ["forage", "de", "a", "element", "D_tube_pouce"]
+ELEMENTS = ["tube", "crepine"]
+REMPLISSAGES = ["gravier", "ciment", "aucun"]
+CRITERES_DEBIT = ["Qmax", "Qc", "min(Qc, Qmax)"]
+
+RAPPORT_EAU_CIMENT = 0.5           # L d'eau par kg de ciment
+SAC_CIMENT_KG = 50.0
+DENSITE_GRAVIER = 1.6              # t/m³, gravier en vrac
+LONGUEUR_ELEMENT = 6.0             # m, longueur commerciale d'un tube ou d'une crépine
+MAJORATIONS = {"gravier": 1.2, "ciment": 1.3}   # pertes et cavages, volumes commandés
+
+
+def preparer_programme(programme):
+    manquantes = [c for c in COLONNES_PROGRAMME if c not in programme]
+    if manquantes:
+        raise ValueError(f"Colonnes manquantes : {', '.join(manquantes)}")
+    p = programme.dropna(subset=COLONNES_PROGRAMME).copy()
+    p["element"] = p["element"].str.strip().str.lower().str.replace("é", "e")
+    inconnus = sorted(set(p["element"]) - set(ELEMENTS))
+    if inconnus:
+        raise ValueError(f"Éléments inconnus : {inconnus} (attendus : {', '.join(ELEMENTS)})")
+    if "D_trou_pouce" not in p:
+        p["D_trou_pouce"] = DEFAUTS["D_trou_pouce"]
+    if "coeff_ouverture" not in p:
+        p["coeff_ouverture"] = DEFAUTS["coeff_ouverture"]
+    # Par défaut : massif de gravier au droit des crépines, rien ailleurs
+    defaut = np.where(p["element"] == "crepine", "gravier", "aucun")
+    p["annulaire"] = p["annulaire"].fillna(pd.Series(defaut, index=p.index)) if "annulaire" in p else defaut
+    p["annulaire"] = p["annulaire"].str.strip().str.lower()
+    inconnus = sorted(set(p["annulaire"]) - set(REMPLISSAGES))
+    if inconnus:
+        raise ValueError(f"Remplissages inconnus : {inconnus} (attendus : {', '.join(REMPLISSAGES)})")
+
+    # Identifiants en texte : même ordre pour le tri des lignes et pour factorize
+    p["forage"] = p["forage"].astype(str)
+    p = p.sort_values(["forage", "de"], kind="stable").reset_index(drop=True)
+    de, a = p["de"].to_numpy(dtype=float), p["a"].to_numpy(dtype=float)
+    meme = p["forage"].to_numpy()[1:] == p["forage"].to_numpy()[:-1]
+    erreurs = {
+        "intervalles vides ou inversés (a ≤ de)": p["forage"][a <= de],
+        "colonne discontinue (chevauchement ou lacune)": p["forage"][1:][meme & (np.abs(de[1:] - a[:-1]) > 1e-6)],
+        "Ø trou ≤ Ø tube avec remplissage": p["forage"][(p["annulaire"] != "aucun")
+                                                       & (p["D_trou_pouce"] <= p["D_tube_pouce"])],
+    }
+    for message, forages in erreurs.items():
+        if len(forages):
+            raise ValueError(f"{message} : {sorted(set(forages))[:10]}")
+    return p
+
+def debits_conception(resultats, critere="Qmax"):
+    # Débit de conception par forage à partir des résultats de IV.1.1
+    # (interpreter_lot : well_id, Qc, Qmax)
+    if critere == "min(Qc, Qmax)":
+        Q = np.minimum(resultats["Qc"], resultats["Qmax"])
+    else:
+        Q = resultats[critere]
+    return pd.Series(np.asarray(Q, dtype=float), index=resultats["well_id"].astype(str), name="Q_conception")
+
+def conception_lot(programme, debits=None, rapport_eau_ciment=RAPPORT_EAU_CIMENT, majorations=MAJORATIONS,
+                   longueur_element=LONGUEUR_ELEMENT):
+    # Retourne (une ligne par forage, bordereau des fournitures de la campagne)
+    p = preparer_programme(programme)
+    codes, forages = pd.factorize(p["forage"], sort=True)
+    n = len(forages)
+    h = (p["a"] - p["de"]).to_numpy(dtype=float)
+    d_tube = p["D_tube_pouce"].to_numpy(dtype=float)
+    crepine = (p["element"] == "crepine").to_numpy()
+    annulaire = p["annulaire"].to_numpy()
+
+    q_metre, _ = debit_crepine(25.4 * d_tube, h, p["coeff_ouverture"].to_numpy(dtype=float))
+    V_annulaire = volume_gravier(p["D_trou_pouce"].to_numpy(dtype=float), d_tube, h)
+    par_forage = lambda poids: np.bincount(codes, weights=poids, minlength=n)
+
+    capacite = par_forage(np.where(crepine, q_metre * h, 0.0))
+    gravier_L = par_forage(np.where(annulaire == "gravier", V_annulaire, 0.0))
+    laitier_L = par_forage(np.where(annulaire == "ciment", V_annulaire, 0.0))
+    ciment_kg = laitier_L / volume_laitier(rapport_eau_ciment, 1.0)
+    changements = (d_tube[1:] != d_tube[:-1]) & (codes[1:] == codes[:-1])
+
+    Q = np.full(n, np.nan)
+    if debits is not None:
+        Q = pd.Series(debits).reindex(forages).to_numpy(dtype=float)
+    elif "Q_conception" in p:
+        Q = p.groupby(codes)["Q_conception"].first().to_numpy(dtype=float)
+    ratio = capacite / Q
+    verdict = np.where(np.isnan(ratio), "-", np.where(ratio >= 1, "suffisante", "insuffisante"))
+
+    resultats = pd.DataFrame({
+        "forage": forages,
+        "profondeur_m": p.groupby(codes)["a"].max().to_numpy(dtype=float),
+        "tube_m": par_forage(np.where(crepine, 0.0, h)),
+        "crepine_m": par_forage(np.where(crepine, h, 0.0)),
+        "reductions": np.bincount(codes[1:][changements], minlength=n),
+        "capacite_crepine_m3h": capacite, "Q_conception_m3h": Q,
+        "capacite_sur_Q": ratio, "crepine": verdict,
+        "gravier_L": gravier_L, "laitier_L": laitier_L,
+        "ciment_kg": ciment_kg, "eau_L": ciment_kg * rapport_eau_ciment,
+    })
+    return resultats, bordereau(p, codes, resultats, majorations, longueur_element)
+
+def bordereau(p, codes, resultats, majorations=MAJORATIONS, longueur_element=LONGUEUR_ELEMENT):
+    # Tubes et crépines par diamètre (et ouverture) : longueur totale et nombre
+    # d'éléments, arrondi au forage (un élément entamé est un élément commandé)
+    articles = pd.DataFrame({
+        "code": codes, "element": p["element"], "D_tube_pouce": p["D_tube_pouce"],
+        "ouverture": np.where(p["element"] == "crepine", p["coeff_ouverture"], np.nan),
+        "longueur": p["a"] - p["de"],
+    })
+    par_forage = articles.groupby(["element", "D_tube_pouce", "ouverture", "code"], dropna=False)["longueur"].sum()
+    par_article = pd.DataFrame({
+        "theorique": par_forage.groupby(level=[0, 1, 2], dropna=False).sum(),
+        "elements": np.ceil(par_forage / longueur_element - 1e-9).groupby(level=[0, 1, 2], dropna=False).sum(),
+    })
+    lignes = []
+    for (element, diametre, ouverture), ligne in par_article.iterrows():
+        nom = f"Tube plein {diametre:g}\"" if element == "tube" else f"Crépine {diametre:g}\" (C = {ouverture:g} %)"
+        lignes.append((nom, ligne["theorique"], ligne["elements"] * longueur_element, "m"))
+        lignes.append((f"{nom}, éléments de {longueur_element:g} m", ligne["elements"], ligne["elements"], "u"))
+
+    gravier_m3 = resultats["gravier_L"].sum() / 1000
+    ciment_kg = resultats["ciment_kg"].sum()
+    eau_m3 = resultats["eau_L"].sum() / 1000
+    lignes += [
+        ("Réductions de diamètre", resultats["reductions"].sum(), resultats["reductions"].sum(), "u"),
+        ("Gravier filtrant", gravier_m3, gravier_m3 * majorations["gravier"], "m³"),
+        ("Gravier filtrant", gravier_m3 * DENSITE_GRAVIER, gravier_m3 * majorations["gravier"] * DENSITE_GRAVIER, "t"),
+        ("Ciment", ciment_kg, ciment_kg * majorations["ciment"], "kg"),
+        ("Ciment, sacs de {:g} kg".format(SAC_CIMENT_KG), ciment_kg / SAC_CIMENT_KG,
+         np.ceil(ciment_kg * majorations["ciment"] / SAC_CIMENT_KG - 1e-9), "u"),
+        ("Eau de gâchage", eau_m3, eau_m3 * majorations["ciment"], "m³"),
+    ]
+    return pd.DataFrame(lignes, columns=["article", "quantite_theorique", "quantite_commandee", "unite"])
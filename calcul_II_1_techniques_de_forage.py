@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+
+# === Calculs des techniques de forage (sans Streamlit) ===
+
+# === TABLEAU DE RÉFÉRENCE DES DIAMÈTRES ===
+table_diametres = [
+    (10,  "3½ à 2", "5 à 6", "6", "8", "9⅝"),
+    (30,  "2½ à 3", "6", "6 à 8", "9⅝", "10¾"),
+    (50,  "3½ à 4", "8", "8", "9⅝", "10¾"),
+    (100, "5 à 6", "9⅞ à 10", "8", "9⅝", "10¾"),
+    (200, "7 à 8", "13 à 13⅞", "12", "14", "16"),
+    (400, "9½ à 11", "18", "13", "16", "20"),
+]
+
+dispo = {
+    "Zone sahélienne": "Tarière manuelle, pompe à corde, motopompe diesel",
+    "Forêt tropicale": "Rotary hydraulique, pompe submersible, tube PVC renforcé",
+    "Montagne rocheuse": "Marteau fond de trou, forage à air comprimé, crépine en acier",
+    "Périphérie urbaine": "Forage motorisé sur camion, tubes acier, pompes électriques immergées"
+}
+
+METHODES = [
+    "Tarière manuelle ou battage léger",
+    "Marteau fond de trou à l’air",
+    "Forage rotary avec crépine filtrante et gravier",
+    "Forage rotary avec boue stabilisante",
+]
+
+SOLS_MEUBLES = ['sable', 'limon', 'argile']
+SOLS_ROCHEUX = ['grès', 'calcaire', 'basalte', 'roche dure']
+SOLS_PRETUBAGE = ['sable', 'limon']
+ENVIRONNEMENTS_CONTRAINTS = ['urbain', 'zone exiguë']
+
+# Valeurs par défaut du formulaire, utilisées pour les colonnes absentes d'un lot
+DEFAUTS = {
+    "profondeur": 30.0, "type_sol": "sable", "niveau_eau": 10.0,
+    "usage": "Reconnaissance (piezométrie)", "debit": 10.0, "qualite_eau": "claire",
+    "stabilite_terrain": "stable", "environnement": "urbain",
+    "hauteur_manometrique": 40.0, "rendement": 0.65, "region": "Zone sahélienne",
+    "type_tube": "PVC", "epaisseur": 10.0, "diametre": 150.0,
+}
+
+ALPHA_TUBES = {
+    "PVC": (26000, False),
+    "Acier - terrain consolidé": (2.5e6, True),
+    "Acier - terrain non consolidé": (1.5e6, True),
+}
+
+
+def puissance_pompe(debit, hauteur_manometrique, rendement):
+    Q = np.asarray(debit, dtype=float) / 3600
+    puissance = (1000 * 9.81 * Q * hauteur_manometrique) / rendement
+    return puissance, puissance / 735.5
+
+def pression_ecrasement(type_tube, epaisseur, diametre):
+    # α selon le tube (acier : seulement si D/e > 50), NaN si non applicable
+    type_tube = pd.Series(np.asarray(type_tube, dtype=object).reshape(-1))
+    epaisseur = np.asarray(epaisseur, dtype=float).reshape(-1)
+    diametre = np.asarray(diametre, dtype=float).reshape(-1)
+    alpha = type_tube.map({k: v[0] for k, v in ALPHA_TUBES.items()}).to_numpy(dtype=float)
+    elance = type_tube.map({k: v[1] for k, v in ALPHA_TUBES.items()}).fillna(False).to_numpy(dtype=bool)
+    alpha = np.where(elance & ~(diametre / epaisseur > 50), np.nan, alpha)
+    return alpha, alpha * (epaisseur / diametre) ** 3
+
+# === Moteur de recommandation par lot ===
+def recommander_lot(sites):
+    manquantes = {c: v for c, v in DEFAUTS.items() if c not in sites.columns}
+    sites = sites.assign(**manquantes)
+    profondeur = sites["profondeur"].to_numpy(dtype=float)
+    debit = sites["debit"].to_numpy(dtype=float)
+    sol = sites["type_sol"]
+
+    # --- MÉTHODE DE FORAGE (mêmes règles, dans le même ordre) ---
+    choix = np.select(
+        [(profondeur < 30) & sol.isin(SOLS_MEUBLES).to_numpy() & (debit < 5),
+         sol.isin(SOLS_ROCHEUX).to_numpy(),
+         (sites["qualite_eau"] == 'chargée en sable').to_numpy()],
+        [0, 1, 2], default=3)
+
+    # --- PRÉTUBAGE ---
+    pretubage = ((sites["stabilite_terrain"] == 'instable') | sol.isin(SOLS_PRETUBAGE)).to_numpy()
+
+    # --- DIAMÈTRES : première ligne dont le seuil est ≥ débit ---
+    seuils = np.array([ligne[0] for ligne in table_diametres], dtype=float)
+    i = np.searchsorted(seuils, debit, side="left")
+    hors_table = i >= len(seuils)
+    i = np.minimum(i, len(seuils) - 1)
+    diametres = np.array([ligne[1:] for ligne in table_diametres], dtype=object)[i]
+    diametres[hors_table] = None
+
+    # --- PUISSANCE ---
+    puissance, puissance_cv = puissance_pompe(
+        debit, sites["hauteur_manometrique"].to_numpy(dtype=float), sites["rendement"].to_numpy(dtype=float))
+
+    # --- ÉCRASEMENT ---
+    alpha, P = pression_ecrasement(sites["type_tube"], sites["epaisseur"], sites["diametre"])
+
+    return pd.DataFrame({
+        "methode": np.array(METHODES, dtype=object)[choix],
+        "pretubage": pretubage,
+        "seuil_debit": np.where(hors_table, np.nan, seuils[i]),
+        "crepine": diametres[:, 0], "forage": diametres[:, 1], "pompe": diametres[:, 2],
+        "tubage": diametres[:, 3], "forage_final": diametres[:, 4],
+        "puissance_W": puissance, "puissance_CV": puissance_cv,
+        "alpha": alpha, "pression_ecrasement_kg_cm2": P,
+        "materiel": sites["region"].map(dispo).to_numpy(),
+        "materiel_compact": sites["environnement"].isin(ENVIRONNEMENTS_CONTRAINTS).to_numpy(),
+    }, index=sites.index)
@@ -0,0 +1,143 @@
+import heapq
+
+import numpy as np
+import pandas as pd
+
+from taches import rapporter
+
+# === Calculs de facturation et de planning (sans Streamlit) ===
+
+region_tarifs = {
+    "Zone sahélienne": 90,
+    "Forêt tropicale": 130,
+    "Montagne rocheuse": 170,
+    "Périphérie urbaine": 150
+}
+
+PERCENTILES = [10, 50, 90]
+COLONNES_CAMPAGNE = ["well_id", "region", "profondeur"]
+SCENARIOS_REPLANIFIES = 2000          # au plus, planning refait scénario par scénario
+ELEMENTS_REPLANIFICATION = 20_000_000 # budget puits × foreuses × scénarios replanifiés
+SCENARIOS_REPLANIFIES_MIN = 200
+
+
+def planifier(durees, n_foreuses, priorite=None):
+    # Ordonnancement par liste : les puits, dans l'ordre de priorité, sont
+    # confiés à la foreuse qui se libère la première (file de priorité).
+    durees = np.asarray(durees, dtype=float)
+    ordre = np.argsort(priorite, kind="stable") if priorite is not None else np.arange(len(durees))
+    foreuse = np.empty(len(durees), dtype=np.intp)
+    debut = np.empty(len(durees))
+    libres = [(0.0, k) for k in range(n_foreuses)]
+    for w in ordre:
+        t, k = heapq.heappop(libres)
+        foreuse[w], debut[w] = k, t
+        heapq.heappush(libres, (t + durees[w], k))
+    return foreuse, debut, debut + durees
+
+def planning_impose(durees, foreuse, priorite=None):
+    # Foreuses déjà affectées : chaque foreuse enchaîne ses puits par priorité
+    durees = np.asarray(durees, dtype=float)
+    cle = priorite if priorite is not None else np.arange(len(durees))
+    ordre = np.lexsort((cle, foreuse))
+    avant = np.cumsum(durees[ordre]) - durees[ordre]
+    nouvelle = np.r_[True, foreuse[ordre][1:] != foreuse[ordre][:-1]]
+    debut = np.empty(len(durees))
+    debut[ordre] = avant - np.maximum.accumulate(np.where(nouvelle, avant, 0.0))
+    return debut, debut + durees
+
+def planifier_scenarios(profondeur, r, ordre, facteur_region, vitesse_foreuse, mobilisation):
+    # planifier() pour tous les scénarios à la fois, puits par puits dans
+    # l'ordre de priorité : vitesse (m/j) de la foreuse, (scénarios,
+    # foreuses), multipliée par le facteur de la région, (scénarios, régions).
+    # Retourne l'occupation de chaque foreuse (scénarios, foreuses), qui
+    # travaille sans attente.
+    n_s, n_k = vitesse_foreuse.shape
+    libre = np.zeros((n_s, n_k))
+    lignes = np.arange(n_s)
+    for i, w in enumerate(ordre):
+        if i % 256 == 0:
+            rapporter(i / len(ordre), f"planning par scénario : puits {i + 1}/{len(ordre)}")
+        k = libre.argmin(axis=1)
+        libre[lignes, k] += profondeur[w] / (facteur_region[:, r[w]] * vitesse_foreuse[lignes, k]) + mobilisation
+    return libre
+
+def simuler_campagne(puits, vitesse=5.0, cv_vitesse=0.2, cv_tarif=0.1, n_scenarios=100_000,
+                     n_foreuses=1, mobilisation=1.0, tarifs=region_tarifs, graine=None):
+    # La vitesse de forage varie par foreuse (équipe, matériel) et par région
+    # (terrain), les tarifs par région. Le coût, qui ne dépend pas du planning,
+    # se réduit à un produit matriciel sur tous les scénarios. Foreuses
+    # affectées (colonne foreuse) : l'occupation aussi, (scénarios × régions)
+    # @ (régions × foreuses). Sinon l'affectation change avec les vitesses
+    # tirées : le planning est refait pour chaque scénario, sur un
+    # sous-échantillon (SCENARIOS_REPLANIFIES au plus, moins pour les grandes
+    # campagnes) dont sortent durées et occupations.
+    manquantes = [c for c in COLONNES_CAMPAGNE if c not in puits.columns]
+    if manquantes:
+        raise ValueError(f"Colonnes manquantes : {', '.join(manquantes)}")
+    inconnues = sorted(set(puits["region"]) - set(tarifs))
+    if inconnues:
+        raise ValueError(f"Régions sans tarif : {', '.join(map(str, inconnues))}")
+
+    profondeur = puits["profondeur"].to_numpy(dtype=float)
+    priorite = puits["priorite"].to_numpy() if "priorite" in puits else None
+    regions = list(tarifs)
+    r = puits["region"].map({nom: i for i, nom in enumerate(regions)}).to_numpy()
+    tarif = np.array([tarifs[nom] for nom in regions], dtype=float)
+
+    # --- Planning de référence (vitesse médiane) ---
+    durees = profondeur / vitesse + mobilisation
+    impose = "foreuse" in puits
+    if impose:
+        codes, noms_foreuses = pd.factorize(puits["foreuse"], sort=True)
+        foreuse = codes.astype(np.intp)
+        debut, fin = planning_impose(durees, foreuse, priorite)
+    else:
+        noms_foreuses = [f"F{k + 1}" for k in range(n_foreuses)]
+        foreuse, debut, fin = planifier(durees, n_foreuses, priorite)
+    n_k, n_r = len(noms_foreuses), len(regions)
+
+    # Métrage par (région, foreuse) et nombre de puits par foreuse
+    metrage = np.zeros((n_r, n_k))
+    np.add.at(metrage, (r, foreuse), profondeur)
+    n_puits = np.bincount(foreuse, minlength=n_k)
+
+    # --- Tirages ---
+    rng = np.random.default_rng(graine)
+    sigma_v = np.sqrt(np.log1p(cv_vitesse**2))
+    sigma_t = np.sqrt(np.log1p(cv_tarif**2))
+    f_region = np.exp(rng.normal(0.0, sigma_v, (n_scenarios, n_r)))
+    f_foreuse = np.exp(rng.normal(0.0, sigma_v, (n_scenarios, n_k)))
+    f_tarif = np.exp(rng.normal(-sigma_t**2 / 2, sigma_t, (n_scenarios, n_r)))
+
+    cout = (f_tarif * tarif) @ metrage.sum(axis=1)
+    if impose:
+        occupation = ((1 / f_region) @ metrage) / (vitesse * f_foreuse) + mobilisation * n_puits
+    else:
+        m = min(n_scenarios, max(SCENARIOS_REPLANIFIES_MIN,
+                                 min(SCENARIOS_REPLANIFIES, ELEMENTS_REPLANIFICATION // max(len(puits) * n_k, 1))))
+        ordre = np.argsort(priorite, kind="stable") if priorite is not None else np.arange(len(puits))
+        occupation = planifier_scenarios(profondeur, r, ordre, f_region[:m], vitesse * f_foreuse[:m],
+                                         mobilisation)
+    duree_campagne = occupation.max(axis=1)
+    utilisation = occupation / duree_campagne[:, None]
+
+    planning = pd.DataFrame({
+        "well_id": puits["well_id"].to_numpy(),
+        "foreuse": np.asarray(noms_foreuses, dtype=object)[foreuse],
+        "debut (j)": debut, "fin (j)": fin,
+    })
+    # Puits et métrage par foreuse : planning de référence
+    foreuses = pd.DataFrame({
+        "foreuse": list(noms_foreuses), "puits": n_puits,
+        "metrage (m)": metrage.sum(axis=0),
+        "occupation P50 (j)": np.percentile(occupation, 50, axis=0),
+        "utilisation moyenne": utilisation.mean(axis=0),
+    })
+    return {
+        "cout": np.percentile(cout, PERCENTILES),
+        "duree": np.percentile(duree_campagne, PERCENTILES),
+        "couts": cout, "durees": duree_campagne,
+        "scenarios_planning": len(duree_campagne),
+        "planning": planning, "foreuses": foreuses,
+    }
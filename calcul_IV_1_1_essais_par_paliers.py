@@ -0,0 +1,365 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import curve_fit
+
+from projets import Graphe
+from reechantillonnage import (
+    N_TIRAGES, NIVEAU, decouper, indices, intervalles, levenberg_marquardt_lot, pseudo_series
+)
+from taches import executer_blocs, rapporter
+
+# === Calculs des essais par paliers (sans Streamlit) ===
+# Ces fonctions sont partagées par la section IV.1.1 et le traitement par lot
+# de plusieurs milliers de puits (table longue : well_id, Q, s, t).
+
+TYPES_PUITS = {
+    "auto_developpement": "❗ Anomalie : auto-développement",
+    "parfait": "💧 Puits parfait",
+    "bien_developpe": "🔎 Puits réel bien développé",
+    "vieilli": "⚠️ Puits vieilli ou mal dimensionné",
+    "moyen": "🧪 Puits réel à rendement moyen",
+    "incoherent": "❓ Données incohérentes",
+}
+
+COLONNES_LOT = ["well_id", "Q", "s", "t"]
+ENTREES_MAX_AJUSTEMENTS = 4096
+
+_ajustements = OrderedDict()
+_verrou = threading.Lock()
+
+
+# === Modèles non linéaires : modèle, jacobien analytique, départ, bornes ===
+def _modele_rorabaugh(Q, A, B, n):
+    return A * Q + B * Q**n
+
+def _jacobien_rorabaugh(Q, A, B, n):
+    # Paramètres scalaires : (points, 3) ; en colonnes (tirages, 1) : (tirages, points, 3)
+    Qn = Q**n
+    return np.stack(np.broadcast_arrays(Q, Qn, B * Qn * np.log(Q)), axis=-1)
+
+def _depart_rorabaugh(Q, s):
+    # À n fixé, A et B sont linéaires : on résout les équations normales 2×2
+    # (s = AQ + BQⁿ, sans constante) pour une grille de n complétée par n = 2
+    # et par la pente log-log de s - A₂Q, où A₂ est le terme en Q de la
+    # parabole ajustée par np.polyfit (avec constante) ; on garde le meilleur.
+    A2 = max(np.polyfit(Q, s, 2)[1], 0.0)
+    reste = s - A2 * Q
+    valides = (reste > 0) & (Q > 0)
+    candidats = [np.linspace(0.1, 5, 50), [2.0]]
+    if valides.sum() >= 2:
+        candidats.append([np.polyfit(np.log(Q[valides]), np.log(reste[valides]), 1)[0]])
+    n = np.clip(np.concatenate(candidats), 0, 5)
+    Qn = Q[None, :] ** n[:, None]
+    a11, a12, a22 = Q @ Q, Qn @ Q, (Qn * Qn).sum(axis=1)
+    b1, b2 = Q @ s, Qn @ s
+    det = a11 * a22 - a12**2
+    A = np.maximum((a22 * b1 - a12 * b2) / det, 0.0)
+    B = np.maximum((a11 * b2 - a12 * b1) / det, 0.0)
+    residus = ((A[:, None] * Q + B[:, None] * Qn - s) ** 2).sum(axis=1)
+    i = np.nanargmin(residus)
+    return A[i], B[i], n[i]
+
+def _modele_gosselin(Q, B, n):
+    return B * Q**n
+
+def _jacobien_gosselin(Q, B, n):
+    Qn = Q**n
+    return np.stack(np.broadcast_arrays(Qn, B * Qn * np.log(Q)), axis=-1)
+
+def _depart_gosselin(Q, s):
+    # Régression log-log : log s = log B + n log Q
+    valides = (s > 0) & (Q > 0)
+    if valides.sum() < 2:
+        return 1.0, 1.0
+    n, log_B = np.polyfit(np.log(Q[valides]), np.log(s[valides]), 1)
+    return np.exp(log_B), n
+
+MODELES_NON_LINEAIRES = {
+    "rorabaugh": (_modele_rorabaugh, _jacobien_rorabaugh, _depart_rorabaugh, (0, [np.inf, np.inf, 5])),
+    "gosselin": (_modele_gosselin, _jacobien_gosselin, _depart_gosselin, (0, [np.inf, 5])),
+}
+
+# === Cache des ajustements ===
+# Clé : empreinte de (modèle, bornes, Q, s). Un rerun qui ne change que des
+# paramètres d'affichage (type de nappe, méthodes) ne relance pas curve_fit.
+def _empreinte(nom, bornes, Q, s):
+    h = hashlib.blake2b(digest_size=20)
+    h.update(f"{nom}{bornes!r}{Q.shape}".encode())
+    h.update(Q.tobytes())
+    h.update(s.tobytes())
+    return h.hexdigest()
+
+def ajuster(nom, Q, s):
+    bornes = MODELES_NON_LINEAIRES[nom][3]
+    Q = np.ascontiguousarray(Q, dtype=float)
+    s = np.ascontiguousarray(s, dtype=float)
+    cle = _empreinte(nom, bornes, Q, s)
+    with _verrou:
+        popt = _ajustements.get(cle)
+        if popt is not None:
+            _ajustements.move_to_end(cle)
+            return popt.copy()
+    popt = _ajuster_sans_cache(nom, Q, s)
+    with _verrou:
+        _ajustements[cle] = popt
+        while len(_ajustements) > ENTREES_MAX_AJUSTEMENTS:
+            _ajustements.popitem(last=False)
+    return popt.copy()
+
+def _ajuster_sans_cache(nom, Q, s, p0=None):
+    modele, jacobien, depart, bornes = MODELES_NON_LINEAIRES[nom]
+    if p0 is None:
+        with np.errstate(invalid="ignore", divide="ignore", over="ignore"):
+            p0 = np.asarray(depart(Q, s), dtype=float)
+    p0 = np.clip(np.where(np.isfinite(p0), p0, 1.0), bornes[0], bornes[1])
+    try:
+        popt, _ = curve_fit(modele, Q, s, p0=p0, jac=jacobien, bounds=bornes)
+    except RuntimeError:
+        # Paramètres mal déterminés (B → 0, n libre) : départ par défaut de curve_fit
+        popt, _ = curve_fit(modele, Q, s, jac=jacobien, bounds=bornes)
+    return popt
+
+def vider_cache():
+    with _verrou:
+        _ajustements.clear()
+
+
+def rorabaugh(Q, s):
+    A, B, n = ajuster("rorabaugh", Q, s)
+    log_Q = np.log10(Q)
+    s_Q_A = s / Q - A
+    log_s_Q_A = np.log10(s_Q_A)
+    return A, B, n, log_Q, log_s_Q_A
+
+def gosselin(Q, s):
+    B, n = ajuster("gosselin", Q, s)
+    log_Q = np.log10(Q)
+    log_s = np.log10(s)
+    return B, n, log_Q, log_s
+
+def s_max_admissible(H, nappe_type):
+    H = np.asarray(H, dtype=float)
+    libre = np.asarray(nappe_type) == "libre"
+    return np.where(libre, H / 3, 0.75 * H)
+
+def classer_puits(B, eta, croissant, s_decroissant=False):
+    # Même ordre de tests que l'interprétation d'un puits isolé
+    B, eta = np.asarray(B, dtype=float), np.asarray(eta, dtype=float)
+    croissant = np.asarray(croissant, dtype=bool)
+    s_decroissant = np.asarray(s_decroissant, dtype=bool)
+    cles = np.select(
+        [~croissant, s_decroissant, B < 0.001, eta > 70, eta < 50],
+        ["incoherent", "auto_developpement", "parfait", "bien_developpe", "vieilli"],
+        default="moyen")
+    return cles
+
+# === Noyaux groupés (puits concaténés, bornes debut/fin par puits) ===
+def _gradient_groupe(f, debut, fin):
+    # Équivalent de np.gradient (pas unitaire) appliqué séparément à chaque puits
+    g = np.empty_like(f)
+    g[1:-1] = (f[2:] - f[:-2]) / 2
+    g[debut] = f[debut + 1] - f[debut]
+    g[fin - 1] = f[fin - 1] - f[fin - 2]
+    return g
+
+def _argmax_groupe(valeurs, groupe, debut):
+    # Premier indice du maximum dans chaque puits (comme np.argmax)
+    idx = np.arange(len(valeurs))
+    ordre = np.lexsort((idx, -valeurs, groupe))
+    return ordre[debut]
+
+def ajuster_quadratique_lot(Q, s, groupe, n_puits):
+    # Moindres carrés s = c0 + A·Q + B·Q² pour tous les puits en une passe :
+    # équations normales 3×3 empilées, Q normalisé par puits pour le conditionnement.
+    echelle = np.zeros(n_puits)
+    np.maximum.at(echelle, groupe, np.abs(Q))
+    echelle[echelle == 0] = 1.0
+    x = Q / echelle[groupe]
+    puissances = np.stack([np.bincount(groupe, x**k, minlength=n_puits) for k in range(5)], axis=1)
+    seconds = np.stack([np.bincount(groupe, s * x**k, minlength=n_puits) for k in range(3)], axis=1)
+    M = puissances[:, [[0, 1, 2], [1, 2, 3], [2, 3, 4]]]
+    coeffs = np.linalg.solve(M, seconds[:, :, None])[:, :, 0]
+    A = coeffs[:, 1] / echelle
+    B = coeffs[:, 2] / echelle**2
+    return A, B
+
+def _bornes(groupe, n_puits):
+    tailles = np.bincount(groupe, minlength=n_puits)
+    fin = np.cumsum(tailles)
+    return fin - tailles, fin, tailles
+
+def interpreter_quadratique_lot(Q, s, groupe, n_puits, H, nappe_type, coeffs=None):
+    debut, fin, tailles = _bornes(groupe, n_puits)
+    A, B = ajuster_quadratique_lot(Q, s, groupe, n_puits) if coeffs is None else coeffs
+
+    s_model = A[groupe] * Q + B[groupe] * Q**2
+    pente_var = _gradient_groupe(_gradient_groupe(s_model, debut, fin), debut, fin)
+    i_c = _argmax_groupe(pente_var, groupe, debut)
+    Qc, s_opt = Q[i_c], s[i_c]
+
+    q_spec = np.bincount(groupe, Q / s, minlength=n_puits) / tailles
+    s_max = s_max_admissible(H, nappe_type)
+    Qmax = s_max * q_spec
+    eta = (A * Qc) / (A * Qc + B * Qc**2) * 100
+
+    # Q et s strictement croissants à l'intérieur de chaque puits
+    interne = np.ones(len(Q), dtype=bool)
+    interne[debut] = False
+    dQ = np.diff(Q, prepend=Q[:1])
+    ds = np.diff(s, prepend=s[:1])
+    rupture = interne & ((dQ <= 0) | (ds <= 0))
+    croissant = np.bincount(groupe, rupture, minlength=n_puits) == 0
+    s_decroissant = np.bincount(groupe, interne & (ds < 0), minlength=n_puits) > 0
+    cles = classer_puits(B, eta, croissant, s_decroissant)
+
+    return {"A": A, "B": B, "Qc": Qc, "s_Qc": s_opt, "eta": eta, "q_spec": q_spec,
+            "s_max": s_max, "Qmax": Qmax, "type_puits": cles,
+            "s_model": s_model, "pente_var": pente_var}
+
+def ajuster_quadratique(Q, s):
+    B, A = np.polyfit(np.asarray(Q, dtype=float), np.asarray(s, dtype=float), 2)[:2]
+    return A, B
+
+def deriver_debits(Q, s, H, nappe_type, A, B):
+    # Qc, Qmax, rendement et type de puits à partir d'un ajustement déjà fait
+    Q, s = np.asarray(Q, dtype=float), np.asarray(s, dtype=float)
+    res = interpreter_quadratique_lot(Q, s, np.zeros(len(Q), dtype=np.intp), 1,
+                                      np.array([H], dtype=float), np.array([nappe_type]),
+                                      coeffs=(np.array([A]), np.array([B])))
+    return {k: (v if k in ("s_model", "pente_var") else v[0]) for k, v in res.items()}
+
+def interpreter_essai(Q, s, H, nappe_type):
+    # Interprétation d'un seul essai (section IV.1.1)
+    return deriver_debits(Q, s, H, nappe_type, *ajuster_quadratique(Q, s))
+
+# === Graphe de recalcul d'un essai ===
+# Entrées : Q, s, H, nappe_type, avec_rorabaugh, avec_gosselin. Changer H ou
+# le type de nappe ne refait que la dérivation de Qc/Qmax ; les ajustements
+# ne dépendent que de (Q, s).
+GRAPHE_ESSAI = Graphe()
+GRAPHE_ESSAI.noeud("quadratique", "Q", "s")(ajuster_quadratique)
+
+@GRAPHE_ESSAI.noeud("interpretation", "Q", "s", "H", "nappe_type", "quadratique")
+def _noeud_interpretation(Q, s, H, nappe_type, coeffs):
+    return deriver_debits(Q, s, H, nappe_type, *coeffs)
+
+@GRAPHE_ESSAI.noeud("rorabaugh", "Q", "s", "avec_rorabaugh")
+def _noeud_rorabaugh(Q, s, actif):
+    return rorabaugh(Q, s) if actif else None
+
+@GRAPHE_ESSAI.noeud("gosselin", "Q", "s", "avec_gosselin")
+def _noeud_gosselin(Q, s, actif):
+    return gosselin(Q, s) if actif else None
+
+# === Ajustements non linéaires (Rorabaugh, Gosselin) ===
+def _ajuster_bloc(bloc):
+    sortie = np.full((len(bloc), 5), np.nan)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for i, (Q, s) in enumerate(bloc):
+            try:
+                sortie[i, :3] = rorabaugh(Q, s)[:3]
+            except (RuntimeError, ValueError):
+                pass
+            try:
+                sortie[i, 3:] = gosselin(Q, s)[:2]
+            except (RuntimeError, ValueError):
+                pass
+    return sortie
+
+def ajuster_non_lineaire_lot(series, n_workers=None, taille_bloc=64):
+    blocs = [series[i:i + taille_bloc] for i in range(0, len(series), taille_bloc)]
+    if not blocs:
+        return np.empty((0, 5))
+    return np.vstack(executer_blocs(_ajuster_bloc, blocs, n_workers, "ajustements non linéaires"))
+
+# === Interprétation par lot ===
+def interpreter_lot(df, H=5.0, nappe_type="libre", non_lineaire=True, n_workers=None):
+    manquantes = [c for c in COLONNES_LOT if c not in df.columns]
+    if manquantes:
+        raise ValueError(f"Colonnes manquantes : {', '.join(manquantes)}")
+
+    df = df.sort_values(["well_id", "t"], kind="stable")
+    codes, puits = pd.factorize(df["well_id"], sort=True)
+    n_puits = len(puits)
+    groupe = codes.astype(np.intp)
+    Q = df["Q"].to_numpy(dtype=float)
+    s = df["s"].to_numpy(dtype=float)
+
+    tailles = np.bincount(groupe, minlength=n_puits)
+    if np.any(tailles < 3):
+        trop_courts = list(puits[tailles < 3])
+        raise ValueError(f"Au moins 3 paliers requis par puits : {trop_courts[:10]}")
+
+    # Paramètres du puits : colonnes optionnelles, sinon valeurs par défaut
+    premiers = np.r_[0, np.cumsum(tailles)[:-1]]
+    H_puits = df["H"].to_numpy(dtype=float)[premiers] if "H" in df else np.full(n_puits, H)
+    nappe_puits = df["nappe_type"].to_numpy()[premiers] if "nappe_type" in df else np.full(n_puits, nappe_type)
+
+    res = interpreter_quadratique_lot(Q, s, groupe, n_puits, H_puits, nappe_puits)
+    resultats = pd.DataFrame({
+        "well_id": puits,
+        "n_paliers": tailles,
+        "A": res["A"], "B": res["B"],
+        "Qc": res["Qc"], "s_Qc": res["s_Qc"], "eta": res["eta"],
+        "q_spec": res["q_spec"], "s_max": res["s_max"], "Qmax": res["Qmax"],
+    })
+
+    if non_lineaire:
+        series = np.split(np.stack([Q, s]), premiers[1:], axis=1)
+        params = ajuster_non_lineaire_lot([tuple(x) for x in series], n_workers=n_workers)
+        resultats["A_rorabaugh"], resultats["B_rorabaugh"], resultats["n_rorabaugh"] = params[:, 0], params[:, 1], params[:, 2]
+        resultats["B_gosselin"], resultats["n_gosselin"] = params[:, 3], params[:, 4]
+
+    resultats["type_puits"] = res["type_puits"]
+    return resultats
+
+# === Intervalles de confiance (bootstrap) ===
+# Ajustement quadratique : toutes les pseudo-séries passent en un seul appel
+# à interpreter_quadratique_lot (équations normales empilées, un « puits »
+# par tirage), qui redonne aussi Qc, Qmax et le rendement de chacune.
+# Rorabaugh et Gosselin : blocs de pseudo-séries répartis sur le pool de
+# processus ; dans un bloc, Levenberg–Marquardt mené pour toutes les séries à
+# la fois, en partant de l'estimation. Un appel à curve_fit par tirage serait
+# trente fois plus lent.
+PARAMETRES_NON_LINEAIRES = {"rorabaugh": ("Rorabaugh", ["A", "B", "n"]), "gosselin": ("Gosselin", ["B", "n"])}
+def _reajuster_bloc(bloc):
+    nom, Q, p0, series = bloc
+    modele, jacobien, _, (bas, haut) = MODELES_NON_LINEAIRES[nom]
+    return levenberg_marquardt_lot(lambda P, lignes: modele(Q, *P.T[:, :, None]) - series[lignes],
+                                   lambda P, lignes: jacobien(Q, *P.T[:, :, None]),
+                                   np.tile(p0, (len(series), 1)), bas, haut)
+
+def bootstrap_paliers(Q, s, H, nappe_type, n_tirages=N_TIRAGES, methode="Résidus", taille_bloc=None,
+                      niveau=NIVEAU, non_lineaire=True, graine=0, n_workers=None):
+    # Retourne (tableau des intervalles, {(méthode, paramètre): tirages})
+    Q, s = np.asarray(Q, dtype=float), np.asarray(s, dtype=float)
+    n = len(Q)
+    idx = indices(n, n_tirages, methode, taille_bloc, graine)
+
+    ref = interpreter_essai(Q, s, H, nappe_type)
+    s_ajuste = np.polyval(np.polyfit(Q, s, 2), Q)
+    series = pseudo_series(s_ajuste, s - s_ajuste, idx, 3)
+    rapporter(0.0, "ajustements quadratiques")
+    res = interpreter_quadratique_lot(np.tile(Q, n_tirages), series.ravel(), np.repeat(np.arange(n_tirages), n),
+                                      n_tirages, np.full(n_tirages, float(H)), np.full(n_tirages, nappe_type))
+    estimations, tirages = {}, {}
+    for p in ["A", "B", "Qc", "Qmax", "eta"]:
+        estimations[("Quadratique", p)], tirages[("Quadratique", p)] = ref[p], res[p]
+
+    if non_lineaire:
+        blocs = []
+        for nom, (libelle, noms) in PARAMETRES_NON_LINEAIRES.items():
+            popt = ajuster(nom, Q, s)
+            s_ajuste = MODELES_NON_LINEAIRES[nom][0](Q, *popt)
+            series = pseudo_series(s_ajuste, s - s_ajuste, idx, len(popt))
+            blocs += [(nom, Q, popt, b) for b in decouper(series)]
+            estimations.update({(libelle, p): v for p, v in zip(noms, popt)})
+        sorties = executer_blocs(_reajuster_bloc, blocs, n_workers, "réajustements non linéaires")
+        for nom, (libelle, noms) in PARAMETRES_NON_LINEAIRES.items():
+            params = np.vstack([r for b, r in zip(blocs, sorties) if b[0] == nom])
+            tirages.update({(libelle, p): params[:, k] for k, p in enumerate(noms)})
+    return intervalles(estimations, tirages, niveau), tirages
@@ -0,0 +1,657 @@
+import os
+import tempfile
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import least_squares
+from scipy.special import expi, k0
+
+from reechantillonnage import (
+    N_TIRAGES, NIVEAU, decouper, indices, intervalles, jacobien_differences, levenberg_marquardt_lot,
+    pseudo_series
+)
+from taches import executer_blocs, rapporter
+
+# === Calculs des essais de longue durée (sans Streamlit) ===
+# Unités : Q en m³/h, t en h, r en m ; T en m²/j, S sans dimension.
+
+EULER_GAMMA = 0.5772156649015329
+
+# Table de W(u) = -Ei(-u) sur une grille régulière en ln(u)
+LN_U_MIN, LN_U_MAX, N_TABLE = np.log(1e-12), np.log(60.0), 40001
+
+# Bornes physiques de l'ajustement, en (ln T, ln S)
+BORNES_LN = (np.log([1e-3, 1e-9]), np.log([1e6, 1.0]))
+
+# Tables des fonctions de puits à deux paramètres : ln W sur (ln u, ln r/B)
+LN_BETA_MIN, LN_BETA_MAX, N_BETA = np.log(1e-3), np.log(10.0), 301
+N_U_2D = 3001
+N_STEHFEST = 12
+REPERTOIRE_TABLES = os.path.join(tempfile.gettempdir(), "soufilab_tables")
+VERSION_TABLES = 1
+
+
+def jacob(Q_m3h, t, s, r):
+    Q = Q_m3h * 24  # conversion m³/h → m³/j
+    log_t = np.log10(t)
+    slope, intercept = np.polyfit(log_t, s, 1)
+    T = 2.3 * Q / (4 * np.pi * slope)
+    t0 = 10 ** (-intercept / slope) / 24  # h → j, cohérent avec T en m²/j
+    S = (2.25 * T * t0) / (r**2)
+    return T, S, slope
+
+# === Décimation en temps logarithmique ===
+def decimer_log(t, s, n_classes=200, taille_bloc=1_000_000):
+    # Moyenne de s (et moyenne géométrique de t) par classes régulières en
+    # log t ; parcours par blocs pour accepter un np.memmap de taille quelconque.
+    n = len(t)
+    t_min, t_max = np.inf, -np.inf
+    for i in range(0, n, taille_bloc):
+        tb = np.asarray(t[i:i + taille_bloc])
+        tb = tb[tb > 0]
+        if tb.size:
+            t_min, t_max = min(t_min, tb.min()), max(t_max, tb.max())
+    if not np.isfinite(t_min):
+        return np.empty(0), np.empty(0)
+
+    ln_min = np.log(t_min)
+    largeur = (np.log(t_max) - ln_min) / n_classes or 1.0
+    somme_ln_t = np.zeros(n_classes)
+    somme_s = np.zeros(n_classes)
+    compte = np.zeros(n_classes)
+    for i in range(0, n, taille_bloc):
+        tb, sb = np.asarray(t[i:i + taille_bloc]), np.asarray(s[i:i + taille_bloc])
+        garder = (tb > 0) & np.isfinite(sb)
+        ln_t, sb = np.log(tb[garder]), sb[garder]
+        k = np.clip(((ln_t - ln_min) / largeur).astype(np.intp), 0, n_classes - 1)
+        somme_ln_t += np.bincount(k, ln_t, minlength=n_classes)
+        somme_s += np.bincount(k, sb, minlength=n_classes)
+        compte += np.bincount(k, minlength=n_classes)
+    pleines = compte > 0
+    return np.exp(somme_ln_t[pleines] / compte[pleines]), somme_s[pleines] / compte[pleines]
+
+# === Fonction de puits de Theis ===
+@lru_cache(maxsize=None)
+def _table_theis():
+    ln_u = np.linspace(LN_U_MIN, LN_U_MAX, N_TABLE)
+    # ln W est régulier sur tout l'intervalle (W décroît comme e^-u/u)
+    ln_W = np.log(-expi(-np.exp(ln_u)))
+    pas = (LN_U_MAX - LN_U_MIN) / (N_TABLE - 1)
+    return ln_W, pas
+
+def theis_W(u):
+    # Interpolation linéaire de ln W en ln u : indice calculé, pas de recherche
+    u = np.atleast_1d(np.asarray(u, dtype=float))
+    ln_W, pas = _table_theis()
+    x = (np.log(u) - LN_U_MIN) / pas
+    i = np.clip(np.floor(x).astype(np.intp), 0, N_TABLE - 2)
+    f = x - i
+    W = np.exp(ln_W[i] * (1 - f) + ln_W[i + 1] * f)
+    # Hors table : développement pour u petit, asymptote pour u grand
+    petit, grand = x < 0, x > N_TABLE - 1
+    W[petit] = -EULER_GAMMA - np.log(u[petit]) + u[petit]
+    W[grand] = np.exp(-u[grand]) / u[grand] * (1 - 1 / u[grand] + 2 / u[grand]**2)
+    return W
+
+def theis(Q_m3h, t, r, T, S):
+    Q = Q_m3h * 24
+    u = r**2 * S / (4 * T * (np.asarray(t, dtype=float) / 24))
+    return Q / (4 * np.pi * T) * theis_W(u)
+
+def _theis_jacobien(Q, t_j, r, T, S):
+    # Dérivées par rapport à ln T et ln S (dW/du = -e^-u / u)
+    u = r**2 * S / (4 * T * t_j)
+    W = theis_W(u)
+    a = Q / (4 * np.pi * T)
+    e = np.exp(-u)
+    return a * W, np.stack(np.broadcast_arrays(-a * (W - e), -a * e), axis=-1)
+
+def ajuster_theis(Q_m3h, t, s, r, T0=None, S0=None):
+    # r : distance unique ou une distance par point (plusieurs piézomètres)
+    t = np.asarray(t, dtype=float)
+    s = np.asarray(s, dtype=float)
+    r = np.asarray(r, dtype=float)
+    masque = (t > 0) & np.isfinite(s)
+    t_j, s = t[masque] / 24, s[masque]
+    if r.ndim:
+        r = r[masque]
+    Q = Q_m3h * 24
+
+    # Point de départ : droite de Jacob (en t/r²), sinon valeurs typiques
+    if T0 is None or S0 is None:
+        T0, S0, _ = jacob_composite(Q_m3h, t[masque], s, r)
+        if not (T0 > 0 and S0 > 0 and np.isfinite(T0 * S0)):
+            T0, S0 = 100.0, 1e-4
+
+    # Résidus et jacobien partagent la même évaluation de W(u)
+    dernier = {}
+
+    def evaluer(p):
+        cle = p.tobytes()
+        if cle not in dernier:
+            dernier.clear()
+            dernier[cle] = _theis_jacobien(Q, t_j, r, np.exp(p[0]), np.exp(p[1]))
+        return dernier[cle]
+
+    def residus(p):
+        return evaluer(p)[0] - s
+
+    def jac(p):
+        return evaluer(p)[1]
+
+    p0 = np.clip(np.log([T0, S0]), BORNES_LN[0], BORNES_LN[1])
+    res = least_squares(residus, p0, jac=jac, bounds=BORNES_LN)
+    T, S = np.exp(res.x)
+    rmse = float(np.sqrt(np.mean(res.fun**2)))
+    return T, S, rmse
+
+# === Fonctions de puits à deux paramètres (drainance, débit retardé) ===
+# Hantush–Jacob : W(u, β) = ∫_u^∞ exp(-y - β²/4y) dy/y, β = r/B.
+# Boulton (Sy/S grand) : courbe A = W(u_A, β) de Hantush ; courbe B inversée
+# de Laplace (Stehfest) depuis W̄(p) = 2/p K0(√(β² p / (p + β²))), en
+# τ = 1/(4 u_B). Les deux sont calculées une fois sur une grille régulière en
+# (ln u, ln β), conservées sur disque (float32), puis interpolées
+# bilinéairement en ln W : l'ajustement ne coûte que des lectures de table.
+
+def _grilles_2d():
+    ln_u = np.linspace(LN_U_MIN, LN_U_MAX, N_U_2D)
+    ln_beta = np.linspace(LN_BETA_MIN, LN_BETA_MAX, N_BETA)
+    return ln_u, ln_beta
+
+def _coefficients_stehfest(n):
+    from math import factorial
+    V = np.zeros(n)
+    for k in range(1, n + 1):
+        somme = 0.0
+        for j in range((k + 1) // 2, min(k, n // 2) + 1):
+            somme += (j ** (n // 2) * factorial(2 * j)
+                      / (factorial(n // 2 - j) * factorial(j) * factorial(j - 1)
+                         * factorial(k - j) * factorial(2 * j - k)))
+        V[k - 1] = (-1) ** (k + n // 2) * somme
+    return V
+
+def _calculer_hantush(ln_u, beta):
+    # Trapèzes cumulés en ln y, depuis u max (queue ≈ e^-y/y au-delà)
+    y = np.exp(ln_u)
+    f = np.exp(-y[None, :] - beta[:, None] ** 2 / (4 * y[None, :]))
+    h = ln_u[1] - ln_u[0]
+    W = np.empty_like(f)
+    W[:, -1] = f[:, -1] / y[-1]
+    W[:, :-1] = W[:, -1:] + np.cumsum(((f[:, 1:] + f[:, :-1]) * h / 2)[:, ::-1], axis=1)[:, ::-1]
+    return W
+
+def _calculer_boulton_b(ln_u, beta):
+    V = _coefficients_stehfest(N_STEHFEST)
+    ln2_tau = np.log(2) * 4 * np.exp(ln_u)       # ln 2 / τ
+    b2 = beta[:, None] ** 2
+    W = np.zeros((len(beta), len(ln_u)))
+    for k, v in enumerate(V, start=1):
+        p = k * ln2_tau[None, :]
+        W += v * 2 / p * k0(np.sqrt(b2 * p / (p + b2)))
+    return W * ln2_tau[None, :]
+
+@lru_cache(maxsize=None)
+def tables_puits():
+    chemin = os.path.join(REPERTOIRE_TABLES, f"fonctions_puits_v{VERSION_TABLES}_{N_U_2D}x{N_BETA}.npz")
+    if os.path.exists(chemin):
+        with np.load(chemin) as f:
+            return {"hantush": f["hantush"], "boulton_b": f["boulton_b"]}
+    ln_u, ln_beta = _grilles_2d()
+    beta = np.exp(ln_beta)
+    with np.errstate(under="ignore", divide="ignore"):
+        tables = {
+            "hantush": np.log(_calculer_hantush(ln_u, beta)).astype(np.float32),
+            "boulton_b": np.log(np.maximum(_calculer_boulton_b(ln_u, beta), 1e-300)).astype(np.float32),
+        }
+    try:
+        os.makedirs(REPERTOIRE_TABLES, exist_ok=True)
+        temporaire = f"{chemin}.{os.getpid()}.tmp.npz"
+        np.savez(temporaire, **tables)
+        os.replace(temporaire, chemin)
+    except OSError:
+        pass
+    return tables
+
+def _interpoler_2d(table, u, beta):
+    # Indices calculés (grille régulière), bords prolongés par constante :
+    # palier 2K0(β) pour u petit, W ≈ 0 pour u grand
+    u, beta = np.broadcast_arrays(np.asarray(u, dtype=float), np.asarray(beta, dtype=float))
+    pas_u = (LN_U_MAX - LN_U_MIN) / (N_U_2D - 1)
+    pas_b = (LN_BETA_MAX - LN_BETA_MIN) / (N_BETA - 1)
+    x = np.clip((np.log(u) - LN_U_MIN) / pas_u, 0, N_U_2D - 1)
+    y = np.clip((np.log(beta) - LN_BETA_MIN) / pas_b, 0, N_BETA - 1)
+    i = np.minimum(x.astype(np.intp), N_U_2D - 2)
+    j = np.minimum(y.astype(np.intp), N_BETA - 2)
+    fx, fy = x - i, y - j
+    ln_W = ((table[j, i] * (1 - fx) + table[j, i + 1] * fx) * (1 - fy)
+            + (table[j + 1, i] * (1 - fx) + table[j + 1, i + 1] * fx) * fy)
+    return np.exp(ln_W)
+
+def hantush_W(u, beta):
+    return _interpoler_2d(tables_puits()["hantush"], u, beta)
+
+def boulton_W(u_A, u_B, beta):
+    # Courbes A et B raccordées sur le palier commun 2K0(β) (limite S/Sy → 0)
+    t = tables_puits()
+    return (_interpoler_2d(t["hantush"], u_A, beta) + _interpoler_2d(t["boulton_b"], u_B, beta)
+            - 2 * k0(np.asarray(beta, dtype=float)))
+
+# === Modèles transitoires ajustables ===
+# Paramètres : T (m²/j), S, Sy, r/B ajustés en logarithme ; f_s (pénétration
+# partielle, terme additif de Hantush aux temps longs) ajusté tel quel.
+def _rabattement_modele(nom, Q, t_j, r, p):
+    a = Q / (4 * np.pi * p["T"])
+    u = r**2 * p["S"] / (4 * p["T"] * t_j)
+    if nom == "Hantush–Jacob (drainance)":
+        return a * hantush_W(u, p["r/B"])
+    if nom == "Boulton (débit retardé)":
+        return a * boulton_W(u, u * p["Sy"] / p["S"], p["r/B"])
+    return a * (theis_W(u) + p["f_s"])
+
+MODELES_TRANSITOIRES = {
+    # nom : [(paramètre, en log, borne basse, borne haute)]
+    "Hantush–Jacob (drainance)": [("T", True, 1e-3, 1e6), ("S", True, 1e-9, 1.0),
+                                  ("r/B", True, np.exp(LN_BETA_MIN), np.exp(LN_BETA_MAX))],
+    "Boulton (débit retardé)": [("T", True, 1e-3, 1e6), ("S", True, 1e-9, 1.0), ("Sy", True, 1e-4, 0.5),
+                                ("r/B", True, np.exp(LN_BETA_MIN), np.exp(LN_BETA_MAX))],
+    "Hantush (pénétration partielle)": [("T", True, 1e-3, 1e6), ("S", True, 1e-9, 1.0), ("f_s", False, -50, 50)],
+}
+
+def _parametres_modele(nom):
+    definition = MODELES_TRANSITOIRES[nom]
+    return ([d[0] for d in definition], np.array([d[1] for d in definition]),
+            np.array([d[2] for d in definition], dtype=float), np.array([d[3] for d in definition], dtype=float))
+
+def rabattement_transitoire(nom, Q_m3h, t, r, params):
+    return _rabattement_modele(nom, Q_m3h * 24, np.asarray(t, dtype=float) / 24, r, params)
+
+def ajuster_modele(nom, Q_m3h, t, s, r, depart=None):
+    t = np.asarray(t, dtype=float)
+    s = np.asarray(s, dtype=float)
+    masque = (t > 0) & np.isfinite(s)
+    t_j, s = t[masque] / 24, s[masque]
+    Q = Q_m3h * 24
+    noms, en_log, bas, haut = _parametres_modele(nom)
+
+    # Départ : Theis (T, S), puis valeurs typiques pour les autres paramètres
+    if depart is None:
+        T0, S0, _ = ajuster_theis(Q_m3h, t[masque], s, r)
+        depart = {"T": T0, "S": S0, "Sy": min(max(100 * S0, 0.01), 0.3), "r/B": 0.1, "f_s": 0.0}
+    p0 = np.array([depart[n] for n in noms], dtype=float)
+    vers = lambda x: np.where(en_log, np.log(np.where(en_log, x, 1.0)), x)
+    depuis = lambda x: np.where(en_log, np.exp(x), x)
+    bornes = (vers(bas), vers(haut))
+    x0 = np.clip(vers(p0), bornes[0], bornes[1])
+
+    def residus(x):
+        return _rabattement_modele(nom, Q, t_j, r, dict(zip(noms, depuis(x)))) - s
+
+    res = least_squares(residus, x0, bounds=bornes, x_scale="jac")
+    params = dict(zip(noms, map(float, depuis(res.x))))
+    params["rmse"] = float(np.sqrt(np.mean(res.fun**2)))
+    return params
+
+# === Remontée : méthode de Theis ===
+# t' : temps depuis l'arrêt du pompage, t = t_arret + t' : temps depuis le
+# début, s' : rabattement résiduel. Aux temps longs de la remontée,
+# s' = Δs'·[log10(t/t') + log10(S'/S)] : la pente donne T = 2,3Q/(4πΔs'),
+# l'ordonnée à l'origine le rapport S'/S (1 si la droite passe par t/t' = 1).
+# S lui-même n'est pas accessible par la remontée.
+def theis_remontee(Q_m3h, t_arret, t_prime, s_residuel, rapport_max=None):
+    # rapport_max : ne garder que la fin de la remontée (t/t' ≤ rapport_max)
+    x, s = _points_remontee(t_arret, t_prime, s_residuel, rapport_max)
+    pente, b = np.polyfit(x, s, 1)
+    T = 2.3 * Q_m3h * 24 / (4 * np.pi * pente)
+    return T, 10 ** (b / pente), pente
+
+def _points_remontee(t_arret, t_prime, s_residuel, rapport_max=None):
+    # Points retenus pour la droite de remontée : (log10 t/t', s')
+    t_prime = np.asarray(t_prime, dtype=float)
+    s_residuel = np.asarray(s_residuel, dtype=float)
+    garder = (t_prime > 0) & np.isfinite(s_residuel)
+    rapport = (t_arret + t_prime) / np.where(garder, t_prime, 1.0)
+    if rapport_max:
+        tardifs = garder & (rapport <= rapport_max)
+        if tardifs.sum() >= 2:
+            garder = tardifs
+    return np.log10(rapport[garder]), s_residuel[garder]
+
+def temps_agarwal(t_arret, t_prime):
+    # Temps équivalent : la remontée s(t_arret) − s' se lit comme un pompage
+    t_prime = np.asarray(t_prime, dtype=float)
+    return t_arret * t_prime / (t_arret + t_prime)
+
+# === Dérivée logarithmique de Bourdet ===
+# ds/d ln t au point i : moyenne des pentes vers les premiers points situés à
+# au moins L (en ln t) à gauche et à droite, pondérée par l'écart opposé.
+# Les deux bornes de la fenêtre sont trouvées pour tous les points à la fois
+# par recherche dans ln t trié, sans boucle Python : 10⁶ points se traitent
+# en une fraction de seconde. Aux extrémités, pente d'un seul côté.
+def derivee_bourdet(t, s, L=0.2):
+    # Retourne (t, s, ds/d ln t) sur les points valides, triés en t
+    t = np.asarray(t, dtype=float)
+    s = np.asarray(s, dtype=float)
+    garder = (t > 0) & np.isfinite(s)
+    t, s = t[garder], s[garder]
+    if np.any(np.diff(t) < 0):
+        ordre = np.argsort(t, kind="stable")
+        t, s = t[ordre], s[ordre]
+    n = len(t)
+    x = np.log(t)
+    # Bords des fenêtres [ln t - L, ln t + L] par recherche dichotomique
+    # vectorisée : O(n log n), sans boucle Python
+    gauche = np.searchsorted(x, x - L, side="right") - 1
+    droite = np.searchsorted(x, x + L, side="left")
+    a_gauche, a_droite = gauche >= 0, droite < n
+    gauche, droite = np.clip(gauche, 0, n - 1), np.clip(droite, 0, n - 1)
+    dx1, dx2 = x - x[gauche], x[droite] - x
+    with np.errstate(invalid="ignore", divide="ignore"):
+        p1 = (s - s[gauche]) / dx1
+        p2 = (s[droite] - s) / dx2
+        deux_cotes = (p1 * dx2 + p2 * dx1) / (dx1 + dx2)
+    ds = np.where(a_gauche & a_droite, deux_cotes,
+                  np.where(a_gauche, p1, np.where(a_droite, p2, np.nan)))
+    return t, s, ds
+
+# === Diagnostic des régimes d'écoulement ===
+# La pente de la dérivée en log-log identifie le régime : 1 effet de
+# capacité (début d'essai) ou réservoir clos (fin d'essai), 1/2 linéaire (fracture, chenal), 1/4 bilinéaire, 0 radial
+# (droite de Jacob), −1/2 sphérique (pénétration partielle) ou transition,
+# déclin franc : drainance ou limite d'alimentation.
+REGIMES = [
+    # (régime, pente de référence, borne basse de la pente)
+    ("Pente 1 (effet de capacité ou réservoir clos)", 1.0, 0.75),
+    ("Écoulement linéaire", 0.5, 0.375),
+    ("Écoulement bilinéaire", 0.25, 0.15),
+    ("Écoulement radial", 0.0, -0.15),
+    ("Pente −1/2 (sphérique ou transition)", -0.5, -0.75),
+    ("Déclin (drainance ou alimentation)", -1.0, -np.inf),
+]
+RADIAL = "Écoulement radial"
+DUREE_REGIME_MIN = 0.3  # décades
+
+def detecter_regimes(t, ds, Q_m3h=None, L=0.3, n_classes=100, duree_min=DUREE_REGIME_MIN):
+    # Segments de pente homogène de la dérivée (t, ds) ; sur un palier radial,
+    # ds = Q/(4πT) donne T si le débit est fourni.
+    t = np.asarray(t, dtype=float)
+    ds = np.asarray(ds, dtype=float)
+    garder = (t > 0) & (ds > 0) & np.isfinite(ds)
+    colonnes = ["régime", "t début (h)", "t fin (h)", "décades", "pente", "dérivée (m)", "T (m²/j)"]
+    if garder.sum() < 3:
+        return pd.DataFrame(columns=colonnes)
+    # Moyenne géométrique de la dérivée par classe de log t : le bruit est lissé
+    tc, ln_d = decimer_log(t[garder], np.log(ds[garder]), n_classes)
+    _, _, pente = derivee_bourdet(tc, ln_d, L)
+    bornes = np.array([b for _, _, b in REGIMES][::-1])
+    classe = len(REGIMES) - np.searchsorted(bornes, pente, side="right")
+
+    # Plages contiguës de même régime ; les plus courtes que duree_min sont
+    # écartées puis les voisines de même régime fusionnées
+    debuts = np.flatnonzero(np.r_[True, classe[1:] != classe[:-1]])
+    fins = np.r_[debuts[1:], len(classe)] - 1
+    longues = np.log10(tc[fins] / tc[debuts]) >= duree_min
+    debuts, fins = debuts[longues], fins[longues]
+    if len(debuts) > 1:
+        nouveau = np.r_[True, classe[debuts[1:]] != classe[debuts[:-1]]]
+        fins = fins[np.r_[np.flatnonzero(nouveau)[1:] - 1, len(nouveau) - 1]]
+        debuts = debuts[nouveau]
+
+    lignes = []
+    for i, j in zip(debuts, fins):
+        nom = REGIMES[classe[i]][0]
+        niveau = float(np.exp(np.median(ln_d[i:j + 1])))
+        T = Q_m3h * 24 / (4 * np.pi * niveau) if Q_m3h is not None and nom == RADIAL else np.nan
+        lignes.append([nom, tc[i], tc[j], np.log10(tc[j] / tc[i]), float(np.mean(pente[i:j + 1])), niveau, T])
+    return pd.DataFrame(lignes, columns=colonnes)
+
+def suggerer_aquifere(segments):
+    # (aquifère proposé ou None, explication) d'après la succession des régimes
+    regimes = list(segments["régime"])
+    if RADIAL not in regimes:
+        return None, "Pas de palier radial : essai trop court ou dérivée trop bruitée (augmenter L)."
+    premier = regimes.index(RADIAL)
+    dernier = len(regimes) - 1 - regimes[::-1].index(RADIAL)
+    niveaux = segments["dérivée (m)"].to_numpy()
+    pentes = segments["pente"].to_numpy()
+    rapport = niveaux[dernier] / niveaux[premier]
+    # Après le premier palier : position de la première chute, puis remontée éventuelle
+    chutes = [i for i in range(premier + 1, len(regimes)) if pentes[i] < -0.15]
+    remontees = [i for i in range(chutes[0] + 1, len(regimes)) if pentes[i] > 0.15] if chutes else []
+    if premier != dernier and 1.6 <= rapport <= 2.6 and not chutes:
+        return "Barrière imperméable", f"Le palier de la dérivée double (×{rapport:.2f}) : limite étanche."
+    if remontees:
+        return ("Nappe semi-libre (débit retardé)",
+                "Creux de la dérivée (chute puis remontée vers un second palier) : débit retardé "
+                "(Boulton) ou double porosité.")
+    if chutes:
+        return ("Nappe semi-captive (drainance)",
+                "La dérivée chute après le palier radial : drainance (Hantush–Jacob) ; "
+                "une chute brutale évoque plutôt une limite d'alimentation (recharge latérale).")
+    if any(r.startswith("Pente −1/2") for r in regimes[:premier]):
+        return "Puits à pénétration partielle", "Pente −1/2 avant le palier radial : écoulement sphérique."
+    decades = segments["décades"].to_numpy()
+    if any(r in ("Écoulement linéaire", "Écoulement bilinéaire") and decades[i] >= 0.5
+           for i, r in enumerate(regimes[:premier])):
+        return ("Nappe captive", "Écoulement linéaire ou bilinéaire (fracture, chenal) avant le palier "
+                                 "radial : ajuster Theis/Jacob sur le palier seulement.")
+    return "Nappe captive", "Palier radial : Theis / Jacob."
+
+# === Interprétation complète d'un essai ===
+# Modèle transitoire ajusté selon l'aquifère
+MODELES_AQUIFERE = {
+    'Nappe semi-captive (drainance)': "Hantush–Jacob (drainance)",
+    'Aquifère bicouche': "Hantush–Jacob (drainance)",
+    'Nappe libre': "Boulton (débit retardé)",
+    'Nappe semi-libre (débit retardé)': "Boulton (débit retardé)",
+    'Puits à pénétration partielle': "Hantush (pénétration partielle)",
+}
+AQUIFERES_JACOB = ['Nappe captive', 'Nappe semi-captive', 'Nappe captive (gradient initial)']
+AQUIFERES_THEIS = ['Nappe captive', 'Nappe captive (gradient initial)']
+
+def ajuster_essai(aquifere, Q_m3h, tp, sp, r, tr=None, sr=None, t_arret=None, rapport_max=None):
+    # Toutes les méthodes applicables à l'aquifère : liste de dictionnaires
+    # (methode, T, S, note, et selon la méthode pente, rmse, s_modele).
+    # tr : temps depuis l'arrêt du pompage, sr : rabattement résiduel ;
+    # t_arret : durée du pompage (par défaut, dernier temps du pompage).
+    resultats = []
+    if aquifere in AQUIFERES_JACOB:
+        T, S, slope = jacob(Q_m3h, tp, sp, r)
+        resultats.append({"methode": "Jacob (pompage)", "T": T, "S": S, "note": "s = f(log t)", "pente": slope})
+    if tr is not None and sr is not None:
+        t_arret = float(np.max(tp)) if t_arret is None else t_arret
+        T, rapport_S, slope = theis_remontee(Q_m3h, t_arret, tr, sr, rapport_max)
+        resultats.append({"methode": "Theis (remontée)", "T": T, "S": np.nan,
+                          "note": f"s' = f(log t/t'), S'/S ≈ {rapport_S:.2f}", "pente": slope})
+    rapporter(0.2, "Theis")
+    if aquifere in AQUIFERES_THEIS:
+        T, S, rmse = ajuster_theis(Q_m3h, tp, sp, r)
+        resultats.append({"methode": "Theis (pompage)", "T": T, "S": S, "note": "ajustement W(u)", "rmse": rmse})
+    # Modèles à deux paramètres (drainance, débit retardé, pénétration partielle)
+    if aquifere in MODELES_AQUIFERE:
+        nom = MODELES_AQUIFERE[aquifere]
+        rapporter(0.5, nom)
+        p = ajuster_modele(nom, Q_m3h, tp, sp, r)
+        details = ", ".join(f"{k} ≈ {p[k]:.3g}" for k, *_ in MODELES_TRANSITOIRES[nom] if k not in ("T", "S"))
+        resultats.append({"methode": nom, "T": p["T"], "S": p["S"], "note": details, "rmse": p["rmse"],
+                          "parametres": p, "s_modele": rabattement_transitoire(nom, Q_m3h, tp, r, p)})
+    return resultats
+
+# === Inversion conjointe multi-piézomètres ===
+# Table longue (piezometre, r, t, s) : toutes les séries sont empilées et
+# ajustées ensemble (T et S communs). Le rayon est porté par chaque point,
+# le vecteur des résidus se construit donc en une seule expression.
+COLONNES_PIEZOMETRES = ["piezometre", "r", "t", "s"]
+
+def preparer_piezometres(df):
+    manquantes = [c for c in COLONNES_PIEZOMETRES if c not in df.columns]
+    if manquantes:
+        raise ValueError(f"Colonnes manquantes : {', '.join(manquantes)}")
+    t = df["t"].to_numpy(dtype=float)
+    s = df["s"].to_numpy(dtype=float)
+    r = df["r"].to_numpy(dtype=float)
+    garder = (t > 0) & (r > 0) & np.isfinite(s)
+    codes, noms = pd.factorize(df["piezometre"].to_numpy()[garder], sort=True)
+    groupe = codes.astype(np.intp)
+    ordre = np.lexsort((t[garder], groupe))
+    groupe, t, s, r = groupe[ordre], t[garder][ordre], s[garder][ordre], r[garder][ordre]
+    n = len(noms)
+    r_piezo = np.bincount(groupe, r, minlength=n) / np.maximum(np.bincount(groupe, minlength=n), 1)
+    return {"noms": list(noms), "groupe": groupe, "t": t, "s": s, "r": r, "r_piezo": r_piezo}
+
+def ajuster_theis_multi(Q_m3h, t, s, r, groupe, n_groupes):
+    T, S, rmse = ajuster_theis(Q_m3h, t, s, r)
+    ecarts = (theis(Q_m3h, t, r, T, S) - s) ** 2
+    compte = np.bincount(groupe, minlength=n_groupes)
+    rmse_piezo = np.sqrt(np.bincount(groupe, ecarts, minlength=n_groupes) / np.maximum(compte, 1))
+    return T, S, rmse, rmse_piezo
+
+def jacob_composite(Q_m3h, t, s, r, u_max=None):
+    # Droite de Cooper–Jacob en log(t/r²) : toutes les distances sur une droite.
+    # u_max : ne garder que les points où l'approximation est valable
+    # (u < u_max), avec u estimé à partir d'un premier ajustement.
+    t, s, r = (np.asarray(x, dtype=float) for x in (t, s, r))
+    x = np.log10(t / r**2)
+    slope, intercept = np.polyfit(x, s, 1)
+    if u_max is not None:
+        T, S = _jacob_droite(Q_m3h, slope, intercept)
+        valides = r**2 * S / (4 * T * t / 24) < u_max
+        if valides.sum() >= 2:
+            slope, intercept = np.polyfit(x[valides], s[valides], 1)
+    T, S = _jacob_droite(Q_m3h, slope, intercept)
+    return T, S, slope
+
+def _jacob_droite(Q_m3h, slope, intercept):
+    # s = slope · log10(t/r²) + intercept, t en h
+    Q = Q_m3h * 24
+    T = 2.3 * Q / (4 * np.pi * slope)
+    t_r2 = 10 ** (-intercept / slope) / 24
+    return T, 2.25 * T * t_r2
+
+def interpoler_groupes(groupe, x, y, n_groupes, x_q):
+    # Interpolation linéaire de y(x) pour chaque groupe aux abscisses x_q,
+    # sans boucle : les x (triés par groupe) sont décalés de 2·groupe après
+    # normalisation dans [0, 1] pour ne former qu'une seule suite croissante.
+    x_q = np.asarray(x_q, dtype=float)
+    x_min, x_max = x.min(), x.max()
+    etendue = (x_max - x_min) or 1.0
+    cle = groupe * 2.0 + (x - x_min) / etendue
+    q = (np.arange(n_groupes)[:, None] * 2.0 + (x_q[None, :] - x_min) / etendue).ravel()
+    j = np.clip(np.searchsorted(cle, q), 1, len(cle) - 1)
+    meme = (groupe[j] == groupe[j - 1]) & (cle[j - 1] <= q) & (q <= cle[j])
+    f = (q - cle[j - 1]) / np.where(cle[j] > cle[j - 1], cle[j] - cle[j - 1], 1.0)
+    valeurs = np.where(meme, y[j - 1] + f * (y[j] - y[j - 1]), np.nan)
+    return valeurs.reshape(n_groupes, len(x_q))
+
+def distance_rabattement(Q_m3h, piezos, temps):
+    # Cooper–Jacob distance-rabattement : à chaque temps commun, régression
+    # de s sur log10(r) entre piézomètres (rabattement interpolé en log t).
+    temps = np.asarray(temps, dtype=float)
+    s_t = interpoler_groupes(piezos["groupe"], np.log(piezos["t"]), piezos["s"],
+                             len(piezos["noms"]), np.log(temps))           # (piézos, temps)
+    x = np.log10(piezos["r_piezo"])[:, None]
+    m = np.isfinite(s_t)
+    n = m.sum(axis=0)
+    x_moy = np.where(m, x, 0).sum(axis=0) / np.maximum(n, 1)
+    s_moy = np.where(m, s_t, 0).sum(axis=0) / np.maximum(n, 1)
+    dx = np.where(m, x - x_moy, 0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        pente = (dx * np.where(m, s_t - s_moy, 0)).sum(axis=0) / (dx**2).sum(axis=0)
+        Q = Q_m3h * 24
+        T = -2.3 * Q / (2 * np.pi * pente)
+        r0 = 10 ** (x_moy - s_moy / pente)
+        S = 2.25 * T * (temps / 24) / r0**2
+    pente = np.where(n >= 2, pente, np.nan)
+    return pd.DataFrame({"t (h)": temps, "piézomètres": n, "Δs par décade (m)": -pente,
+                         "T (m²/j)": np.where(n >= 2, T, np.nan), "S": np.where(n >= 2, S, np.nan),
+                         "r0 (m)": np.where(n >= 2, r0, np.nan)}), s_t
+
+# === Intervalles de confiance (bootstrap) ===
+# Mêmes méthodes que ajuster_essai. Droites de Jacob et de remontée : toutes
+# les pseudo-séries en un seul appel aux moindres carrés (second membre
+# multiple). Theis et modèles à deux paramètres : blocs de pseudo-séries
+# répartis sur le pool de processus, chaque bloc réajusté d'un seul tenant
+# (Levenberg–Marquardt empilé, jacobien analytique pour Theis, par
+# différences pour les fonctions tabulées). Un enregistrement plus long que
+# 2·POINTS_BOOTSTRAP est d'abord décimé en log t : les résidus rééchantillonnés
+# sont ceux des moyennes par classe, d'où le bootstrap par blocs par défaut.
+POINTS_BOOTSTRAP = 200
+
+def _droites_lot(x, series):
+    # series (tirages, points) ; retourne (pentes, ordonnées) de chaque droite
+    X = np.column_stack([x, np.ones_like(x)])
+    pentes, ordonnees = np.linalg.lstsq(X, series.T, rcond=None)[0]
+    return pentes, ordonnees
+
+def _reajuster_bloc(bloc):
+    nom, Q, t_j, r, x0, series = bloc
+    X0 = np.tile(x0, (len(series), 1))
+    if nom == "Theis (pompage)":
+        evaluer = lambda X: _theis_jacobien(Q, t_j, r, np.exp(X[:, :1]), np.exp(X[:, 1:]))
+        X = levenberg_marquardt_lot(lambda X, lignes: evaluer(X)[0] - series[lignes],
+                                    lambda X, lignes: evaluer(X)[1], X0, *BORNES_LN)
+        return np.exp(X)
+    noms, en_log, bas, haut = _parametres_modele(nom)
+    depuis = lambda X: np.where(en_log, np.exp(X), X)
+
+    def residus(X, lignes):
+        P = depuis(X)
+        return _rabattement_modele(nom, Q, t_j, r, {n: P[:, [k]] for k, n in enumerate(noms)}) - series[lignes]
+
+    vers = lambda x: np.where(en_log, np.log(np.where(en_log, x, 1.0)), x)
+    X = levenberg_marquardt_lot(residus, lambda X, lignes: jacobien_differences(residus, X, lignes), X0,
+                                vers(bas), vers(haut))
+    return depuis(X)
+
+def bootstrap_essai(aquifere, Q_m3h, tp, sp, r, tr=None, sr=None, t_arret=None, rapport_max=None,
+                    n_tirages=N_TIRAGES, methode="Blocs", taille_bloc=None, niveau=NIVEAU, graine=0, n_workers=None):
+    # Retourne (tableau des intervalles, {(méthode, paramètre): tirages})
+    tp, sp = np.asarray(tp, dtype=float), np.asarray(sp, dtype=float)
+    t_arret = float(np.max(tp)) if t_arret is None else t_arret
+    if len(tp) > 2 * POINTS_BOOTSTRAP:
+        tp, sp = decimer_log(tp, sp, POINTS_BOOTSTRAP)
+    if tr is not None and sr is not None and len(tr) > 2 * POINTS_BOOTSTRAP:
+        tr, sr = decimer_log(np.asarray(tr, dtype=float), np.asarray(sr, dtype=float), POINTS_BOOTSTRAP)
+    masque = (tp > 0) & np.isfinite(sp)
+    tp, sp = tp[masque], sp[masque]
+    idx = indices(len(tp), n_tirages, methode, taille_bloc, graine)
+
+    estimations, tirages, blocs = {}, {}, []
+    for res in ajuster_essai(aquifere, Q_m3h, tp, sp, r, tr, sr, t_arret, rapport_max):
+        nom = res["methode"]
+        if nom == "Jacob (pompage)":
+            x = np.log10(tp)
+            s_ajuste = np.polyval(np.polyfit(x, sp, 1), x)
+            pentes, ordonnees = _droites_lot(x, pseudo_series(s_ajuste, sp - s_ajuste, idx, 2))
+            # Droite en log t ramenée à log(t/r²), comme jacob_composite
+            T, S = _jacob_droite(Q_m3h, pentes, ordonnees + 2 * pentes * np.log10(r))
+            estimations.update({(nom, "T"): res["T"], (nom, "S"): res["S"]})
+            tirages.update({(nom, "T"): T, (nom, "S"): S})
+        elif nom == "Theis (remontée)":
+            x, s_r = _points_remontee(t_arret, tr, sr, rapport_max)
+            s_ajuste = np.polyval(np.polyfit(x, s_r, 1), x)
+            idx_r = indices(len(x), n_tirages, methode, taille_bloc, graine + 1)
+            pentes, _ = _droites_lot(x, pseudo_series(s_ajuste, s_r - s_ajuste, idx_r, 2))
+            estimations[(nom, "T")] = res["T"]
+            tirages[(nom, "T")] = 2.3 * Q_m3h * 24 / (4 * np.pi * pentes)
+        else:
+            if nom == "Theis (pompage)":
+                noms, x0 = ["T", "S"], np.log([res["T"], res["S"]])
+                s_ajuste = theis(Q_m3h, tp, r, res["T"], res["S"])
+                estimations.update({(nom, "T"): res["T"], (nom, "S"): res["S"]})
+            else:
+                noms, en_log, _, _ = _parametres_modele(nom)
+                p = np.array([res["parametres"][n] for n in noms])
+                x0, s_ajuste = np.where(en_log, np.log(np.where(en_log, p, 1.0)), p), res["s_modele"]
+                estimations.update({(nom, n): v for n, v in zip(noms, p)})
+            series = pseudo_series(s_ajuste, sp - s_ajuste, idx, len(x0))
+            blocs += [(nom, Q_m3h * 24, tp / 24, r, x0, b) for b in decouper(series)]
+            tirages.update({(nom, n): [] for n in noms})
+
+    sorties = executer_blocs(_reajuster_bloc, blocs, n_workers, "réajustements")
+    for bloc, P in zip(blocs, sorties):
+        noms = [n for m, n in tirages if m == bloc[0]]
+        for k, n in enumerate(noms):
+            tirages[(bloc[0], n)].append(P[:, k])
+    tirages = {cle: np.concatenate(v) if isinstance(v, list) else v for cle, v in tirages.items()}
+    return intervalles(estimations, tirages, niveau), tirages
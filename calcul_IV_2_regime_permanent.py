@@ -0,0 +1,420 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import scipy.special as sc
+from scipy.optimize import linprog
+from scipy.stats import norm
+
+from calcul_II_1_techniques_de_forage import puissance_pompe
+from calcul_IV_1_1_essais_par_paliers import s_max_admissible
+from taches import executer_blocs
+
+# === Calculs du régime permanent (sans Streamlit) ===
+
+# === Fonctions fondamentales ===
+def calc_transmissivite(K, e):
+    return K * e
+
+def calc_permeabilite(T, e):
+    return T / e
+
+def calc_rayon_influence(H, s):
+    return H * np.exp(2 * np.pi * s / H)
+
+def calc_vitesse(Q, S, n):
+    return Q / (S * n)
+
+# === Méthodes ===
+def thiem(Q, T, r, R):
+    return (Q / (2 * np.pi * T)) * np.log(R / r)
+
+def thiem_dupuit(Q, T, r, R, h0):
+    s = thiem(Q, T, r, R)
+    return h0 - s, s
+
+def de_glee(Q, T, r, L):
+    u = r / L
+    return (Q / (4 * np.pi * T)) * sc.expn(0, u)
+
+def hantush_drainance(Q, T, r, L):
+    u = r / L
+    return (Q / (4 * np.pi * T)) * sc.expn(0, u)
+
+def gradient_initial(Q, T, r, R, i):
+    return thiem(Q, T, r, R) + i * r
+
+def huisman(Q, T, r, R, H, h):
+    return thiem(Q, T, r, R) * (H / h)
+
+def dietz(Q, T, r, a):
+    return (Q / (4 * np.pi * T)) * np.log((a + np.sqrt(a**2 + r**2)) / r)
+
+# === Contexte
+contexts = {
+    'Nappe libre sans réalimentation': ['Q', 'T', 'r1', 'R', 'h0'],
+    'Nappe captive sans réalimentation': ['Q', 'T', 'r1', 'R'],
+    'Nappe semi-captive (drainance)': ['Q', 'T', 'r1', 'L'],
+    'Nappe libre réalimentée': ['Q', 'T', 'r1', 'L'],
+    'Nappe libre à substratum incliné': ['Q', 'T', 'r1', 'L'],
+    'Nappe captive avec gradient initial': ['Q', 'T', 'r1', 'R', 'i'],
+    'Aquifère à frontière rectiligne': ['Q', 'T', 'r1', 'a'],
+    'Aquifère à pénétration partielle': ['Q', 'T', 'r1', 'R', 'H', 'h'],
+    'Aquifère bicouche': ['Q', 'T', 'r1', 'L'],
+    'Aquifère incliné à épaisseur constante': ['Q', 'T', 'r1', 'R', 'i'],
+    'Nappe semi-libre': ['Q', 'T', 'r1', 'r2', 'h1', 'h2', 'e']
+}
+
+# === Rabattement selon le contexte ===
+# p : dictionnaire des paramètres du contexte, scalaires ou tableaux numpy
+# (les noyaux sont vectorisés, ce qui sert aussi au tirage Monte-Carlo).
+def rabattement_contexte(contexte, p):
+    if contexte == 'Nappe libre sans réalimentation':
+        _, s = thiem_dupuit(p['Q'], p['T'], p['r1'], p['R'], p['h0'])
+        methode = "Thiem-Dupuit"
+    elif contexte == 'Nappe captive sans réalimentation':
+        s = thiem(p['Q'], p['T'], p['r1'], p['R'])
+        methode = "Thiem"
+    elif contexte == 'Nappe semi-captive (drainance)':
+        s = (de_glee(p['Q'], p['T'], p['r1'], p['L']) +
+             hantush_drainance(p['Q'], p['T'], p['r1'], p['L'])) / 2
+        methode = "De Glee & Hantush"
+    elif contexte == 'Nappe libre réalimentée':
+        s = hantush_drainance(p['Q'], p['T'], p['r1'], p['L'])
+        methode = "Hantush"
+    elif contexte == 'Nappe libre à substratum incliné':
+        s = hantush_drainance(p['Q'], p['T'], p['r1'], p['L'])
+        methode = "Hantush inclinée"
+    elif contexte == 'Nappe captive avec gradient initial':
+        s = gradient_initial(p['Q'], p['T'], p['r1'], p['R'], p['i'])
+        methode = "Hantush + gradient"
+    elif contexte == 'Aquifère à frontière rectiligne':
+        s = dietz(p['Q'], p['T'], p['r1'], p['a'])
+        methode = "Dietz"
+    elif contexte == 'Aquifère à pénétration partielle':
+        s = huisman(p['Q'], p['T'], p['r1'], p['R'], p['H'], p['h'])
+        methode = "Huisman"
+    elif contexte == 'Aquifère bicouche':
+        s = de_glee(p['Q'], p['T'], p['r1'], p['L'])
+        methode = "De Glee (bicouche)"
+    elif contexte == 'Aquifère incliné à épaisseur constante':
+        s = gradient_initial(p['Q'], p['T'], p['r1'], p['R'], p['i'])
+        methode = "Hantush incliné"
+    elif contexte == 'Nappe semi-libre':
+        s = p['h1'] - p['h2']
+        methode = "Estimation semi-libre"
+    else:
+        raise ValueError(f"Contexte inconnu : {contexte}")
+    return s, methode
+
+def estimation_K_semi_libre(p):
+    delta_h = p['h1'] - p['h2']
+    ln_ratio = np.log(p['r2'] / p['r1'])
+    return (delta_h * p['e'] * np.pi) / (ln_ratio * p['Q'])
+
+# === Champ de puits : rabattement 2-D par superposition ===
+# Les noyaux ci-dessus acceptent des tableaux : r a la forme (points, puits)
+# et Q la forme (puits,), la somme sur l'axe des puits donne le rabattement.
+ELEMENTS_MAX_BLOC = 4_000_000
+
+MODELES_CHAMP = ["Thiem", "De Glee"]
+NATURES_FRONTIERE = ["Imperméable", "Alimentation"]
+
+
+def puits_images(puits_xy, Q, frontiere):
+    # frontiere = (x0, y0, angle_normale_deg, nature) ; puits image symétrique
+    # par rapport à la droite, de débit +Q (imperméable) ou -Q (alimentation)
+    x0, y0, angle, nature = frontiere
+    n = np.array([np.cos(np.radians(angle)), np.sin(np.radians(angle))])
+    d = (puits_xy - [x0, y0]) @ n
+    images = puits_xy - 2 * d[:, None] * n
+    signe = -1.0 if nature == "Alimentation" else 1.0
+    return np.vstack([puits_xy, images]), np.r_[Q, signe * Q]
+
+def _rabattement_bloc(r2, Q, T, modele, R, L):
+    if modele == "Thiem":
+        # Σ thiem(Q_i, T, r_i, R) = [Σ Q_i ln R - ½ Σ Q_i ln r_i²] / 2πT, au-delà de R nul
+        np.minimum(r2, R**2, out=r2)
+        return (Q.sum() * np.log(R) - 0.5 * (np.log(r2) @ Q)) / (2 * np.pi * T)
+    return de_glee(Q, T, np.sqrt(r2), L).sum(axis=1)
+
+def rabattement_points(points_xy, puits_xy, Q, T, modele="Thiem", R=None, L=None,
+                       rw=0.1, frontiere=None):
+    points_xy = np.asarray(points_xy, dtype=float).reshape(-1, 2)
+    puits_xy = np.asarray(puits_xy, dtype=float).reshape(-1, 2)
+    Q = np.asarray(Q, dtype=float).reshape(-1)
+    if frontiere is not None:
+        puits_xy, Q = puits_images(puits_xy, Q, frontiere)
+
+    s = np.empty(len(points_xy))
+    bloc = max(1, ELEMENTS_MAX_BLOC // max(len(Q), 1))
+    for i in range(0, len(points_xy), bloc):
+        p = points_xy[i:i + bloc]
+        dx = p[:, None, 0] - puits_xy[None, :, 0]
+        dy = p[:, None, 1] - puits_xy[None, :, 1]
+        r2 = np.maximum(dx * dx + dy * dy, rw**2)
+        s[i:i + bloc] = _rabattement_bloc(r2, Q, T, modele, R, L)
+    return s
+
+def grille_rabattement(puits_xy, Q, T, etendue, n=(200, 200), **options):
+    # etendue = (xmin, xmax, ymin, ymax) ; retourne x (nx,), y (ny,), s (ny, nx)
+    xmin, xmax, ymin, ymax = etendue
+    x = np.linspace(xmin, xmax, n[0])
+    y = np.linspace(ymin, ymax, n[1])
+    X, Y = np.meshgrid(x, y)
+    s = rabattement_points(np.column_stack([X.ravel(), Y.ravel()]), puits_xy, Q, T, **options)
+    return x, y, s.reshape(len(y), len(x))
+
+# === Incertitude : Monte-Carlo et sensibilités ===
+# lois : {paramètre: (loi, a, b)} avec
+#   Fixe (a), Uniforme (min a, max b), Normale (moyenne a, écart-type b),
+#   Lognormale (médiane a, écart-type de ln b)
+LOIS = ["Fixe", "Uniforme", "Normale", "Lognormale"]
+PERCENTILES = [10, 50, 90]
+TIRAGES_PAR_BLOC = 250_000
+
+
+def tirer(loi, a, b, n, rng):
+    if loi == "Fixe":
+        return np.full(n, float(a))
+    if loi == "Uniforme":
+        return rng.uniform(a, b, n)
+    if loi == "Normale":
+        return rng.normal(a, b, n)
+    if loi == "Lognormale":
+        return a * np.exp(rng.normal(0.0, b, n))
+    raise ValueError(f"Loi inconnue : {loi}")
+
+def _quantile_loi(loi, a, b, q):
+    # Quantile de la loi, pour l'analyse en tornade
+    if loi == "Fixe":
+        return float(a)
+    if loi == "Uniforme":
+        return a + q * (b - a)
+    if loi == "Normale":
+        return a + b * norm.ppf(q)
+    return a * np.exp(b * norm.ppf(q))
+
+def _evaluer_bloc(args):
+    contexte, lois, n, H, graine = args
+    rng = np.random.default_rng(graine)
+    p = {nom: tirer(*loi, n, rng) for nom, loi in lois.items()}
+    with np.errstate(all="ignore"):
+        s, _ = rabattement_contexte(contexte, p)
+        R = calc_rayon_influence(H, s)
+    return np.column_stack([p[nom] for nom in lois]), np.asarray(s, dtype=float), R
+
+def _sobol_premier_ordre(X, y, n_classes=50):
+    # Indice de premier ordre Var(E[y|x_i]) / Var(y), estimé par classes
+    # d'effectifs égaux sur chaque paramètre (rapport de corrélation)
+    var = np.var(y)
+    indices = np.zeros(X.shape[1])
+    if var == 0:
+        return indices
+    rangs = np.argsort(np.argsort(X, axis=0, kind="stable"), axis=0)
+    classes = (rangs * n_classes) // len(y)
+    for j in range(X.shape[1]):
+        if np.ptp(X[:, j]) == 0:
+            continue
+        compte = np.bincount(classes[:, j], minlength=n_classes)
+        moyennes = np.bincount(classes[:, j], y, minlength=n_classes) / np.maximum(compte, 1)
+        indices[j] = np.sum(compte * (moyennes - y.mean())**2) / len(y) / var
+    return indices
+
+def tornade(contexte, lois, q_bas=0.1, q_haut=0.9):
+    # Rabattement aux quantiles bas / haut de chaque paramètre, les autres à leur médiane
+    mediane = {nom: _quantile_loi(*loi, 0.5) for nom, loi in lois.items()}
+    s_ref, _ = rabattement_contexte(contexte, mediane)
+    lignes = []
+    for nom, loi in lois.items():
+        bas = rabattement_contexte(contexte, dict(mediane, **{nom: _quantile_loi(*loi, q_bas)}))[0]
+        haut = rabattement_contexte(contexte, dict(mediane, **{nom: _quantile_loi(*loi, q_haut)}))[0]
+        lignes.append((nom, float(bas), float(haut)))
+    lignes.sort(key=lambda l: -abs(l[2] - l[1]))
+    return float(s_ref), lignes
+
+def monte_carlo_contexte(contexte, lois, n=100_000, H=20.0, graine=None, n_workers=None):
+    graines = np.random.SeedSequence(graine).spawn(-(-n // TIRAGES_PAR_BLOC))
+    taches = [(contexte, lois, min(TIRAGES_PAR_BLOC, n - k * TIRAGES_PAR_BLOC), H, g)
+              for k, g in enumerate(graines)]
+    blocs = executer_blocs(_evaluer_bloc, taches, n_workers, "tirages")
+
+    X = np.vstack([b[0] for b in blocs])
+    s = np.concatenate([b[1] for b in blocs])
+    R = np.concatenate([b[2] for b in blocs])
+    valides = np.isfinite(s) & np.isfinite(R)
+
+    percentiles = {
+        "s (m)": np.percentile(s[valides], PERCENTILES) if valides.any() else np.full(3, np.nan),
+        "R (m)": np.percentile(R[valides], PERCENTILES) if valides.any() else np.full(3, np.nan),
+    }
+    sobol = _sobol_premier_ordre(X[valides], s[valides]) if valides.sum() > 1 else np.zeros(len(lois))
+    return {
+        "n": n, "n_valides": int(valides.sum()),
+        "percentiles": percentiles,
+        "moyenne": {"s (m)": float(np.mean(s[valides])), "R (m)": float(np.mean(R[valides]))},
+        "sobol": dict(zip(lois, sobol)),
+        "s": s[valides],
+    }
+
+# === Optimisation de l'exploitation d'un champ captant ===
+# Le rabattement est linéaire en Q : aux puits et aux points de contrôle,
+# s = A·Q, où la matrice d'influence A (m par m³/h) ne dépend que de
+# l'implantation, de T et du modèle. Elle est calculée une fois par
+# implantation et gardée en cache ; changer les consignes (s_max, puissance,
+# débit cible) ne demande qu'un nouveau programme linéaire (HiGHS), résolu en
+# quelques millisecondes pour des centaines de puits.
+# Unités : x, y, rw, R, L en m ; Q en m³/h ; T en m²/j ; puissance en kW.
+MATRICES_CONSERVEES = 16
+COLONNES_CHAMP = ["x", "y"]
+LIMITES = {"rabattement": "s_max atteint", "pompe": "puissance de la pompe", "capacite": "débit maximal",
+           "point": "point de contrôle", "arret": "arrêté (interférences)"}
+
+_matrices = OrderedDict()
+_verrou_matrices = threading.Lock()
+
+
+def _noyau_unitaire(r, T, modele, R, L):
+    # Rabattement (m) pour 1 m³/h, T en m²/j
+    Q = 24.0
+    if modele == "Thiem":
+        return np.where(r < R, thiem(Q, T, r, R), 0.0)
+    return de_glee(Q, T, r, L)
+
+def matrice_influence(cibles_xy, puits_xy, T, modele="Thiem", R=None, L=None, rw=0.1, frontiere=None):
+    # (cibles, puits) : rabattement à chaque cible pour 1 m³/h à chaque puits ;
+    # un puits image (frontière) s'ajoute à la colonne de son puits réel
+    cibles_xy = np.asarray(cibles_xy, dtype=float).reshape(-1, 2)
+    puits_xy = np.asarray(puits_xy, dtype=float).reshape(-1, 2)
+    n = len(puits_xy)
+    sources, signes = puits_xy, np.ones(n)
+    if frontiere is not None:
+        sources, signes = puits_images(puits_xy, signes, frontiere)
+    r = np.sqrt(((cibles_xy[:, None, :] - sources[None, :, :]) ** 2).sum(axis=2))
+    K = _noyau_unitaire(np.maximum(r, rw), T, modele, R, L) * signes
+    return K[:, :n] + (K[:, n:] if frontiere is not None else 0.0)
+
+def _empreinte_champ(*valeurs):
+    h = hashlib.blake2b(digest_size=20)
+    for v in valeurs:
+        if isinstance(v, np.ndarray):
+            h.update(f"{v.shape}".encode())
+            h.update(np.ascontiguousarray(v, dtype=float).tobytes())
+        else:
+            h.update(repr(v).encode())
+    return h.hexdigest()
+
+def influence_champ(puits_xy, points_xy, T, modele="Thiem", R=None, L=None, rw=0.1, frontiere=None):
+    # Retourne (A puits×puits, C points×puits), mis en cache par implantation
+    puits_xy = np.asarray(puits_xy, dtype=float).reshape(-1, 2)
+    points_xy = np.asarray(points_xy, dtype=float).reshape(-1, 2)
+    cle = _empreinte_champ(puits_xy, points_xy, T, modele, R, L, rw, frontiere)
+    with _verrou_matrices:
+        if cle in _matrices:
+            _matrices.move_to_end(cle)
+            return _matrices[cle]
+    M = matrice_influence(np.vstack([puits_xy, points_xy]), puits_xy, T, modele, R, L, rw, frontiere)
+    matrices = (M[:len(puits_xy)], M[len(puits_xy):])
+    with _verrou_matrices:
+        _matrices[cle] = matrices
+        while len(_matrices) > MATRICES_CONSERVEES:
+            _matrices.popitem(last=False)
+    return matrices
+
+def optimiser_debits(A, s_max, C=None, s_lim=None, q_max=None, cout=None, cible=None, budget=None):
+    # Sans cible : débit total maximal. Avec cible (m³/h) : débit total imposé
+    # au moindre coût Σ cout·Q (puissance absorbée). budget : borne de Σ cout·Q.
+    n = A.shape[0]
+    q_max = np.full(n, np.inf) if q_max is None else np.asarray(q_max, dtype=float)
+    cout = np.zeros(n) if cout is None else np.asarray(cout, dtype=float)
+    lignes, bornes = [A], [np.asarray(s_max, dtype=float)]
+    if C is not None and len(C):
+        lignes.append(C)
+        bornes.append(np.asarray(s_lim, dtype=float))
+    if budget is not None:
+        lignes.append(cout[None, :])
+        bornes.append([budget])
+    A_ub, b_ub = np.vstack(lignes), np.concatenate(bornes)
+    if cible is None:
+        c, A_eq, b_eq = -np.ones(n), None, None
+    else:
+        c, A_eq, b_eq = cout, np.ones((1, n)), [cible]
+    res = linprog(c, A_ub=A_ub, b_ub=b_ub, A_eq=A_eq, b_eq=b_eq,
+                  bounds=np.column_stack([np.zeros(n), np.where(np.isfinite(q_max), q_max, None)]),
+                  method="highs")
+    if res.status != 0:
+        return {"statut": res.message, "Q": None}
+    Q = res.x
+    # Multiplicateurs : gain de débit total (ou de coût) par mètre de s_max en plus
+    marginaux = -res.ineqlin.marginals
+    return {"statut": "optimal", "Q": Q, "s": A @ Q, "s_points": C @ Q if C is not None else np.empty(0),
+            "gain_s_max": marginaux[:n], "gain_points": marginaux[n:n + (0 if C is None else len(C))],
+            "objectif": float(res.fun)}
+
+def debit_max_pompe(puissance_kW, hmt, rendement):
+    # Débit (m³/h) permis par la puissance de la pompe (formule de II.1)
+    par_m3h, _ = puissance_pompe(1.0, np.asarray(hmt, dtype=float), np.asarray(rendement, dtype=float))
+    return np.asarray(puissance_kW, dtype=float) * 1000 / par_m3h
+
+def optimiser_champ(puits, T, points=None, cible=None, budget_kW=None, modele="Thiem", R=None, L=None,
+                    rw=0.1, frontiere=None):
+    # puits : x, y et s_max (ou H, nappe_type : s_max de IV.1.1) ; colonnes
+    # optionnelles q_max (m³/h), puissance_kW, hmt (m, hors rabattement),
+    # rendement. La puissance est bornée avec le rabattement maximal admis :
+    # HMT = hmt + s_max, hypothèse défavorable qui garde le problème linéaire.
+    # points : x, y, s_lim.
+    manquantes = [c for c in COLONNES_CHAMP if c not in puits]
+    if manquantes:
+        raise ValueError(f"Colonnes manquantes : {', '.join(manquantes)}")
+    n = len(puits)
+    if "s_max" in puits:
+        s_max = puits["s_max"].to_numpy(dtype=float)
+    elif "H" in puits:
+        nappe = puits["nappe_type"].to_numpy() if "nappe_type" in puits else np.full(n, "libre")
+        s_max = s_max_admissible(puits["H"].to_numpy(dtype=float), nappe)
+    else:
+        raise ValueError("Colonne s_max (ou H) manquante")
+    q_max = puits["q_max"].to_numpy(dtype=float) if "q_max" in puits else np.full(n, np.inf)
+    q_max = np.where(np.isfinite(q_max) & (q_max > 0), q_max, np.inf)
+    hmt = (puits["hmt"].to_numpy(dtype=float) if "hmt" in puits else np.zeros(n)) + s_max
+    rendement = puits["rendement"].to_numpy(dtype=float) if "rendement" in puits else np.full(n, 0.65)
+    cout = puissance_pompe(1.0, hmt, rendement)[0] / 1000                       # kW par m³/h
+    q_pompe = np.full(n, np.inf)
+    if "puissance_kW" in puits:
+        p = puits["puissance_kW"].to_numpy(dtype=float)
+        q_pompe = np.where(np.isfinite(p) & (p > 0), debit_max_pompe(p, hmt, rendement), np.inf)
+
+    puits_xy = puits[COLONNES_CHAMP].to_numpy(dtype=float)
+    points_xy = np.empty((0, 2)) if points is None else points[COLONNES_CHAMP].to_numpy(dtype=float)
+    s_lim = None if points is None else points["s_lim"].to_numpy(dtype=float)
+    A, C = influence_champ(puits_xy, points_xy, T, modele, R, L, rw, frontiere)
+    borne = np.minimum(q_max, q_pompe)
+    res = optimiser_debits(A, s_max, C, s_lim, borne, cout, cible, budget_kW)
+    if res["Q"] is None:
+        return None, None, res
+
+    Q = res["Q"]
+    tolerance = 1e-6 * np.maximum(1.0, np.abs(s_max))
+    limite = np.full(n, "-", dtype=object)
+    limite[Q >= q_max * (1 - 1e-9)] = LIMITES["capacite"]
+    limite[Q >= q_pompe * (1 - 1e-9)] = LIMITES["pompe"]
+    limite[res["s"] >= s_max - tolerance] = LIMITES["rabattement"]
+    libres = limite == "-"
+    if len(res["gain_points"]) and (res["gain_points"] > 0).any():
+        limite[libres & (Q > 0)] = LIMITES["point"]
+    limite[libres & (Q <= 1e-9)] = LIMITES["arret"]
+    tableau = pd.DataFrame({
+        "Q (m³/h)": Q, "s (m)": res["s"], "s_max (m)": s_max, "marge (m)": s_max - res["s"],
+        "Q pompe max (m³/h)": q_pompe, "puissance (kW)": cout * Q,
+        "gain par m de s_max (m³/h)": res["gain_s_max"], "limite": limite,
+    }, index=puits.index)
+    tableau_points = None
+    if points is not None and len(points):
+        tableau_points = pd.DataFrame({"s (m)": res["s_points"], "s_lim (m)": s_lim,
+                                       "marge (m)": s_lim - res["s_points"],
+                                       "gain par m de s_lim (m³/h)": res["gain_points"]}, index=points.index)
+    res["Q_total"] = float(Q.sum())
+    res["puissance_totale_kW"] = float(cout @ Q)
+    return tableau, tableau_points, res
@@ -0,0 +1,276 @@
+import os
+import tempfile
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from scipy.special import loggamma
+
+from taches import executer_blocs
+
+# === Sondages électriques verticaux (sans Streamlit) ===
+# Unités : espacements (AB/2 en Schlumberger, a en Wenner) et épaisseurs en
+# m, résistivités en Ω·m. Un modèle est un terrain tabulaire : n couches de
+# résistivités ρ et n − 1 épaisseurs h (la dernière couche est infinie).
+
+DISPOSITIFS = ["Schlumberger", "Wenner"]
+COLONNES_SONDAGES = ["sondage", "espacement", "rho_a"]
+
+# Filtre numérique linéaire : POINTS_PAR_DECADE coefficients par décade,
+# abscisses ln b dans FENETRE_FILTRE (au-delà, la transformée de résistivité
+# est constante : la queue du filtre est reportée sur le coefficient extrême)
+POINTS_PAR_DECADE = 10
+FENETRE_FILTRE = (-12.0, 10.0)
+N_FREQUENCES = 20001
+REPERTOIRE_TABLES = os.path.join(tempfile.gettempdir(), "soufilab_tables")
+VERSION_FILTRES = 1
+ELEMENTS_MAX_BLOC = 1_000_000
+
+# Bornes physiques de l'inversion
+BORNES_RHO = (0.1, 1e5)
+BORNES_H = (0.1, 1e4)
+ITERATIONS_MAX = 50
+AMORTISSEMENTS = np.array([0.1, 1.0, 10.0])  # facteurs essayés à chaque itération
+
+
+# === Filtre numérique linéaire ===
+# En variables logarithmiques (x = ln espacement, y = −ln λ), la résistivité
+# apparente est la convolution de la transformée T(λ) par un noyau h(x − y)
+# dont la transformée de Fourier est connue sous forme fermée :
+#   Schlumberger h(u) = e^{2u} J1(e^u)
+#       H(ω) = 2^{1−iω} Γ((3−iω)/2) / Γ((1+iω)/2)
+#   Wenner       h(u) = 2e^u [J0(e^u) − J0(2e^u)]
+#       H(ω) = 2 (2^{−iω} − 1/2) Γ((1−iω)/2) / Γ((1+iω)/2)
+# Les coefficients sont les échantillons de h filtré passe-bas (fenêtre en
+# cosinus² sur la moitié haute de la bande), calculés par quadrature de
+# H(ω) e^{iωu}. H(0) = 1 : un terrain homogène est restitué exactement.
+# La conception (≈ 1 s) est faite une fois puis lue sur disque, comme les
+# tables des fonctions de puits : les processus du pool n'en paient pas le coût.
+def _transfert(dispositif, omega):
+    mu = -1j * omega
+    if dispositif == "Schlumberger":
+        return np.exp((1 + mu) * np.log(2) + loggamma((3 + mu) / 2) - loggamma((1 - mu) / 2))
+    if dispositif == "Wenner":
+        return 2 * (np.exp(mu * np.log(2)) - 0.5) * np.exp(loggamma((1 + mu) / 2) - loggamma((1 - mu) / 2))
+    raise ValueError(f"Dispositif inconnu : {dispositif}")
+
+@lru_cache(maxsize=None)
+def filtre(dispositif="Schlumberger"):
+    # Retourne (b, w) : ρa(s) = Σ w_k T(b_k / s)
+    chemin = os.path.join(REPERTOIRE_TABLES, f"filtre_{dispositif.lower()}_v{VERSION_FILTRES}_{POINTS_PAR_DECADE}.npz")
+    if os.path.exists(chemin):
+        with np.load(chemin) as f:
+            return f["b"], f["w"]
+    b, w = _concevoir_filtre(dispositif)
+    try:
+        os.makedirs(REPERTOIRE_TABLES, exist_ok=True)
+        temporaire = f"{chemin}.{os.getpid()}.tmp.npz"
+        np.savez(temporaire, b=b, w=w)
+        os.replace(temporaire, chemin)
+    except OSError:
+        pass
+    return b, w
+
+def _concevoir_filtre(dispositif):
+    pas = np.log(10) / POINTS_PAR_DECADE
+    omega_max = np.pi / pas
+    omega = np.linspace(0.0, omega_max, N_FREQUENCES)
+    x = omega / omega_max
+    fenetre = np.where(x < 0.5, 1.0, np.cos(np.pi * (x - 0.5)) ** 2)
+    H = _transfert(dispositif, omega) * fenetre
+
+    # Échantillons sur une fenêtre élargie, puis repli des queues
+    marge = 20 * pas * POINTS_PAR_DECADE
+    u = pas * np.arange(np.floor((FENETRE_FILTRE[0] - marge) / pas), np.ceil((FENETRE_FILTRE[1] + marge) / pas) + 1)
+    w = np.empty(len(u))
+    for i in range(0, len(u), 64):
+        w[i:i + 64] = pas / np.pi * np.trapezoid((H[None, :] * np.exp(1j * omega[None, :] * u[i:i + 64, None])).real,
+                                                 omega, axis=1)
+    dedans = np.flatnonzero((u >= FENETRE_FILTRE[0]) & (u <= FENETRE_FILTRE[1]))
+    debut, fin = dedans[0], dedans[-1]
+    coefficients = w[debut:fin + 1].copy()
+    coefficients[0] += w[:debut].sum()
+    coefficients[-1] += w[fin + 1:].sum()
+    return np.exp(u[debut:fin + 1]), coefficients
+
+# === Modèle direct ===
+def transformee_resistivite(rho, h, lam):
+    # Récurrence de Pekeris depuis la couche inférieure.
+    # rho (M, n), h (M, n − 1), lam (...) → T (M, ...)
+    forme = (slice(None),) + (None,) * np.ndim(lam)
+    T = np.broadcast_to(rho[:, -1][forme], (len(rho),) + np.shape(lam)).copy()
+    for i in range(h.shape[1] - 1, -1, -1):
+        th = np.tanh(lam * h[:, i][forme])
+        r = rho[:, i][forme]
+        T = (T + r * th) / (1 + T * th / r)
+    return T
+
+def resistivite_apparente(rho, h, espacements, dispositif="Schlumberger"):
+    # Un modèle (rho (n,), h (n − 1,)) → (S,) ; M modèles (rho (M, n),
+    # h (M, n − 1)) → (M, S). Tous les espacements et tous les modèles sont
+    # évalués ensemble, par blocs de modèles pour borner la mémoire.
+    rho = np.asarray(rho, dtype=float)
+    h = np.asarray(h, dtype=float)
+    un_seul = rho.ndim == 1
+    rho, h = np.atleast_2d(rho), np.atleast_2d(h).reshape(len(np.atleast_2d(rho)), -1)
+    espacements = np.asarray(espacements, dtype=float)
+    b, w = filtre(dispositif)
+    lam = b[None, :] / espacements[:, None]                          # (S, K)
+    rho_a = np.empty((len(rho), len(espacements)))
+    bloc = max(1, ELEMENTS_MAX_BLOC // lam.size)
+    for i in range(0, len(rho), bloc):
+        rho_a[i:i + bloc] = transformee_resistivite(rho[i:i + bloc], h[i:i + bloc], lam) @ w
+    return rho_a[0] if un_seul else rho_a
+
+# === Lecture des sondages ===
+def preparer_sondages(df):
+    # Table longue (sondage, espacement, rho_a) ; sans colonne sondage, un
+    # seul sondage. Retourne {nom: (espacements triés, rho_a)}.
+    manquantes = [c for c in COLONNES_SONDAGES[1:] if c not in df.columns]
+    if manquantes:
+        raise ValueError(f"Colonnes manquantes : {', '.join(manquantes)}")
+    if "sondage" not in df.columns:
+        df = df.assign(sondage="sondage")
+    esp = df["espacement"].to_numpy(dtype=float)
+    rho_a = df["rho_a"].to_numpy(dtype=float)
+    garder = (esp > 0) & (rho_a > 0) & np.isfinite(esp) & np.isfinite(rho_a)
+    sondages = {}
+    for nom, indices in pd.Series(np.flatnonzero(garder)).groupby(df["sondage"].to_numpy()[garder]):
+        i = indices.to_numpy()
+        ordre = np.argsort(esp[i], kind="stable")
+        sondages[nom] = (esp[i][ordre], rho_a[i][ordre])
+    return sondages
+
+# === Inversion par moindres carrés amortis ===
+# Paramètres x = (ln ρ1…ρn, ln h1…h_{n−1}) ; résidus en ln ρa. À chaque
+# itération, les n_p + 1 modèles du jacobien (différences finies) sont
+# évalués en un seul appel au modèle direct, puis les pas de Marquardt pour
+# plusieurs amortissements sont essayés eux aussi en un seul appel.
+def _vers_modele(x, n_couches):
+    p = np.exp(np.atleast_2d(x))
+    return p[:, :n_couches], p[:, n_couches:]
+
+def _bornes(n_couches):
+    bas = np.log(np.r_[np.full(n_couches, BORNES_RHO[0]), np.full(n_couches - 1, BORNES_H[0])])
+    haut = np.log(np.r_[np.full(n_couches, BORNES_RHO[1]), np.full(n_couches - 1, BORNES_H[1])])
+    return bas, haut
+
+def modele_depart(espacements, rho_a, n_couches):
+    # Interfaces réparties en log entre le plus petit et le tiers du plus grand
+    # espacement ; chaque couche prend la résistivité apparente lue à sa profondeur
+    espacements = np.asarray(espacements, dtype=float)
+    if n_couches == 1:
+        return np.array([np.exp(np.mean(np.log(rho_a)))]), np.empty(0)
+    profondeurs = np.geomspace(espacements.min(), max(espacements.max() / 3, 2 * espacements.min()), n_couches - 1)
+    lecture = np.r_[espacements.min(), np.sqrt(profondeurs[:-1] * profondeurs[1:]), espacements.max()]
+    rho = np.exp(np.interp(np.log(lecture), np.log(espacements), np.log(rho_a)))
+    return rho, np.diff(np.r_[0.0, profondeurs])
+
+def inverser(espacements, rho_a, n_couches, depart=None, dispositif="Schlumberger",
+             iterations=ITERATIONS_MAX, tolerance=1e-4):
+    espacements = np.asarray(espacements, dtype=float)
+    d = np.log(np.asarray(rho_a, dtype=float))
+    rho0, h0 = modele_depart(espacements, rho_a, n_couches) if depart is None else depart
+    bas, haut = _bornes(n_couches)
+    x = np.clip(np.log(np.r_[rho0, h0]), bas, haut)
+    n_p = len(x)
+    pas_fd = 1e-4
+
+    def residus(X):
+        return np.log(resistivite_apparente(*_vers_modele(X, n_couches), espacements, dispositif)) - d
+
+    r = residus(x)[0]
+    phi = r @ r
+    amortissement = 1.0
+    k = 0
+    for k in range(1, iterations + 1):
+        X = x + np.vstack([np.zeros(n_p), pas_fd * np.eye(n_p)])
+        R = residus(X)
+        r = R[0]
+        J = ((R[1:] - r) / pas_fd).T                                   # (S, n_p)
+        JtJ, Jtr = J.T @ J, J.T @ r
+        diagonale = np.diag(JtJ) + 1e-12
+        essais = amortissement * AMORTISSEMENTS
+        pas = np.stack([np.linalg.solve(JtJ + m * np.diag(diagonale), -Jtr) for m in essais])
+        candidats = np.clip(x + pas, bas, haut)
+        R_c = residus(candidats)
+        phi_c = np.einsum("ij,ij->i", R_c, R_c)
+        j = int(np.nanargmin(phi_c))
+        if not phi_c[j] < phi:
+            amortissement *= 10
+            if amortissement > 1e8:
+                break
+            continue
+        gain = (phi - phi_c[j]) / max(phi, 1e-300)
+        x, phi, amortissement = candidats[j], phi_c[j], max(essais[j] / 3, 1e-6)
+        if gain < tolerance:
+            break
+    rho, h = _vers_modele(x, n_couches)
+    return {"rho": rho[0], "h": h[0], "rmse": float(np.sqrt(phi / len(d))), "iterations": k,
+            "rho_a_modele": np.exp(d + residus(x)[0])}
+
+# === Départs multiples ===
+def _inverser_departs(args):
+    espacements, rho_a, n_couches, departs, dispositif = args
+    return [inverser(espacements, rho_a, n_couches, depart, dispositif) for depart in departs]
+
+def departs_aleatoires(espacements, rho_a, n_couches, n_departs, graine=None, dispersion=1.0):
+    # Le premier départ est le modèle lu sur la courbe ; les autres le
+    # perturbent en log (écart-type « dispersion »)
+    rho0, h0 = modele_depart(espacements, rho_a, n_couches)
+    rng = np.random.default_rng(graine)
+    bas, haut = _bornes(n_couches)
+    x = np.log(np.r_[rho0, h0])
+    X = np.clip(x + dispersion * rng.normal(size=(n_departs, len(x))), bas, haut)
+    X[0] = np.clip(x, bas, haut)
+    rho, h = _vers_modele(X, n_couches)
+    return list(zip(rho, h))
+
+def inverser_multidepart(espacements, rho_a, n_couches, n_departs=16, dispositif="Schlumberger",
+                         graine=None, n_workers=None):
+    # Meilleure inversion parmi n_departs, et tableau de tous les départs
+    departs = departs_aleatoires(espacements, rho_a, n_couches, n_departs, graine)
+    n_workers = n_workers or os.cpu_count() or 1
+    taille = -(-len(departs) // n_workers)
+    blocs = [(espacements, rho_a, n_couches, departs[i:i + taille], dispositif)
+             for i in range(0, len(departs), taille)]
+    resultats = [r for bloc in executer_blocs(_inverser_departs, blocs, n_workers, "départs") for r in bloc]
+    meilleur = min(resultats, key=lambda r: r["rmse"])
+    tableau = pd.DataFrame([{"départ": k + 1, "écart (% en log)": 100 * r["rmse"], "itérations": r["iterations"],
+                             **{f"ρ{i + 1} (Ω·m)": v for i, v in enumerate(r["rho"])},
+                             **{f"h{i + 1} (m)": v for i, v in enumerate(r["h"])}}
+                            for k, r in enumerate(resultats)]).sort_values("écart (% en log)", kind="stable")
+    return meilleur, tableau
+
+# === Campagne : inversion de nombreux sondages ===
+def _inverser_sondages(args):
+    sondages, n_couches, n_departs, dispositif, graine = args
+    sortie = []
+    for nom, (espacements, rho_a) in sondages:
+        departs = departs_aleatoires(espacements, rho_a, n_couches, n_departs, graine)
+        res = min((inverser(espacements, rho_a, n_couches, dep, dispositif) for dep in departs),
+                  key=lambda r: r["rmse"])
+        sortie.append((nom, res))
+    return sortie
+
+def inverser_lot(sondages, n_couches, n_departs=4, dispositif="Schlumberger", graine=0, n_workers=None,
+                 taille_bloc=8):
+    # sondages : {nom: (espacements, rho_a)} ; une ligne par sondage
+    elements = list(sondages.items())
+    blocs = [(elements[i:i + taille_bloc], n_couches, n_departs, dispositif, graine)
+             for i in range(0, len(elements), taille_bloc)]
+    resultats = dict(r for bloc in executer_blocs(_inverser_sondages, blocs, n_workers, "sondages") for r in bloc)
+    lignes = []
+    for nom, res in resultats.items():
+        ligne = {"sondage": nom, "points": len(sondages[nom][0]), "ecart_pct": 100 * res["rmse"],
+                 "iterations": res["iterations"]}
+        ligne.update({f"rho{i + 1}_ohmm": v for i, v in enumerate(res["rho"])})
+        ligne.update({f"h{i + 1}_m": v for i, v in enumerate(res["h"])})
+        lignes.append(ligne)
+    return pd.DataFrame(lignes), resultats
+
+def tableau_couches(rho, h):
+    profondeur = np.r_[0.0, np.cumsum(h)]
+    return pd.DataFrame({"Couche": np.arange(1, len(rho) + 1), "ρ (Ω·m)": rho,
+                         "Épaisseur (m)": np.r_[h, np.nan], "Toit (m)": profondeur,
+                         "Mur (m)": np.r_[profondeur[1:], np.nan]})
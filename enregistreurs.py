@@ -0,0 +1,208 @@
+import csv
+import hashlib
+import io
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from saisie import virgule_decimale
+
+# === Fichiers d'enregistreurs de pression (CSV / TSV) ===
+# Lecture par blocs depuis le fichier téléversé (ou un chemin), directement
+# vers un fichier binaire de travail relu en mémoire partagée (np.memmap) :
+# ni le texte ni le tableau ne sont copiés en entier en mémoire. La clé est
+# l'empreinte du contenu, calculée elle aussi par morceaux : un même fichier
+# téléversé par plusieurs sessions n'est converti et stocké qu'une fois.
+#
+# Le répertoire de travail est purgé à chaque conversion : fichiers inutilisés
+# depuis AGE_MAX_TRAVAIL, puis les moins récemment utilisés tant que le total
+# dépasse TAILLE_MAX_TRAVAIL. Un fichier supprimé reste lisible par les
+# sessions qui l'ont déjà ouvert (np.memmap).
+
+REPERTOIRE_TRAVAIL = os.path.join(tempfile.gettempdir(), "soufilab_enregistreurs")
+TAILLE_BLOC = 100_000
+TAILLE_MORCEAU = 1 << 20              # octets lus à la fois pour l'empreinte
+TAILLE_MAX_TRAVAIL = 2 * 1024**3      # octets
+AGE_MAX_TRAVAIL = 7 * 86400           # s depuis la dernière utilisation
+UNITES_TEMPS = {"s": 1 / 3600, "min": 1 / 60, "h": 1.0, "j": 24.0}
+
+
+def empreinte(contenu):
+    return hashlib.sha1(contenu).hexdigest()
+
+def empreinte_fichier(fichier, taille_morceau=TAILLE_MORCEAU):
+    # Même empreinte que empreinte(contenu), lue par morceaux
+    h = hashlib.sha1()
+    fichier.seek(0)
+    for morceau in iter(lambda: fichier.read(taille_morceau), b""):
+        h.update(morceau)
+    fichier.seek(0)
+    return h.hexdigest()
+
+def _detecter_format(echantillon):
+    # (séparateur, ligne d'en-tête, marque décimale). Virgule décimale (export
+    # de tableur) : valeurs séparées par ';', tabulations ou blancs, comme en
+    # saisie ; le Sniffer prendrait la virgule pour le séparateur.
+    lignes = [l.strip() for l in echantillon.splitlines() if l.strip()]
+    # Lignes de données complètes : la dernière de l'échantillon peut être coupée
+    donnees = lignes[1:-1] or lignes[1:] or lignes
+    decimal = "," if donnees and all(virgule_decimale(l) for l in donnees) else "."
+    if decimal == ",":
+        sep = next((c for c in ";\t" if c in donnees[0]), " ")
+    else:
+        try:
+            dialecte = csv.Sniffer().sniff(echantillon, delimiters=",;\t ")
+            sep = dialecte.delimiter
+        except csv.Error:
+            sep = "\t" if "\t" in echantillon else ","
+    premiere = lignes[0] if lignes else ""
+    champs = [c.strip() for c in premiere.split(sep) if c.strip()]
+    try:
+        [float(c.replace(decimal, ".")) for c in champs]
+        entete = None
+    except ValueError:
+        entete = 0
+    return sep, entete, decimal
+
+def _temps_en_heures(colonne, unite, origine):
+    valeurs = pd.to_numeric(colonne, errors="coerce")
+    if valeurs.notna().any():
+        return valeurs.to_numpy(dtype=float) * UNITES_TEMPS[unite], origine
+    # Horodatage : temps écoulé depuis le premier enregistrement
+    dates = pd.to_datetime(colonne, errors="coerce")
+    if origine is None:
+        if dates.isna().all():
+            return np.full(len(colonne), np.nan), None
+        origine = dates.dropna().iloc[0]
+    return ((dates - origine) / pd.Timedelta(hours=1)).to_numpy(dtype=float), origine
+
+def _chemins(cle):
+    base = os.path.join(REPERTOIRE_TRAVAIL, cle)
+    return base + ".f8", base + ".json"
+
+def _ouvrir(cle):
+    chemin_donnees, chemin_meta = _chemins(cle)
+    with open(chemin_meta, encoding="utf-8") as f:
+        meta = json.load(f)
+    # Date de dernière utilisation, pour la purge
+    try:
+        os.utime(chemin_meta)
+    except OSError:
+        pass
+    if meta["lignes"] == 0:
+        return meta["colonnes"], np.empty((0, len(meta["colonnes"])))
+    donnees = np.memmap(chemin_donnees, dtype=np.float64, mode="r",
+                        shape=(meta["lignes"], len(meta["colonnes"])))
+    return meta["colonnes"], donnees
+
+def _supprimer(*chemins):
+    for chemin in chemins:
+        try:
+            os.remove(chemin)
+        except OSError:
+            pass
+
+def purger(taille_max=TAILLE_MAX_TRAVAIL, age_max=AGE_MAX_TRAVAIL, garder=()):
+    # Supprime les conversions trop anciennes, puis les moins récemment
+    # utilisées au-delà de taille_max ; « garder » : clés à conserver
+    if not os.path.isdir(REPERTOIRE_TRAVAIL):
+        return
+    maintenant = time.time()
+    entrees = []
+    for nom in os.listdir(REPERTOIRE_TRAVAIL):
+        chemin = os.path.join(REPERTOIRE_TRAVAIL, nom)
+        try:
+            statut = os.stat(chemin)
+        except OSError:
+            continue
+        if nom.endswith(".tmp"):
+            # Conversion interrompue
+            if statut.st_mtime < maintenant - age_max:
+                _supprimer(chemin)
+        elif nom.endswith(".json") and nom[:-5] not in garder:
+            chemin_donnees = _chemins(nom[:-5])[0]
+            taille = os.path.getsize(chemin_donnees) if os.path.exists(chemin_donnees) else 0
+            entrees.append((statut.st_mtime, taille + statut.st_size, nom[:-5]))
+    total = sum(e[1] for e in entrees)
+    for utilisation, taille, cle in sorted(entrees):
+        if utilisation >= maintenant - age_max and total <= taille_max:
+            break
+        _supprimer(*_chemins(cle)[::-1])
+        total -= taille
+
+def _ouvrir_binaire(source):
+    # Fichier téléversé (objet binaire), chemin, ou octets
+    if isinstance(source, (bytes, bytearray)):
+        return io.BytesIO(source), False
+    if isinstance(source, (str, os.PathLike)):
+        return open(source, "rb"), True
+    return source, False
+
+def charger_enregistreur(source, unite_temps="s", taille_bloc=TAILLE_BLOC):
+    # source : fichier binaire (st.file_uploader), chemin ou octets. Retourne
+    # (noms des colonnes, tableau n × k) où la colonne 0 est le temps écoulé
+    # en heures. Seules les lignes sans temps lisible sont écartées ; une
+    # valeur illisible reste NaN dans sa colonne (filtrée à l'usage).
+    fichier, a_fermer = _ouvrir_binaire(source)
+    try:
+        cle = f"{empreinte_fichier(fichier)}_{unite_temps}"
+        chemin_donnees, chemin_meta = _chemins(cle)
+        if os.path.exists(chemin_meta):
+            return _ouvrir(cle)
+
+        echantillon = fichier.read(8192).decode("utf-8", errors="replace")
+        fichier.seek(0)
+        if not echantillon.strip():
+            raise ValueError("Fichier d'enregistreur vide")
+        sep, entete, decimal = _detecter_format(echantillon)
+
+        os.makedirs(REPERTOIRE_TRAVAIL, exist_ok=True)
+        texte = io.TextIOWrapper(fichier, encoding="utf-8", errors="replace")
+        colonnes, lignes, origine, valeurs_lues = None, 0, None, 0
+        temporaire = f"{chemin_donnees}.{os.getpid()}.tmp"
+        try:
+            lecteur = pd.read_csv(texte, sep=sep, header=entete, decimal=decimal, chunksize=taille_bloc,
+                                  skipinitialspace=True, engine="python" if sep == " " else "c")
+            with open(temporaire, "wb") as sortie:
+                for bloc in lecteur:
+                    if colonnes is None:
+                        colonnes = ["t (h)"] + [str(c) for c in bloc.columns[1:]]
+                    t, origine = _temps_en_heures(bloc.iloc[:, 0], unite_temps, origine)
+                    valeurs = bloc.iloc[:, 1:].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+                    tableau = np.column_stack([t, valeurs])[np.isfinite(t)]
+                    sortie.write(np.ascontiguousarray(tableau).tobytes())
+                    lignes += len(tableau)
+                    valeurs_lues += int(np.isfinite(tableau[:, 1:]).sum())
+        except pd.errors.EmptyDataError:
+            colonnes = None
+        except Exception:
+            _supprimer(temporaire)
+            raise
+        finally:
+            # Le fichier téléversé reste ouvert pour les reruns suivants
+            texte.detach()
+        if colonnes is None:
+            _supprimer(temporaire)
+            raise ValueError("Fichier d'enregistreur vide")
+        if lignes == 0 or valeurs_lues == 0:
+            # Rien n'est mis en cache : le même fichier, corrigé ou non, est relu
+            _supprimer(temporaire)
+            raise ValueError("Aucune mesure lisible dans le fichier d'enregistreur "
+                             f"(séparateur « {sep} », décimale « {decimal} »)")
+
+        # Publication atomique : les autres sessions ne voient qu'un fichier complet
+        os.replace(temporaire, chemin_donnees)
+        with open(f"{chemin_meta}.{os.getpid()}.tmp", "w", encoding="utf-8") as f:
+            json.dump({"colonnes": colonnes, "lignes": lignes}, f)
+        os.replace(f"{chemin_meta}.{os.getpid()}.tmp", chemin_meta)
+        purger(garder={cle})
+        return _ouvrir(cle)
+    finally:
+        if a_fermer:
+            fichier.close()
+        else:
+            fichier.seek(0)
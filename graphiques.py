@@ -0,0 +1,118 @@
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from matplotlib.figure import Figure
+
+from instrumentation import phase
+
+# === Couche graphique partagée ===
+# Les figures sont construites avec l'API objet de matplotlib (pas de pyplot :
+# aucune figure globale qui fuit entre deux reruns), rendues en PNG puis
+# conservées dans un cache LRU borné, indexé par l'empreinte des données et
+# des options. Un rerun sans changement des données n'appelle pas matplotlib.
+
+TAILLE_MAX_CACHE = 64 * 1024**2   # octets de PNG conservés
+ENTREES_MAX_CACHE = 256
+POINTS_MAX = 2000                 # au-delà, décimation LTTB avant tracé
+
+_cache = OrderedDict()
+_taille_cache = 0
+_verrou = threading.Lock()
+
+
+def nouvelle_figure(nrows=1, ncols=1, figsize=None, **kwargs):
+    fig = Figure(figsize=figsize)
+    return fig, fig.subplots(nrows, ncols, **kwargs)
+
+# === Décimation LTTB (Largest Triangle Three Buckets) ===
+def lttb(x, y, n_sortie):
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    n = len(x)
+    if n_sortie >= n or n_sortie < 3:
+        return x, y
+    # Bornes des seaux intermédiaires (premier et dernier points conservés)
+    bornes = np.linspace(1, n - 1, n_sortie - 1).astype(np.intp)
+    indices = np.empty(n_sortie, dtype=np.intp)
+    indices[0], indices[-1] = 0, n - 1
+    a = 0
+    for k in range(n_sortie - 2):
+        debut, fin = bornes[k], bornes[k + 1]
+        suivant_fin = bornes[k + 2] if k + 2 < len(bornes) else n
+        x_moy = x[fin:suivant_fin].mean() if suivant_fin > fin else x[-1]
+        y_moy = y[fin:suivant_fin].mean() if suivant_fin > fin else y[-1]
+        xs, ys = x[debut:fin], y[debut:fin]
+        aires = np.abs((x[a] - x_moy) * (ys - y[a]) - (x[a] - xs) * (y_moy - y[a]))
+        a = debut + int(np.argmax(aires))
+        indices[k + 1] = a
+    return x[indices], y[indices]
+
+def decimer(x, y, n_max=POINTS_MAX):
+    if x is None or y is None or len(x) <= n_max:
+        return x, y
+    return lttb(x, y, n_max)
+
+# === Cache des images rendues ===
+def _ajouter(h, valeur):
+    if isinstance(valeur, np.ndarray):
+        h.update(f"{valeur.dtype}{valeur.shape}".encode())
+        h.update(np.ascontiguousarray(valeur).tobytes())
+    elif isinstance(valeur, (list, tuple)):
+        h.update(f"{type(valeur).__name__}{len(valeur)}".encode())
+        for v in valeur:
+            _ajouter(h, v)
+    else:
+        h.update(repr(valeur).encode())
+
+def _empreinte(construire, args, options):
+    h = hashlib.blake2b(digest_size=20)
+    h.update(f"{construire.__module__}.{construire.__qualname__}".encode())
+    for valeur in args:
+        _ajouter(h, valeur)
+    for nom, valeur in sorted(options.items()):
+        h.update(nom.encode())
+        _ajouter(h, valeur)
+    return h.hexdigest()
+
+def _memoriser(cle, png):
+    global _taille_cache
+    with _verrou:
+        if cle in _cache:
+            return
+        _cache[cle] = png
+        _taille_cache += len(png)
+        while _cache and (_taille_cache > TAILLE_MAX_CACHE or len(_cache) > ENTREES_MAX_CACHE):
+            _, ancien = _cache.popitem(last=False)
+            _taille_cache -= len(ancien)
+
+def rendre_png(construire, *args, dpi=100, **options):
+    cle = _empreinte(construire, args, dict(options, dpi=dpi))
+    with _verrou:
+        png = _cache.get(cle)
+        if png is not None:
+            _cache.move_to_end(cle)
+            return png
+    with phase("plot"):
+        fig = construire(*args, **options)
+        try:
+            tampon = io.BytesIO()
+            fig.savefig(tampon, format="png", dpi=dpi, bbox_inches="tight")
+            png = tampon.getvalue()
+        finally:
+            # Libération explicite (figure hors pyplot : plus aucune référence)
+            fig.clear()
+    _memoriser(cle, png)
+    return png
+
+def afficher_figure(construire, *args, **options):
+    import streamlit as st   # rendre_png sert aussi hors Streamlit (CLI)
+
+    st.image(rendre_png(construire, *args, **options))
+
+def vider_cache():
+    global _taille_cache
+    with _verrou:
+        _cache.clear()
+        _taille_cache = 0
@@ -0,0 +1,185 @@
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+
+import pandas as pd
+
+# === Instrumentation des reruns ===
+# Chaque rerun d'une section est une trace : des phases nommées (parse, fit,
+# model, plot, render...) chronométrées, éventuellement imbriquées, avec le
+# pic d'allocation de chacune si le suivi mémoire est demandé. La trace
+# courante est portée par une variable de contexte : chaque session Streamlit
+# (un thread par rerun) a la sienne, et phase() ne coûte presque rien hors
+# rerun instrumenté (CLI, benchmarks).
+#
+# Les traces terminées sont ajoutées, une par ligne, à un fichier JSONL à
+# rotation (SOUFILAB_TRACES, vide pour désactiver) qu'on agrège ensuite entre
+# utilisateurs avec agreger().
+#
+# tracemalloc est global au processus : avec plusieurs sessions simultanées,
+# le pic d'une phase inclut les allocations des autres sessions.
+
+FICHIER_TRACES = os.environ.get(
+    "SOUFILAB_TRACES", os.path.join(tempfile.gettempdir(), "soufilab_traces", "traces.jsonl"))
+TAILLE_MAX_TRACES = 10 * 1024**2  # octets par fichier avant rotation
+FICHIERS_CONSERVES = 5
+
+_trace = contextvars.ContextVar("trace", default=None)
+_journal = None
+_suivis_memoire = 0  # reruns en cours avec suivi mémoire
+_tracemalloc_demarre = False
+_verrou = threading.Lock()
+
+
+class Trace:
+    def __init__(self, section, session=None, memoire=False):
+        self.section = section
+        self.session = session
+        self.memoire = memoire
+        self.horodatage = time.time()
+        self.phases = {}   # nom -> {"n", "duree_s", "pic_octets"}
+        self.duree_s = 0.0
+        self.pic_octets = None
+        self._pics = [0]   # pic courant de chaque niveau d'imbrication
+
+    def _enregistrer(self, nom, duree, pic):
+        p = self.phases.setdefault(nom, {"n": 0, "duree_s": 0.0, "pic_octets": None})
+        p["n"] += 1
+        p["duree_s"] += duree
+        if pic is not None:
+            p["pic_octets"] = max(p["pic_octets"] or 0, pic)
+
+    def en_dict(self):
+        return {"horodatage": self.horodatage, "session": self.session, "section": self.section,
+                "duree_s": self.duree_s, "pic_octets": self.pic_octets, "phases": self.phases}
+
+
+def trace_courante():
+    return _trace.get()
+
+@contextmanager
+def phase(nom):
+    trace = _trace.get()
+    if trace is None:
+        yield
+        return
+    memoire = trace.memoire and tracemalloc.is_tracing()
+    if memoire:
+        # Le pic du niveau parent est relevé avant la remise à zéro
+        trace._pics[-1] = max(trace._pics[-1], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        trace._pics.append(0)
+    debut = time.perf_counter()
+    try:
+        yield
+    finally:
+        duree = time.perf_counter() - debut
+        pic = None
+        if memoire:
+            pic = max(trace._pics.pop(), tracemalloc.get_traced_memory()[1])
+            trace._pics[-1] = max(trace._pics[-1], pic)
+        trace._enregistrer(nom, duree, pic)
+
+@contextmanager
+def rerun(section, session=None, memoire=False):
+    global _suivis_memoire, _tracemalloc_demarre
+    trace = Trace(section, session, memoire)
+    if memoire:
+        with _verrou:
+            if _suivis_memoire == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _tracemalloc_demarre = True
+            _suivis_memoire += 1
+        tracemalloc.reset_peak()
+    jeton = _trace.set(trace)
+    debut = time.perf_counter()
+    try:
+        yield trace
+    finally:
+        trace.duree_s = time.perf_counter() - debut
+        if memoire:
+            trace.pic_octets = max(trace._pics[0], tracemalloc.get_traced_memory()[1])
+            with _verrou:
+                _suivis_memoire -= 1
+                if _suivis_memoire == 0 and _tracemalloc_demarre:
+                    tracemalloc.stop()
+                    _tracemalloc_demarre = False
+        _trace.reset(jeton)
+        ecrire_trace(trace)
+
+# === Fichier de traces (JSONL à rotation) ===
+def _obtenir_journal():
+    global _journal
+    with _verrou:
+        if _journal is not None or not FICHIER_TRACES:
+            return _journal
+        journal = logging.getLogger("soufilab.traces")
+        journal.propagate = False
+        journal.setLevel(logging.INFO)
+        try:
+            os.makedirs(os.path.dirname(FICHIER_TRACES) or ".", exist_ok=True)
+            gestionnaire = logging.handlers.RotatingFileHandler(
+                FICHIER_TRACES, maxBytes=TAILLE_MAX_TRACES, backupCount=FICHIERS_CONSERVES,
+                encoding="utf-8")
+        except OSError:
+            return None
+        gestionnaire.setFormatter(logging.Formatter("%(message)s"))
+        journal.addHandler(gestionnaire)
+        _journal = journal
+        return _journal
+
+def ecrire_trace(trace):
+    journal = _obtenir_journal()
+    if journal is not None:
+        journal.info(json.dumps(trace.en_dict(), ensure_ascii=False))
+
+def nouvelle_session():
+    return uuid.uuid4().hex[:12]
+
+# === Agrégation des traces ===
+def lire_traces(chemins=None):
+    if chemins is None:
+        chemins = [f"{FICHIER_TRACES}.{k}" for k in range(FICHIERS_CONSERVES, 0, -1)] + [FICHIER_TRACES]
+    lignes = []
+    for chemin in chemins:
+        if not os.path.exists(chemin):
+            continue
+        with open(chemin, encoding="utf-8") as f:
+            for ligne in f:
+                try:
+                    t = json.loads(ligne)
+                except json.JSONDecodeError:
+                    continue
+                lignes.append({"section": t["section"], "session": t["session"], "phase": "(total)",
+                               "n": 1, "duree_s": t["duree_s"], "pic_octets": t["pic_octets"]})
+                for nom, p in t["phases"].items():
+                    lignes.append(dict(p, section=t["section"], session=t["session"], phase=nom))
+    return pd.DataFrame(lignes, columns=["section", "session", "phase", "n", "duree_s", "pic_octets"])
+
+def agreger(chemins=None):
+    # Par (section, phase) : nombre de reruns, sessions distinctes, durée
+    # médiane / P95 / max et pic mémoire médian / max
+    traces = lire_traces(chemins)
+    groupes = traces.groupby(["section", "phase"])
+    return groupes.agg(
+        reruns=("duree_s", "size"), sessions=("session", "nunique"),
+        duree_p50_s=("duree_s", "median"), duree_p95_s=("duree_s", lambda d: d.quantile(0.95)),
+        duree_max_s=("duree_s", "max"),
+        pic_p50_Mo=("pic_octets", lambda p: p.median() / 1024**2),
+        pic_max_Mo=("pic_octets", lambda p: p.max() / 1024**2),
+    ).reset_index()
+
+
+if __name__ == "__main__":
+    # python instrumentation.py [traces.jsonl ...]
+    with pd.option_context("display.max_rows", None, "display.width", 200):
+        print(agreger(sys.argv[1:] or None).to_string(index=False))
@@ -0,0 +1,298 @@
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from taches import rapporter
+
+# === Magasin de projets (SQLite) ===
+# Un fichier SQLite local conserve, par puits, les séries de mesures (essais
+# par paliers, longue durée...), les paramètres saisis dans chaque section et
+# les résultats déjà calculés. Les séries sont stockées en blobs binaires
+# (float64 petit-boutiste brut, 8 octets par valeur) : relire 10⁶ points
+# revient à un np.frombuffer, sans analyse de texte.
+#
+# Les résultats sont rangés sous l'empreinte de leurs entrées (voir Graphe) :
+# rouvrir un puits redonne les ajustements et les figures sans rien recalculer.
+#
+# Une connexion par thread (Streamlit sert chaque session dans son propre
+# thread), journal WAL pour que les lectures ne bloquent pas les écritures.
+
+FICHIER_PROJETS = os.environ.get(
+    "SOUFILAB_PROJETS", os.path.join(os.path.expanduser("~"), ".soufilab", "projets.sqlite"))
+
+RESULTATS_CONSERVES = 8  # par noeud et par puits (les plus récemment utilisés)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS puits (
+    id INTEGER PRIMARY KEY,
+    nom TEXT NOT NULL UNIQUE,
+    campagne TEXT,
+    cree REAL NOT NULL,
+    modifie REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS series (
+    puits_id INTEGER NOT NULL REFERENCES puits(id) ON DELETE CASCADE,
+    section TEXT NOT NULL,
+    nom TEXT NOT NULL,
+    unite TEXT,
+    date TEXT,
+    n INTEGER NOT NULL,
+    donnees BLOB NOT NULL,
+    PRIMARY KEY (puits_id, section, nom)
+);
+CREATE TABLE IF NOT EXISTS parametres (
+    puits_id INTEGER NOT NULL REFERENCES puits(id) ON DELETE CASCADE,
+    section TEXT NOT NULL,
+    valeurs TEXT NOT NULL,
+    PRIMARY KEY (puits_id, section)
+);
+CREATE TABLE IF NOT EXISTS resultats (
+    puits_id INTEGER NOT NULL REFERENCES puits(id) ON DELETE CASCADE,
+    section TEXT NOT NULL,
+    noeud TEXT NOT NULL,
+    empreinte TEXT NOT NULL,
+    valeur BLOB NOT NULL,
+    utilise REAL NOT NULL,
+    PRIMARY KEY (puits_id, section, noeud, empreinte)
+);
+CREATE INDEX IF NOT EXISTS puits_campagne ON puits (campagne, nom);
+CREATE INDEX IF NOT EXISTS series_date ON series (date);
+CREATE INDEX IF NOT EXISTS series_section ON series (section, puits_id);
+"""
+
+
+def _en_blob(valeurs):
+    return np.ascontiguousarray(valeurs, dtype="<f8").tobytes()
+
+def _depuis_blob(blob):
+    return np.frombuffer(blob, dtype="<f8").copy()
+
+
+class Magasin:
+    def __init__(self, chemin=FICHIER_PROJETS):
+        self.chemin = chemin
+        self._local = threading.local()
+        if chemin != ":memory:":
+            os.makedirs(os.path.dirname(chemin) or ".", exist_ok=True)
+        self._connexion().executescript(_SCHEMA)
+
+    def _connexion(self):
+        con = getattr(self._local, "connexion", None)
+        if con is None:
+            con = sqlite3.connect(self.chemin, timeout=30)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA foreign_keys=ON")
+            con.execute("PRAGMA synchronous=NORMAL")
+            self._local.connexion = con
+        return con
+
+    # --- Puits ---
+    def puits(self, nom, campagne=None):
+        # Identifiant du puits, créé au besoin. INSERT OR IGNORE puis SELECT :
+        # deux sessions qui ouvrent le même nouveau puits obtiennent le même id.
+        con = self._connexion()
+        maintenant = time.time()
+        with con:
+            con.execute("INSERT OR IGNORE INTO puits (nom, campagne, cree, modifie) VALUES (?, ?, ?, ?)",
+                        (nom, campagne, maintenant, maintenant))
+        return con.execute("SELECT id FROM puits WHERE nom = ?", (nom,)).fetchone()[0]
+
+    def liste_puits(self, campagne=None):
+        requete = ("SELECT id, nom, campagne, datetime(modifie, 'unixepoch') AS modifie,"
+                   " (SELECT COUNT(*) FROM series s WHERE s.puits_id = p.id) AS series"
+                   " FROM puits p")
+        args = ()
+        if campagne is not None:
+            requete += " WHERE campagne = ?"
+            args = (campagne,)
+        return pd.read_sql_query(requete + " ORDER BY campagne, nom", self._connexion(), params=args)
+
+    def campagnes(self):
+        lignes = self._connexion().execute(
+            "SELECT DISTINCT campagne FROM puits WHERE campagne IS NOT NULL ORDER BY campagne")
+        return [c for c, in lignes]
+
+    def supprimer_puits(self, puits_id):
+        with self._connexion() as con:
+            con.execute("DELETE FROM puits WHERE id = ?", (puits_id,))
+
+    def _toucher(self, con, puits_id):
+        con.execute("UPDATE puits SET modifie = ? WHERE id = ?", (time.time(), puits_id))
+
+    # --- Séries (blobs binaires) ---
+    def ecrire_series(self, puits_id, section, series, unites=None, date=None):
+        # series : {nom: tableau}. Une série None efface la série enregistrée.
+        unites = unites or {}
+        with self._connexion() as con:
+            for nom, valeurs in series.items():
+                if valeurs is None:
+                    con.execute("DELETE FROM series WHERE puits_id = ? AND section = ? AND nom = ?",
+                                (puits_id, section, nom))
+                    continue
+                con.execute(
+                    "INSERT OR REPLACE INTO series (puits_id, section, nom, unite, date, n, donnees)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (puits_id, section, nom, unites.get(nom), date, len(valeurs), _en_blob(valeurs)))
+            self._toucher(con, puits_id)
+
+    def lire_series(self, puits_id, section):
+        lignes = self._connexion().execute(
+            "SELECT nom, donnees FROM series WHERE puits_id = ? AND section = ?", (puits_id, section))
+        return {nom: _depuis_blob(blob) for nom, blob in lignes}
+
+    # --- Paramètres (JSON) ---
+    def ecrire_parametres(self, puits_id, section, valeurs):
+        with self._connexion() as con:
+            con.execute("INSERT OR REPLACE INTO parametres (puits_id, section, valeurs) VALUES (?, ?, ?)",
+                        (puits_id, section, json.dumps(valeurs, ensure_ascii=False)))
+            self._toucher(con, puits_id)
+
+    def lire_parametres(self, puits_id, section):
+        ligne = self._connexion().execute(
+            "SELECT valeurs FROM parametres WHERE puits_id = ? AND section = ?", (puits_id, section)).fetchone()
+        return {} if ligne is None else json.loads(ligne[0])
+
+    # --- Résultats (sous l'empreinte de leurs entrées) ---
+    # Plusieurs versions par noeud : revenir à une saisie antérieure (H, type
+    # de nappe...) retrouve encore le résultat correspondant.
+    def lire_resultat(self, puits_id, section, noeud, empreinte):
+        cle = (puits_id, section, noeud, empreinte)
+        con = self._connexion()
+        ligne = con.execute("SELECT valeur FROM resultats WHERE puits_id = ? AND section = ? AND noeud = ?"
+                            " AND empreinte = ?", cle).fetchone()
+        if ligne is None:
+            return False, None
+        with con:
+            con.execute("UPDATE resultats SET utilise = ? WHERE puits_id = ? AND section = ? AND noeud = ?"
+                        " AND empreinte = ?", (time.time(), *cle))
+        return True, pickle.loads(ligne[0])
+
+    def ecrire_resultat(self, puits_id, section, noeud, empreinte, valeur):
+        with self._connexion() as con:
+            con.execute("INSERT OR REPLACE INTO resultats (puits_id, section, noeud, empreinte, valeur, utilise)"
+                        " VALUES (?, ?, ?, ?, ?, ?)",
+                        (puits_id, section, noeud, empreinte, pickle.dumps(valeur, pickle.HIGHEST_PROTOCOL),
+                         time.time()))
+            con.execute("DELETE FROM resultats WHERE puits_id = ? AND section = ? AND noeud = ? AND empreinte NOT IN"
+                        " (SELECT empreinte FROM resultats WHERE puits_id = ? AND section = ? AND noeud = ?"
+                        "  ORDER BY utilise DESC LIMIT ?)",
+                        (puits_id, section, noeud, puits_id, section, noeud, RESULTATS_CONSERVES))
+
+
+@lru_cache(maxsize=None)
+def magasin(chemin=FICHIER_PROJETS):
+    return Magasin(chemin)
+
+def texte_serie(valeurs):
+    # Série enregistrée -> texte pour une zone de saisie (relu par saisie.lire_serie)
+    return " ".join(np.char.mod("%.10g", np.asarray(valeurs, dtype=float)))
+
+# === Recalcul incrémental ===
+# Un Graphe relie des noeuds de calcul à leurs dépendances (entrées ou autres
+# noeuds). L'empreinte d'un noeud combine son nom, sa version et les empreintes
+# de ses dépendances : elle ne dépend que des entrées, on sait donc avant tout
+# calcul si le résultat mémorisé est encore valable. Seuls les noeuds dont une
+# entrée amont a changé sont recalculés ; changer H dans IV.1.1 refait Qc/Qmax
+# et la figure, pas les ajustements.
+
+def empreinte_valeur(valeur):
+    h = hashlib.sha1()
+    if isinstance(valeur, np.ndarray):
+        h.update(f"{valeur.dtype.str}{valeur.shape}".encode())
+        h.update(np.ascontiguousarray(valeur).tobytes())
+    else:
+        h.update(repr(valeur).encode())
+    return h.hexdigest()
+
+
+class Graphe:
+    def __init__(self):
+        self.noeuds = {}   # nom -> (fonction, dépendances, version)
+
+    def noeud(self, nom, *dependances, version=1):
+        # Déclarer à nouveau un noeud à l'identique (module rechargé) remplace
+        # sa fonction ; une déclaration différente sous le même nom est une erreur.
+        def enregistrer(fonction):
+            if nom in self.noeuds:
+                ancienne, anciennes_dependances, ancienne_version = self.noeuds[nom]
+                if ((ancienne.__module__, ancienne.__qualname__, anciennes_dependances, ancienne_version)
+                        != (fonction.__module__, fonction.__qualname__, dependances, version)):
+                    raise ValueError(f"Noeud « {nom} » déjà déclaré autrement")
+            self.noeuds[nom] = (fonction, dependances, version)
+            return fonction
+        return enregistrer
+
+    def evaluer(self, cibles, entrees, memoire=None):
+        # Retourne ({noeud: valeur}, noeuds recalculés). memoire : objet
+        # exposant charger(noeud, empreinte) et enregistrer(noeud, empreinte, valeur).
+        memoire = MemoireLocale() if memoire is None else memoire
+        empreintes = {nom: empreinte_valeur(v) for nom, v in entrees.items()}
+        valeurs, recalcules = dict(entrees), []
+
+        def empreinte(nom):
+            if nom not in empreintes:
+                _, dependances, version = self.noeuds[nom]
+                h = hashlib.sha1(f"{nom}:{version}".encode())
+                for d in dependances:
+                    h.update(empreinte(d).encode())
+                empreintes[nom] = h.hexdigest()
+            return empreintes[nom]
+
+        def evaluer(nom):
+            if nom in valeurs:
+                return valeurs[nom]
+            fonction, dependances, _ = self.noeuds[nom]
+            trouve, valeur = memoire.charger(nom, empreinte(nom))
+            if not trouve:
+                arguments = [evaluer(d) for d in dependances]
+                rapporter(len(recalcules) / len(self.noeuds), nom)   # point d'annulation en tâche de fond
+                valeur = fonction(*arguments)
+                memoire.enregistrer(nom, empreinte(nom), valeur)
+                recalcules.append(nom)
+            valeurs[nom] = valeur
+            return valeur
+
+        return {nom: evaluer(nom) for nom in cibles}, recalcules
+
+
+class MemoireLocale:
+    # Dernier résultat de chaque noeud, en mémoire (session ou CLI)
+    def __init__(self):
+        self._valeurs = {}
+
+    def charger(self, noeud, empreinte):
+        entree = self._valeurs.get(noeud)
+        if entree is not None and entree[0] == empreinte:
+            return True, entree[1]
+        return False, None
+
+    def enregistrer(self, noeud, empreinte, valeur):
+        self._valeurs[noeud] = (empreinte, valeur)
+
+
+class MemoireProjet(MemoireLocale):
+    # Mémoire locale adossée au magasin : les résultats survivent au
+    # rechargement de la page et sont partagés entre sessions.
+    def __init__(self, magasin, puits_id, section):
+        super().__init__()
+        self.magasin, self.puits_id, self.section = magasin, puits_id, section
+
+    def charger(self, noeud, empreinte):
+        trouve, valeur = super().charger(noeud, empreinte)
+        if not trouve:
+            trouve, valeur = self.magasin.lire_resultat(self.puits_id, self.section, noeud, empreinte)
+            if trouve:
+                super().enregistrer(noeud, empreinte, valeur)
+        return trouve, valeur
+
+    def enregistrer(self, noeud, empreinte, valeur):
+        super().enregistrer(noeud, empreinte, valeur)
+        self.magasin.ecrire_resultat(self.puits_id, self.section, noeud, empreinte, valeur)
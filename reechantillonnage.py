@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+
+# === Intervalles de confiance par bootstrap (sans Streamlit) ===
+# Le modèle ajusté est conservé et les résidus sont rééchantillonnés :
+#   Résidus : tirage avec remise, point par point (résidus indépendants) ;
+#   Blocs   : blocs mobiles circulaires de résidus consécutifs, qui gardent
+#             l'autocorrélation des séries d'enregistreurs.
+# Les mêmes indices de tirage servent à tous les modèles d'un essai, si bien
+# que les intervalles des différentes méthodes sont comparables. Chaque
+# pseudo-série est réajustée ; les intervalles sont les percentiles des
+# paramètres obtenus.
+
+METHODES = ["Résidus", "Blocs"]
+N_TIRAGES = 2000
+NIVEAU = 0.95
+TAILLE_BLOC_TIRAGES = 100  # pseudo-séries par bloc confié au pool de processus
+ITERATIONS_MAX = 100
+
+
+def taille_bloc_defaut(n):
+    # Règle usuelle n^(1/3)
+    return max(2, int(round(n ** (1 / 3))))
+
+def indices(n, n_tirages=N_TIRAGES, methode="Résidus", taille_bloc=None, graine=0):
+    # (n_tirages, n) indices dans les résidus
+    rng = np.random.default_rng(graine)
+    if methode == "Résidus":
+        return rng.integers(0, n, (n_tirages, n))
+    b = min(taille_bloc or taille_bloc_defaut(n), n)
+    debuts = rng.integers(0, n, (n_tirages, -(-n // b)))
+    return ((debuts[:, :, None] + np.arange(b)) % n).reshape(n_tirages, -1)[:, :n]
+
+def pseudo_series(s_modele, residus, idx, n_parametres):
+    # Résidus centrés et dilatés de √(n/(n-p)) pour compenser l'ajustement
+    residus = np.asarray(residus, dtype=float)
+    n = len(residus)
+    e = (residus - residus.mean()) * np.sqrt(n / max(n - n_parametres, 1))
+    return np.asarray(s_modele, dtype=float) + e[idx]
+
+def levenberg_marquardt_lot(residus, jacobien, P0, bas, haut, iterations=ITERATIONS_MAX, tolerance=1e-8):
+    # Réajustement de toutes les pseudo-séries à la fois : P (tirages, k) ;
+    # residus(P, lignes) -> (len(lignes), points) et jacobien(P, lignes) ->
+    # (len(lignes), points, k) pour les séries « lignes » seulement.
+    # Systèmes normaux k×k empilés, bornes par projection ; une série qui ne
+    # progresse plus (gain relatif sur le coût sous « tolerance », ou pas
+    # négligeable, notamment projeté contre une borne) sort de l'itération et
+    # n'est plus évaluée. NaN si le coût n'est pas fini.
+    P = np.clip(np.array(P0, dtype=float), bas, haut)
+    m, k = P.shape
+    diag = (slice(None), np.arange(k), np.arange(k))
+    amortissement = np.full(m, 1e-3)
+    with np.errstate(invalid="ignore", divide="ignore", over="ignore"):
+        r = residus(P, np.arange(m))
+        cout = (r**2).sum(axis=1)
+        actifs = np.flatnonzero(np.isfinite(cout))
+        for _ in range(iterations):
+            if not len(actifs):
+                break
+            J = jacobien(P[actifs], actifs)
+            g = np.einsum("mnk,mn->mk", J, r[actifs])
+            H = np.einsum("mnk,mnl->mkl", J, J)
+            # Paramètre en butée poussé vers l'extérieur : figé pour ce pas
+            butee = ((P[actifs] <= bas) & (g > 0)) | ((P[actifs] >= haut) & (g < 0))
+            H *= ~(butee[:, :, None] | butee[:, None, :])
+            g[butee] = 0.0
+            H[diag] += amortissement[actifs, None] * (H[diag] + 1e-12) + butee
+            pas = np.linalg.solve(H, -g[:, :, None])[:, :, 0]
+            essai = np.clip(P[actifs] + np.nan_to_num(pas), bas, haut)
+            immobile = (np.abs(essai - P[actifs]) <= 1e-8 * (np.abs(P[actifs]) + 1e-8)).all(axis=1)
+            r_essai = residus(essai, actifs)
+            cout_essai = (r_essai**2).sum(axis=1)
+            mieux = cout_essai < cout[actifs]
+            gain = np.where(mieux, cout[actifs] - cout_essai, 0.0)
+            retenus = actifs[mieux]
+            P[retenus], r[retenus], cout[retenus] = essai[mieux], r_essai[mieux], cout_essai[mieux]
+            amortissement[actifs] = np.where(mieux, amortissement[actifs] / 3,
+                                             np.minimum(amortissement[actifs] * 3, 1e10))
+            fini = (mieux & (gain <= tolerance * (cout[actifs] + 1e-30))) | immobile | (amortissement[actifs] >= 1e10)
+            actifs = actifs[~fini]
+    P[~np.isfinite(cout)] = np.nan
+    return P
+
+def jacobien_differences(residus, P, lignes, pas=1e-6):
+    # Différences avancées, pour les modèles tabulés sans dérivées analytiques
+    r0 = residus(P, lignes)
+    J = np.empty(r0.shape + (P.shape[1],))
+    for j in range(P.shape[1]):
+        h = pas * np.maximum(np.abs(P[:, j]), 1.0)
+        Pj = P.copy()
+        Pj[:, j] += h
+        J[:, :, j] = (residus(Pj, lignes) - r0) / h[:, None]
+    return J
+
+def decouper(tirages, taille=TAILLE_BLOC_TIRAGES):
+    return [tirages[i:i + taille] for i in range(0, len(tirages), taille)]
+
+def intervalles(estimations, tirages, niveau=NIVEAU):
+    # estimations : {(méthode, paramètre): valeur} ; tirages : mêmes clés,
+    # valeurs réajustées (NaN pour un réajustement qui a échoué)
+    alpha = 50 * (1 - niveau)
+    lignes = []
+    for (methode, parametre), valeur in estimations.items():
+        x = np.asarray(tirages[(methode, parametre)], dtype=float)
+        x = x[np.isfinite(x)]
+        bas, haut = np.percentile(x, [alpha, 100 - alpha]) if len(x) else (np.nan, np.nan)
+        lignes.append({"Méthode": methode, "Paramètre": parametre, "Estimation": valeur,
+                       f"Borne basse ({100 * niveau:g} %)": bas, f"Borne haute ({100 * niveau:g} %)": haut,
+                       "Écart-type": x.std(ddof=1) if len(x) > 1 else np.nan, "Tirages valides": len(x)})
+    return pd.DataFrame(lignes)
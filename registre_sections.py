@@ -0,0 +1,62 @@
+import importlib.util
+import os
+import sys
+import threading
+
+from instrumentation import phase
+
+# === Registre des sections ===
+# Chaque section est importée une seule fois comme un vrai module (bytecode
+# mis en cache dans __pycache__) puis conservée dans un cache partagé par
+# toutes les sessions du processus. Le module n'est rechargé que si la date
+# de modification du fichier change.
+
+REPERTOIRE = os.path.dirname(os.path.abspath(__file__))
+
+_cache = {}
+_verrou = threading.Lock()
+
+
+def _chemin(nom):
+    return os.path.join(REPERTOIRE, f"{nom}.py")
+
+
+def _importer(nom, chemin):
+    spec = importlib.util.spec_from_file_location(nom, chemin)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[nom] = module
+    try:
+        spec.loader.exec_module(module)
+    except Exception:
+        sys.modules.pop(nom, None)
+        raise
+    if not callable(getattr(module, "render", None)):
+        raise AttributeError(f"La section {nom} n'expose pas de fonction render()")
+    return module
+
+
+def charger_section(nom):
+    chemin = _chemin(nom)
+    mtime = os.stat(chemin).st_mtime_ns
+    entree = _cache.get(nom)
+    if entree is not None and entree[0] == mtime:
+        return entree[1]
+    with _verrou:
+        entree = _cache.get(nom)
+        if entree is not None and entree[0] == mtime:
+            return entree[1]
+        module = _importer(nom, chemin)
+        _cache[nom] = (mtime, module)
+        return module
+
+
+def afficher_section(nom):
+    with phase("import"):
+        module = charger_section(nom)
+    with phase("render"):
+        module.render()
+
+
+def vider_cache():
+    with _verrou:
+        _cache.clear()
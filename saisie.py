@@ -0,0 +1,135 @@
+import io
+import re
+
+import numpy as np
+import pandas as pd
+
+# === Saisie des séries de mesures (texte collé ou fichier) ===
+# Le texte est normalisé en une valeur par ligne puis lu par l'analyseur C de
+# pandas : aucune conversion float() jeton par jeton, même pour 10⁶ valeurs.
+# Conventions acceptées :
+#   - séparateurs blancs, tabulations, retours à la ligne, ';' ou ',' ;
+#   - virgule décimale (1,5 ; 2,75) si les valeurs sont séparées par des
+#     blancs ou des ';' (copie de tableur, export d'enregistreur) ;
+#   - unité collée ou suivie d'un blanc (12 m, 5min, 20 m³/h), convertie
+#     vers l'unité du champ.
+# Les contrôles de cohérence sont vectorisés et les erreurs citent les
+# numéros (à partir de 1) des valeurs fautives.
+
+# Unités reconnues : (grandeur, facteur vers l'unité SI)
+UNITES = {
+    "s": ("temps", 1.0), "min": ("temps", 60.0), "h": ("temps", 3600.0), "j": ("temps", 86400.0),
+    "mm": ("longueur", 1e-3), "cm": ("longueur", 1e-2), "m": ("longueur", 1.0),
+    "m3/h": ("debit", 1 / 3600), "m³/h": ("debit", 1 / 3600), "m3/j": ("debit", 1 / 86400),
+    "m³/j": ("debit", 1 / 86400), "l/s": ("debit", 1e-3), "l/min": ("debit", 1e-3 / 60),
+}
+INDICES_AFFICHES = 10
+
+_SEPARATEURS = str.maketrans({c: "\n" for c in " \t\r,;"})
+_SEPARATEURS_VIRGULE_DECIMALE = str.maketrans({**{c: "\n" for c in " \t\r;"}, ",": "."})
+_NUMERIQUES = str.maketrans("", "", "0123456789.,;+-eE \t\r\n")
+# Blanc entre un nombre et une unité connue, l'unité formant tout le jeton
+# suivant : un mot quelconque reste une valeur (illisible) à part entière
+_UNITE_DETACHEE = re.compile(r"(?<=[\d.])[ \t]+(?=(?:%s)(?![^\s,;]))"
+                             % "|".join(map(re.escape, sorted(UNITES, key=len, reverse=True))), re.IGNORECASE)
+_VIRGULES_SEPARATRICES = (", ", " ,", ",\t", "\t,", ",\n", "\n,", ",\r", ",,")
+_NOMBRE_UNITE = r"^([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)(.*)$"
+
+
+class ErreurSaisie(ValueError):
+    def __init__(self, message, indices=()):
+        super().__init__(message)
+        self.indices = np.asarray(indices, dtype=np.intp)
+
+
+def _numeros(indices):
+    # Numéros (à partir de 1) des premières valeurs fautives
+    texte = ", ".join(str(i + 1) for i in indices[:INDICES_AFFICHES])
+    if len(indices) > INDICES_AFFICHES:
+        texte += f"… (+{len(indices) - INDICES_AFFICHES})"
+    return texte
+
+def virgule_decimale(texte):
+    # ';' : la virgule est décimale. Sinon, elle l'est si les valeurs sont
+    # séparées par des blancs et qu'aucune virgule ne touche un blanc
+    # ("1,5 2,5") ; "10, 20, 30" et "10,20,30" restent des listes.
+    if ";" in texte:
+        return True
+    if "," not in texte or len(texte.split(None, 1)) < 2:
+        return False
+    return not (texte.startswith(",") or texte.endswith(",")
+                or any(motif in texte for motif in _VIRGULES_SEPARATRICES))
+
+def lire_serie(texte, unite=None, nom="Série"):
+    # Retourne un tableau float64, ou None si le texte est vide
+    if isinstance(texte, bytes):
+        texte = texte.decode("utf-8", errors="replace")
+    texte = texte.strip()
+    if not texte:
+        return None
+    if texte.translate(_NUMERIQUES):
+        texte = _UNITE_DETACHEE.sub("", texte)
+    texte = texte.translate(_SEPARATEURS_VIRGULE_DECIMALE if virgule_decimale(texte) else _SEPARATEURS)
+
+    colonne = pd.read_csv(io.StringIO(texte), header=None, names=["v"], na_filter=False)["v"]
+    if colonne.dtype.kind in "iuf":
+        valeurs = colonne.to_numpy(dtype=float)
+        invalides = np.flatnonzero(~np.isfinite(valeurs))
+    else:
+        parties = colonne.astype(str).str.extract(_NOMBRE_UNITE)
+        valeurs = pd.to_numeric(parties[0], errors="coerce").to_numpy(dtype=float)
+        unites = parties[1].fillna("").str.strip().str.lower()
+        avec_unite = (unites != "").to_numpy()
+        invalides = ~np.isfinite(valeurs)
+        if avec_unite.any():
+            if unite is None:
+                raise ErreurSaisie(f"{nom} : unités non attendues (valeurs n° {_numeros(np.flatnonzero(avec_unite))})",
+                                   np.flatnonzero(avec_unite))
+            grandeur, base = UNITES[unite]
+            facteurs = unites.map({u: f / base for u, (g, f) in UNITES.items() if g == grandeur})
+            facteurs = facteurs.to_numpy(dtype=float)
+            invalides |= avec_unite & np.isnan(facteurs)
+            valeurs = np.where(avec_unite, valeurs * facteurs, valeurs)
+        invalides = np.flatnonzero(invalides)
+    if len(invalides):
+        raise ErreurSaisie(f"{nom} : valeurs illisibles n° {_numeros(invalides)}", invalides)
+    return valeurs
+
+def lire_valeur(texte, unite=None, nom="Valeur"):
+    # Une seule valeur : la virgule y est toujours décimale
+    valeurs = lire_serie(str(texte).replace(",", "."), unite, nom)
+    if valeurs is None or len(valeurs) != 1:
+        raise ErreurSaisie(f"{nom} : une seule valeur attendue")
+    return float(valeurs[0])
+
+# === Contrôles de cohérence vectorisés ===
+def controler(series, longueur_commune=True, positives=(), strictement_positives=(),
+              croissantes=(), strictement_croissantes=()):
+    # series : {nom: tableau}. Retourne la liste des anomalies (message, indices).
+    vides = [nom for nom, x in series.items() if x is None or len(x) == 0]
+    if vides:
+        return [(f"Série vide : {', '.join(vides)}", np.empty(0, np.intp))]
+    anomalies = []
+    if longueur_commune:
+        longueurs = {nom: len(x) for nom, x in series.items()}
+        if len(set(longueurs.values())) > 1:
+            detail = ", ".join(f"{nom} : {n}" for nom, n in longueurs.items())
+            anomalies.append((f"Les séries doivent avoir la même longueur ({detail}).", np.empty(0, np.intp)))
+    regles = [
+        (positives, lambda x: np.flatnonzero(~(x >= 0)), "valeurs négatives"),
+        (strictement_positives, lambda x: np.flatnonzero(~(x > 0)), "valeurs nulles ou négatives"),
+        (croissantes, lambda x: np.flatnonzero(np.diff(x) < 0) + 1, "valeurs décroissantes"),
+        (strictement_croissantes, lambda x: np.flatnonzero(~(np.diff(x) > 0)) + 1, "valeurs non croissantes"),
+    ]
+    for noms, test, libelle in regles:
+        for nom in noms:
+            indices = test(np.asarray(series[nom], dtype=float))
+            if len(indices):
+                anomalies.append((f"{nom} : {libelle} n° {_numeros(indices)}", indices))
+    return anomalies
+
+def valider(series, **regles):
+    anomalies = controler(series, **regles)
+    if anomalies:
+        raise ErreurSaisie(" ; ".join(m for m, _ in anomalies),
+                           np.unique(np.concatenate([i for _, i in anomalies])))
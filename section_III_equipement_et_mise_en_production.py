@@ -1,70 +1,134 @@
 import streamlit as st
+import pandas as pd
 
-st.markdown("## III. EQUIPEMENT ET MISE EN PRODUCTION D'UN FORAGE")
+from calcul_III_equipement_et_mise_en_production import (
+    debit_crepine, volume_gravier, volume_laitier, COLONNES_PROGRAMME, CRITERES_DEBIT, RAPPORT_EAU_CIMENT,
+    MAJORATIONS, LONGUEUR_ELEMENT, debits_conception, conception_lot
+)
+from instrumentation import phase
+from taches import TERMINEE, tache_session
 
-# === MENU ===
-menu_option = st.selectbox("Choisir une étape :", [
-    "1️⃣ Colonne de captage",
-    "2️⃣ Gravier filtrant",
-    "3️⃣ Cimentation",
-    "4️⃣ Nettoyage",
-    "5️⃣ Développement"
-])
 
-# === ÉTAPE 1 : Colonne de captage ===
-if menu_option == "1️⃣ Colonne de captage":
-    st.markdown("### 🔩 Mise en place de la colonne de captage")
-    tube_diametre = st.number_input("Ø tube (mm)", value=150.0)
-    hauteur_crepine = st.number_input("H crépine (m)", value=6.0)
-    coeff_ouverture = st.slider("C (%)", min_value=10, max_value=40, value=20)
-    if st.button("Calculer le débit"):
-        C = coeff_ouverture / 100
-        phi = tube_diametre / 1000
-        q = 3.4 * phi * C
-        debit_total = q * hauteur_crepine
-        st.write(f"🔹 Débit admissible par mètre linéaire : {q:.2f} m³/h/m")
-        st.write(f"🔹 Débit total pour {hauteur_crepine} m : {debit_total:.2f} m³/h")
+# === Programme d'équipement (lot) ===
+def programme_equipement():
+    st.markdown("### 📋 Programme d'équipement de plusieurs forages")
+    st.caption(f"Une ligne par intervalle de la colonne : {', '.join(COLONNES_PROGRAMME)} ; colonnes optionnelles "
+               "D_trou_pouce, coeff_ouverture (%), annulaire (gravier, ciment, aucun), Q_conception (m³/h). "
+               "element : tube ou crepine.")
+    fichier = st.file_uploader("Programme (CSV)", type=["csv", "txt"], key="programme_equipement")
+    if fichier is not None:
+        programme = pd.read_csv(fichier, sep=None, engine="python")
+    else:
+        programme = st.data_editor(pd.DataFrame({
+            "forage": ["F1", "F1", "F1", "F2", "F2", "F2"], "de": [0.0, 30.0, 42.0, 0.0, 20.0, 32.0],
+            "a": [30.0, 42.0, 48.0, 20.0, 32.0, 36.0], "element": ["tube", "crepine", "tube"] * 2,
+            "D_tube_pouce": [6.0] * 6, "D_trou_pouce": [9.5] * 6, "coeff_ouverture": [20.0] * 6,
+            "annulaire": ["ciment", "gravier", "gravier", "ciment", "gravier", "gravier"],
+        }), num_rows="dynamic", key="programme_saisi")
 
-# === ÉTAPE 2 : Gravier filtrant ===
-elif menu_option == "2️⃣ Gravier filtrant":
-    st.markdown("### 🪨 Mise en place du massif de gravier filtrant")
-    D_hole = st.number_input("Ø trou (pouce)", value=8.0)
-    D_tube = st.number_input("Ø tube (pouce)", value=6.0)
-    h_gravier = st.number_input("Hauteur gravier (m)", value=10.0)
-    if st.button("Calculer volume de gravier"):
-        V = 0.28 * h_gravier * (D_hole**2 - D_tube**2)
-        st.write(f"🔹 Volume théorique de gravier : {V:.2f} litres")
+    # Débit de conception : résultats du lot IV.1.1 de la session, sinon colonne Q_conception
+    debits = None
+    tache = tache_session("IV.1.1 lot")
+    if tache is not None and tache.etat == TERMINEE:
+        critere = st.selectbox("Débit de conception (lot IV.1.1 de la session)", CRITERES_DEBIT)
+        debits = debits_conception(tache.resultat, critere)
 
-# === ÉTAPE 3 : Cimentation ===
-elif menu_option == "3️⃣ Cimentation":
-    st.markdown("### 🧱 Cimentation")
-    eau = st.number_input("Eau (L)", value=50.0)
-    ciment = st.number_input("Ciment (kg)", value=100.0)
-    if st.button("Calculer le volume de laitier"):
-        laitier = eau + ciment * 0.25
-        st.write(f"🔹 Volume de laitier produit : {laitier:.2f} litres")
+    c1, c2, c3, c4 = st.columns(4)
+    rapport = c1.number_input("Rapport eau/ciment (L/kg)", value=RAPPORT_EAU_CIMENT, min_value=0.1)
+    majoration_gravier = c2.number_input("Majoration gravier", value=MAJORATIONS["gravier"], min_value=1.0)
+    majoration_ciment = c3.number_input("Majoration ciment", value=MAJORATIONS["ciment"], min_value=1.0)
+    longueur = c4.number_input("Longueur d'un élément (m)", value=LONGUEUR_ELEMENT, min_value=0.5)
 
-# === ÉTAPE 4 : Nettoyage ===
-elif menu_option == "4️⃣ Nettoyage":
-    st.markdown("### 💧 Nettoyage du forage")
-    st.write("🔹 Rincer à l’eau claire pour éliminer le cake.")
-    st.write("🔹 Alterner rinçage et pompage air-lift jusqu’à obtention d’une eau claire.")
+    if st.button("Calculer le programme"):
+        try:
+            with phase("model"):
+                resultats, fournitures = conception_lot(
+                    programme, debits, rapport, {"gravier": majoration_gravier, "ciment": majoration_ciment},
+                    longueur)
+            insuffisantes = (resultats["crepine"] == "insuffisante").sum()
+            st.success(f"✅ {len(resultats)} forages, {resultats['profondeur_m'].sum():.0f} m équipés")
+            if insuffisantes:
+                st.warning(f"⚠️ Capacité des crépines inférieure au débit de conception : {insuffisantes} forage(s)")
+            st.dataframe(resultats, hide_index=True)
+            st.markdown("#### 🧾 Bordereau des fournitures")
+            st.dataframe(fournitures, hide_index=True)
+            c1, c2 = st.columns(2)
+            c1.download_button("💾 Résultats par forage", resultats.to_csv(index=False),
+                               file_name="equipement_forages.csv", mime="text/csv")
+            c2.download_button("💾 Bordereau", fournitures.to_csv(index=False),
+                               file_name="bordereau_fournitures.csv", mime="text/csv")
+        except Exception as e:
+            st.error(f"❌ Erreur : {e}")
 
-# === ÉTAPE 5 : Développement ===
-elif menu_option == "5️⃣ Développement":
-    st.markdown("### 🚿 Développement du forage")
-    methode = st.selectbox("Méthode :", [
-        "Surpompage", "Pompage alterné", "Pompage localisé", "Pistonnage",
-        "Jet haute pression", "Air lift", "Traitement chimique"
+
+def render():
+    st.markdown("## III. EQUIPEMENT ET MISE EN PRODUCTION D'UN FORAGE")
+
+    # === MENU ===
+    menu_option = st.selectbox("Choisir une étape :", [
+        "1️⃣ Colonne de captage",
+        "2️⃣ Gravier filtrant",
+        "3️⃣ Cimentation",
+        "4️⃣ Nettoyage",
+        "5️⃣ Développement",
+        "6️⃣ Programme de forages (lot)"
     ])
-    if st.button("Afficher méthode"):
-        dico = {
-            "Surpompage": "Pompage en paliers successifs (1,5 à 2× Q exploitation).",
-            "Pompage alterné": "Arrêts brusques pour mobiliser les fines.",
-            "Pompage localisé": "Utilisation d’un packer pour cibler une zone.",
-            "Pistonnage": "Va-et-vient vertical pour mobiliser les particules.",
-            "Jet haute pression": "Jets d’eau puissants pour décolmater les crépines.",
-            "Air lift": "Injection d’air pour pomper et agiter l’eau.",
-            "Traitement chimique": "Utilisation d’acide ou polyphosphate selon le colmatage."
-        }
-        st.write(f"🔧 {methode} : {dico[methode]}")
+
+    # === ÉTAPE 1 : Colonne de captage ===
+    if menu_option == "1️⃣ Colonne de captage":
+        st.markdown("### 🔩 Mise en place de la colonne de captage")
+        tube_diametre = st.number_input("Ø tube (mm)", value=150.0)
+        hauteur_crepine = st.number_input("H crépine (m)", value=6.0)
+        coeff_ouverture = st.slider("C (%)", min_value=10, max_value=40, value=20)
+        if st.button("Calculer le débit"):
+            q, debit_total = debit_crepine(tube_diametre, hauteur_crepine, coeff_ouverture)
+            st.write(f"🔹 Débit admissible par mètre linéaire : {q:.2f} m³/h/m")
+            st.write(f"🔹 Débit total pour {hauteur_crepine} m : {debit_total:.2f} m³/h")
+
+    # === ÉTAPE 2 : Gravier filtrant ===
+    elif menu_option == "2️⃣ Gravier filtrant":
+        st.markdown("### 🪨 Mise en place du massif de gravier filtrant")
+        D_hole = st.number_input("Ø trou (pouce)", value=8.0)
+        D_tube = st.number_input("Ø tube (pouce)", value=6.0)
+        h_gravier = st.number_input("Hauteur gravier (m)", value=10.0)
+        if st.button("Calculer volume de gravier"):
+            V = volume_gravier(D_hole, D_tube, h_gravier)
+            st.write(f"🔹 Volume théorique de gravier : {V:.2f} litres")
+
+    # === ÉTAPE 3 : Cimentation ===
+    elif menu_option == "3️⃣ Cimentation":
+        st.markdown("### 🧱 Cimentation")
+        eau = st.number_input("Eau (L)", value=50.0)
+        ciment = st.number_input("Ciment (kg)", value=100.0)
+        if st.button("Calculer le volume de laitier"):
+            laitier = volume_laitier(eau, ciment)
+            st.write(f"🔹 Volume de laitier produit : {laitier:.2f} litres")
+
+    # === ÉTAPE 4 : Nettoyage ===
+    elif menu_option == "4️⃣ Nettoyage":
+        st.markdown("### 💧 Nettoyage du forage")
+        st.write("🔹 Rincer à l’eau claire pour éliminer le cake.")
+        st.write("🔹 Alterner rinçage et pompage air-lift jusqu’à obtention d’une eau claire.")
+
+    # === ÉTAPE 5 : Développement ===
+    elif menu_option == "5️⃣ Développement":
+        st.markdown("### 🚿 Développement du forage")
+        methode = st.selectbox("Méthode :", [
+            "Surpompage", "Pompage alterné", "Pompage localisé", "Pistonnage",
+            "Jet haute pression", "Air lift", "Traitement chimique"
+        ])
+        if st.button("Afficher méthode"):
+            dico = {
+                "Surpompage": "Pompage en paliers successifs (1,5 à 2× Q exploitation).",
+                "Pompage alterné": "Arrêts brusques pour mobiliser les fines.",
+                "Pompage localisé": "Utilisation d’un packer pour cibler une zone.",
+                "Pistonnage": "Va-et-vient vertical pour mobiliser les particules.",
+                "Jet haute pression": "Jets d’eau puissants pour décolmater les crépines.",
+                "Air lift": "Injection d’air pour pomper et agiter l’eau.",
+                "Traitement chimique": "Utilisation d’acide ou polyphosphate selon le colmatage."
+            }
+            st.write(f"🔧 {methode} : {dico[methode]}")
+
+    # === ÉTAPE 6 : Programme de forages ===
+    elif menu_option == "6️⃣ Programme de forages (lot)":
+        programme_equipement()
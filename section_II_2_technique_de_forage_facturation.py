@@ -1,30 +1,108 @@
 import streamlit as st
+import numpy as np
+import pandas as pd
 
-st.markdown("## II. Technique de forage – Facturation")
+from graphiques import afficher_figure, nouvelle_figure
+from instrumentation import phase
+from projets import magasin
+from taches import lancer, suivre, tache_session
+from calcul_II_2_technique_de_forage_facturation import (
+    region_tarifs, PERCENTILES, COLONNES_CAMPAGNE, simuler_campagne
+)
 
-# === Paramètres d'entrée ===
-profondeur = st.number_input("Profondeur (m)", min_value=1.0, max_value=1000.0, value=50.0, step=1.0)
-vitesse = st.slider("Vitesse (m/j)", min_value=1.0, max_value=20.0, value=5.0, step=0.5)
-region_tarifs = {
-    "Zone sahélienne": 90,
-    "Forêt tropicale": 130,
-    "Montagne rocheuse": 170,
-    "Périphérie urbaine": 150
-}
-region = st.selectbox("Région (€/m)", list(region_tarifs.keys()))
-tarif_region = region_tarifs[region]
+SECTION = "II.2"
 
 monnaies = {"Euro (€)": "€", "Dollar ($)": "$", "Franc CFA (FCFA)": "FCFA"}
-monnaie_label = st.selectbox("Monnaie", list(monnaies.keys()))
-monnaie_symbole = monnaies[monnaie_label]
 
-# === Calculs ===
-if st.button("Simuler le chantier"):
-    duree = profondeur / vitesse
-    cout_total = profondeur * tarif_region
 
-    st.markdown("## 🏗️ Simulation de chantier")
-    st.markdown(f"""
+def figure_campagne(couts, durees, monnaie_symbole):
+    fig, axs = nouvelle_figure(1, 2, figsize=(14, 4))
+    axs[0].hist(couts, bins=100, color='steelblue')
+    axs[0].set_title("Coût de la campagne")
+    axs[0].set_xlabel(f"Coût ({monnaie_symbole})")
+    axs[1].hist(durees, bins=100, color='darkorange')
+    axs[1].set_title("Durée de la campagne")
+    axs[1].set_xlabel("Durée (jours)")
+    for ax, valeurs in zip(axs, (couts, durees)):
+        for v in np.percentile(valeurs, PERCENTILES):
+            ax.axvline(v, color='red', linestyle=':')
+    return fig
+
+def simulation_campagne(vitesse, monnaie_symbole):
+    st.markdown("### 📊 Simulation de campagne (plusieurs puits)")
+    st.caption(f"Fichier CSV : {', '.join(COLONNES_CAMPAGNE)} (colonnes optionnelles : foreuse, priorite)")
+    fichier = st.file_uploader("Puits de la campagne (CSV)", type=["csv", "txt"])
+    c1, c2, c3 = st.columns(3)
+    cv_vitesse = c1.number_input("Variabilité de la vitesse (CV)", min_value=0.0, value=0.2, step=0.05)
+    cv_tarif = c2.number_input("Variabilité des tarifs (CV)", min_value=0.0, value=0.1, step=0.05)
+    mobilisation = c3.number_input("Déplacement entre puits (j)", min_value=0.0, value=1.0, step=0.5)
+    c1, c2, c3 = st.columns(3)
+    n_foreuses = c1.number_input("Foreuses (si non affectées)", min_value=1, value=3, step=1)
+    n_scenarios = c2.select_slider("Scénarios", [1_000, 10_000, 100_000], value=10_000)
+    date_debut = c3.date_input("Début de campagne")
+
+    try:
+        if fichier is not None and st.button("Simuler la campagne"):
+            with phase("parse"):
+                puits = pd.read_csv(fichier, sep=None, engine="python")
+            lancer(f"{SECTION} campagne", simuler_campagne, puits, vitesse=vitesse, cv_vitesse=cv_vitesse,
+                   cv_tarif=cv_tarif, n_scenarios=n_scenarios, n_foreuses=int(n_foreuses),
+                   mobilisation=mobilisation, phase="model", relancer=True)
+        tache = tache_session(f"{SECTION} campagne")
+        if tache is not None and suivre(tache, "Simulation de la campagne"):
+            res = tache.resultat
+            fins = [pd.Timestamp(date_debut) + pd.Timedelta(days=float(d)) for d in res["duree"]]
+            st.dataframe(pd.DataFrame({
+                f"Coût ({monnaie_symbole})": res["cout"].round(0),
+                "Durée (j)": res["duree"].round(1),
+                "Fin de campagne": [d.date() for d in fins],
+            }, index=[f"P{p}" for p in PERCENTILES]))
+            afficher_figure(figure_campagne, res["couts"], res["durees"], monnaie_symbole)
+            if res["scenarios_planning"] < len(res["couts"]):
+                st.caption(f"Coûts sur {len(res['couts'])} scénarios ; durées et utilisation des foreuses sur "
+                           f"{res['scenarios_planning']} d'entre eux, planning refait pour chacun.")
+            st.markdown("#### 🚜 Utilisation des foreuses")
+            st.dataframe(res["foreuses"])
+            st.markdown("#### 🗓️ Planning de référence (vitesse médiane)")
+            st.dataframe(res["planning"])
+            st.download_button("💾 Télécharger le planning", res["planning"].to_csv(index=False),
+                               file_name="planning_campagne.csv", mime="text/csv")
+    except Exception as e:
+        st.error(f"❌ Erreur : {e}")
+
+
+def render():
+    st.markdown("## II. Technique de forage – Facturation")
+
+    # === Paramètres d'entrée ===
+    puits = st.session_state.get("puits_projet")
+    params = magasin().lire_parametres(puits[0], SECTION) if puits is not None else {}
+    suffixe = puits[0] if puits else ""
+    regions, noms_monnaies = list(region_tarifs.keys()), list(monnaies.keys())
+
+    profondeur = st.number_input("Profondeur (m)", min_value=1.0, max_value=1000.0,
+                                 value=float(params.get("profondeur", 50.0)), step=1.0, key=f"profondeur_{suffixe}")
+    vitesse = st.slider("Vitesse (m/j)", min_value=1.0, max_value=20.0, value=float(params.get("vitesse", 5.0)),
+                        step=0.5, key=f"vitesse_{suffixe}")
+    region = st.selectbox("Région (€/m)", regions, index=regions.index(params.get("region", regions[0])),
+                          key=f"region_{suffixe}")
+    tarif_region = region_tarifs[region]
+
+    monnaie_label = st.selectbox("Monnaie", noms_monnaies,
+                                 index=noms_monnaies.index(params.get("monnaie", noms_monnaies[0])),
+                                 key=f"monnaie_{suffixe}")
+    monnaie_symbole = monnaies[monnaie_label]
+
+    # === Calculs ===
+    if st.button("Simuler le chantier"):
+        if puits is not None:
+            magasin().ecrire_parametres(puits[0], SECTION, {"profondeur": profondeur, "vitesse": vitesse,
+                                                            "region": region, "monnaie": monnaie_label})
+        duree = profondeur / vitesse
+        cout_total = profondeur * tarif_region
+
+        st.markdown("## 🏗️ Simulation de chantier")
+        st.markdown(f"""
 - 📍 **Profondeur** : {profondeur} m  
 - 🚜 **Vitesse de forage** : {vitesse} m/jour  
 - 🗺️ **Coût unitaire régional** : {tarif_region} {monnaie_symbole}/m  
@@ -33,3 +111,6 @@ if st.button("Simuler le chantier"):
 
 > Montant exprimé en **{monnaie_label}**
 """)
+
+    with st.expander("Simulation de campagne (coûts et planning)"):
+        simulation_campagne(vitesse, monnaie_symbole)
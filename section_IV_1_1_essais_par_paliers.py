@@ -1,118 +1,230 @@
 import streamlit as st
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-from scipy.optimize import curve_fit
-
-
-st.markdown("## IV.1. Régime transitoire")
-st.markdown("## IV.1.1 Essais par paliers ou de courte durée en mode transitoire")
-st.markdown("### 🔎 Interprétation complète des essais par paliers")
-
-# === Saisie des données ===
-q_input = st.text_area("Débits Q (m³/h)", "10, 20, 30, 40, 50, 60, 70, 80, 90, 100")
-s_input = st.text_area("Rabattements s (m)", "1, 2, 3, 4, 5, 6.1, 7.4, 8.9, 10.6, 12.5")
-t_input = st.text_area("Temps t (min)", "60, 120, 180, 240, 300, 360, 420, 480, 540, 600")
-H = st.number_input("Épaisseur H (m)", value=5.0)
-nappe_type = st.radio("Type de nappe", ["libre", "captive"])
-method_options = st.multiselect("Méthodes", ["Graphique Bi-Log", "Méthode de Rorabaugh", "Méthode de Gosselin"],
-                                default=["Graphique Bi-Log", "Méthode de Rorabaugh", "Méthode de Gosselin"])
-
-def rorabaugh(Q, s):
-    def model(Q, A, B, n): return A * Q + B * Q**n
-    popt, _ = curve_fit(model, Q, s, bounds=(0, [np.inf, np.inf, 5]))
-    A, B, n = popt
-    log_Q = np.log10(Q)
-    s_Q_A = s / Q - A
-    log_s_Q_A = np.log10(s_Q_A)
-    return A, B, n, log_Q, log_s_Q_A
-
-def gosselin(Q, s):
-    def model(Q, B, n): return B * Q**n
-    popt, _ = curve_fit(model, Q, s, bounds=(0, [np.inf, 5]))
-    B, n = popt
-    log_Q = np.log10(Q)
-    log_s = np.log10(s)
-    return B, n, log_Q, log_s
-
-if st.button("Interpréter"):
+
+from graphiques import afficher_figure, decimer, nouvelle_figure, rendre_png
+from instrumentation import phase
+from projets import MemoireLocale, MemoireProjet, magasin, texte_serie
+from saisie import controler, lire_serie
+from taches import lancer, suivre, tache_session
+from calcul_IV_1_1_essais_par_paliers import TYPES_PUITS, COLONNES_LOT, GRAPHE_ESSAI, interpreter_lot, bootstrap_paliers
+from reechantillonnage import METHODES as METHODES_BOOTSTRAP, N_TIRAGES, NIVEAU
+
+SECTION = "IV.1.1"
+METHODES = ["Graphique Bi-Log", "Méthode de Rorabaugh", "Méthode de Gosselin"]
+
+AFFICHAGE_TYPES = {
+    "auto_developpement": st.warning,
+    "parfait": st.success,
+    "bien_developpe": st.success,
+    "vieilli": st.error,
+    "moyen": st.info,
+    "incoherent": st.error,
+}
+
+
+def figure_paliers(Q, s, t, s_model, Qc, rora=None, goss=None):
+    s_sur_Q = s / Q
+    fig, axs = nouvelle_figure(3, 2, figsize=(14, 12))
+    axs[0, 0].plot(Q, s, 'o-', label="s(Q)")
+    axs[0, 0].plot(Q, s_model, '--', label="Modèle")
+    axs[0, 0].axvline(Qc, color='red', linestyle=':', label="Qc")
+    axs[0, 0].invert_yaxis(); axs[0, 0].legend(); axs[0, 0].set_title("s = f(Q)")
+
+    axs[0, 1].plot(Q, s_sur_Q, 's-', color='orange')
+    axs[0, 1].axvline(Qc, color='red', linestyle=':')
+    axs[0, 1].invert_yaxis(); axs[0, 1].set_title("s/Q = f(Q)")
+
+    axs[1, 0].loglog(Q, s, 'o-')
+    axs[1, 0].axvline(Qc, color='red', linestyle=':')
+    axs[1, 0].set_title("Graphique Bi-log")
+
+    axs[1, 1].plot(*decimer(t, s), 'd-', color='green')
+    axs[1, 1].invert_yaxis()
+    axs[1, 1].set_title("s = f(t)")
+
+    if rora is not None:
+        n_r, log_Q_r, log_s_Q_A = rora
+        axs[2, 0].plot(log_Q_r, log_s_Q_A, 'o-', label=f"(n-1)={n_r-1:.2f}")
+        axs[2, 0].axvline(np.log10(Qc), color='red', linestyle=':', label="Qc")
+        axs[2, 0].set_title("Rorabaugh : Log(s/Q - A) = f(Log Q)")
+        axs[2, 0].legend()
+
+    if goss is not None:
+        n_g, log_Q_g, log_s_g = goss
+        axs[2, 1].plot(log_Q_g, log_s_g, 'o-', label=f"n={n_g:.2f}")
+        axs[2, 1].axvline(np.log10(Qc), color='red', linestyle=':', label="Qc")
+        axs[2, 1].set_title("Gosselin : Log(s) = f(Log Q)")
+        axs[2, 1].legend()
+    return fig
+
+# La figure est un noeud du graphe : elle n'est redessinée que si l'une de
+# ses entrées change, et relue du projet à la réouverture du puits. Déclarée
+# ici (le dessin n'a pas sa place dans le module de calcul) ; la déclaration
+# est idempotente, un rechargement de la section ne fait que la remplacer.
+@GRAPHE_ESSAI.noeud("figure", "Q", "s", "t", "interpretation", "rorabaugh", "gosselin")
+def _noeud_figure(Q, s, t, res, rora, goss):
+    return rendre_png(figure_paliers, Q, s, t, res["s_model"], res["Qc"],
+                      None if rora is None else (rora[2], rora[3], rora[4]),
+                      None if goss is None else (goss[1], goss[2], goss[3]))
+
+def memoire_essai(puits):
+    # Une mémoire par (session, puits) : les résultats déjà calculés restent
+    # disponibles d'un rerun à l'autre, et dans le projet si un puits est ouvert.
+    cle = f"memoire_{SECTION}_{puits[0] if puits else ''}"
+    if cle not in st.session_state:
+        st.session_state[cle] = MemoireLocale() if puits is None else MemoireProjet(magasin(), puits[0], SECTION)
+    return st.session_state[cle]
+
+def afficher_interpretation(Q, s, t, valeurs, recalcules):
+    res, rora, goss = valeurs["interpretation"], valeurs["rorabaugh"], valeurs["gosselin"]
+    A, B, s_model = res["A"], res["B"], res["s_model"]
+    Qc, s_opt, eta = res["Qc"], res["s_Qc"], res["eta"]
+    s_max, Qmax = res["s_max"], res["Qmax"]
+
+    df = pd.DataFrame({"Q (m³/h)": Q, "s (m)": s, "t (min)": t,
+                       "s/Q": s / Q, "Q/s": Q / s,
+                       "Ls = AQ": A * Q, "Qs = BQ²": B * Q**2})
+    st.dataframe(df)
+
+    st.success(f"✅ Modèle classique : s = AQ + BQ²  →  A = {A:.4f}, B = {B:.4f}")
+    st.info(f"📌 Qc = {Qc:.2f} m³/h ; s(Qc) = {s_opt:.2f} m ; η = {eta:.1f}%")
+    st.info(f"📌 s_max = {s_max:.2f} m  →  Qmax ≈ {Qmax:.2f} m³/h")
+
+    if rora is not None:
+        st.write(f"📘 Rorabaugh : A = {rora[0]:.4f}, B = {rora[1]:.4f}, n = {rora[2]:.2f}")
+    if goss is not None:
+        st.write(f"📙 Gosselin : B = {goss[0]:.4f}, n = {goss[1]:.2f}")
+
+    st.image(valeurs["figure"])
+    st.caption("♻️ Recalculé : " + (", ".join(recalcules) if recalcules else "rien (résultats repris)"))
+
+    st.markdown("### 🔎 Analyse du type de puits")
+    type_puits = str(res["type_puits"])
+    AFFICHAGE_TYPES[type_puits](TYPES_PUITS[type_puits])
+
+def figure_bootstrap(Qc, Qmax, niveau):
+    fig, axs = nouvelle_figure(1, 2, figsize=(14, 4))
+    for ax, x, nom in zip(axs, (Qc, Qmax), ("Qc", "Qmax")):
+        x = x[np.isfinite(x)]
+        ax.set_xlabel(f"{nom} (m³/h)")
+        if x.size == 0:
+            # Qc / Qmax non défini sur tous les pseudo-essais
+            ax.text(0.5, 0.5, "Aucun tirage valide", ha="center", va="center", transform=ax.transAxes)
+            ax.set_title(nom)
+            continue
+        ax.hist(x, bins=50, color='steelblue')
+        for v in np.percentile(x, [50 * (1 - niveau), 50 * (1 + niveau)]):
+            ax.axvline(v, color='red', linestyle=':')
+        ax.set_title(f"{nom} : intervalle à {100 * niveau:g} %")
+    return fig
+
+def intervalles_confiance(Q, s, H, nappe_type, non_lineaire):
+    st.markdown("### 🎲 Intervalles de confiance (bootstrap)")
+    st.caption("Résidus : tirage avec remise des écarts au modèle ; Blocs : blocs de paliers consécutifs. "
+               "Chaque pseudo-essai est réajusté (quadratique, et Rorabaugh / Gosselin si demandés).")
+    c1, c2, c3 = st.columns(3)
+    methode = c1.selectbox("Rééchantillonnage", METHODES_BOOTSTRAP, key="bootstrap_paliers")
+    n_tirages = c2.select_slider("Tirages", [500, 1000, 2000, 5000], value=N_TIRAGES, key="tirages_paliers")
+    niveau = c3.select_slider("Niveau de confiance", [0.8, 0.9, 0.95, 0.99], value=NIVEAU,
+                              format_func=lambda x: f"{100 * x:g} %", key="niveau_paliers")
+    calculer = st.button("🎲 Calculer les intervalles")
+    if calculer or tache_session(f"{SECTION} bootstrap") is not None:
+        tache = lancer(f"{SECTION} bootstrap", bootstrap_paliers, Q, s, H, nappe_type, n_tirages, methode,
+                       niveau=niveau, non_lineaire=non_lineaire, relancer=calculer)
+        if suivre(tache, "Bootstrap"):
+            tableau, tirages = tache.resultat
+            st.dataframe(tableau, hide_index=True)
+            afficher_figure(figure_bootstrap, tirages[("Quadratique", "Qc")], tirages[("Quadratique", "Qmax")],
+                            niveau)
+
+def traitement_par_lot():
+    st.markdown("### 🗂️ Traitement par lot")
+    st.caption(f"Fichier CSV au format long : {', '.join(COLONNES_LOT)} "
+               "(colonnes optionnelles : H, nappe_type)")
+    fichier = st.file_uploader("Essais par paliers (CSV)", type=["csv", "txt"])
+    H = st.number_input("Épaisseur H par défaut (m)", value=5.0, key="H_lot")
+    nappe_type = st.radio("Type de nappe par défaut", ["libre", "captive"], key="nappe_lot")
+    non_lineaire = st.checkbox("Ajustements Rorabaugh / Gosselin", value=True)
     try:
-        Q = np.array([float(x) for x in q_input.strip().split(',')])
-        s = np.array([float(x) for x in s_input.strip().split(',')])
-        t = np.array([float(x) for x in t_input.strip().split(',')])
-
-        if not (len(Q) == len(s) == len(t)):
-            st.error("❌ Q, s, t doivent avoir la même longueur.")
-        else:
-            s_sur_Q, Q_sur_s = s / Q, Q / s
-            B, A = np.polyfit(Q, s, 2)[:2]
-            s_model = A * Q + B * Q**2
-            diff_s, pente_var = np.gradient(s_model), np.gradient(np.gradient(s_model))
-            Qc = Q[np.argmax(pente_var)]
-            s_opt = s[np.argmax(pente_var)]
-            q_spec = np.mean(Q_sur_s)
-            s_max = H / 3 if nappe_type == "libre" else 0.75 * H
-            Qmax = s_max * q_spec
-            eta = (A * Qc) / (A * Qc + B * Qc**2) * 100
-
-            df = pd.DataFrame({"Q (m³/h)": Q, "s (m)": s, "t (min)": t,
-                               "s/Q": s_sur_Q, "Q/s": Q_sur_s,
-                               "Ls = AQ": A * Q, "Qs = BQ²": B * Q**2})
-            st.dataframe(df)
-
-            st.success(f"✅ Modèle classique : s = AQ + BQ²  →  A = {A:.4f}, B = {B:.4f}")
-            st.info(f"📌 Qc = {Qc:.2f} m³/h ; s(Qc) = {s_opt:.2f} m ; η = {eta:.1f}%")
-            st.info(f"📌 s_max = {s_max:.2f} m  →  Qmax ≈ {Qmax:.2f} m³/h")
-
-            fig, axs = plt.subplots(3, 2, figsize=(14, 12))
-            axs[0, 0].plot(Q, s, 'o-', label="s(Q)")
-            axs[0, 0].plot(Q, s_model, '--', label="Modèle")
-            axs[0, 0].axvline(Qc, color='red', linestyle=':', label="Qc")
-            axs[0, 0].invert_yaxis(); axs[0, 0].legend(); axs[0, 0].set_title("s = f(Q)")
-
-            axs[0, 1].plot(Q, s_sur_Q, 's-', color='orange')
-            axs[0, 1].axvline(Qc, color='red', linestyle=':')
-            axs[0, 1].invert_yaxis(); axs[0, 1].set_title("s/Q = f(Q)")
-
-            axs[1, 0].loglog(Q, s, 'o-')
-            axs[1, 0].axvline(Qc, color='red', linestyle=':')
-            axs[1, 0].set_title("Graphique Bi-log")
-
-            axs[1, 1].plot(t, s, 'd-', color='green')
-            axs[1, 1].invert_yaxis()
-            axs[1, 1].set_title("s = f(t)")
-
-            if "Méthode de Rorabaugh" in method_options:
-                A_r, B_r, n_r, log_Q_r, log_s_Q_A = rorabaugh(Q, s)
-                axs[2, 0].plot(log_Q_r, log_s_Q_A, 'o-', label=f"(n-1)={n_r-1:.2f}")
-                axs[2, 0].axvline(np.log10(Qc), color='red', linestyle=':', label="Qc")
-                axs[2, 0].set_title("Rorabaugh : Log(s/Q - A) = f(Log Q)")
-                axs[2, 0].legend()
-                st.write(f"📘 Rorabaugh : A = {A_r:.4f}, B = {B_r:.4f}, n = {n_r:.2f}")
-
-            if "Méthode de Gosselin" in method_options:
-                B_g, n_g, log_Q_g, log_s_g = gosselin(Q, s)
-                axs[2, 1].plot(log_Q_g, log_s_g, 'o-', label=f"n={n_g:.2f}")
-                axs[2, 1].axvline(np.log10(Qc), color='red', linestyle=':', label="Qc")
-                axs[2, 1].set_title("Gosselin : Log(s) = f(Log Q)")
-                axs[2, 1].legend()
-                st.write(f"📙 Gosselin : B = {B_g:.4f}, n = {n_g:.2f}")
-
-            st.pyplot(fig)
-
-            st.markdown("### 🔎 Analyse du type de puits")
-            if all(np.diff(Q) > 0) and all(np.diff(s) > 0):
-                if any(np.diff(s) < 0):
-                    st.warning("❗ Anomalie : auto-développement")
-                elif B < 0.001:
-                    st.success("💧 Puits parfait")
-                elif eta > 70:
-                    st.success("🔎 Puits réel bien développé")
-                elif eta < 50:
-                    st.error("⚠️ Puits vieilli ou mal dimensionné")
-                else:
-                    st.info("🧪 Puits réel à rendement moyen")
-            else:
-                st.error("❓ Données incohérentes")
+        if fichier is not None and st.button("Interpréter le lot"):
+            with phase("parse"):
+                donnees = pd.read_csv(fichier, sep=None, engine="python")
+            lancer(f"{SECTION} lot", interpreter_lot, donnees, H=H, nappe_type=nappe_type,
+                   non_lineaire=non_lineaire, relancer=True)
+        tache = tache_session(f"{SECTION} lot")
+        if tache is not None and suivre(tache, "Traitement du lot"):
+            resultats = tache.resultat.copy()
+            resultats["type_puits"] = resultats["type_puits"].map(TYPES_PUITS)
+            st.success(f"✅ {len(resultats)} puits interprétés en {tache.duree_s:.1f} s")
+            st.dataframe(resultats)
+            st.download_button("💾 Télécharger les résultats", resultats.to_csv(index=False),
+                               file_name="essais_par_paliers_resultats.csv", mime="text/csv")
     except Exception as e:
         st.error(f"❌ Erreur : {e}")
+
+
+def render():
+    st.markdown("## IV.1. Régime transitoire")
+    st.markdown("## IV.1.1 Essais par paliers ou de courte durée en mode transitoire")
+    st.markdown("### 🔎 Interprétation complète des essais par paliers")
+
+    # === Saisie des données (reprises du projet si un puits est ouvert) ===
+    puits = st.session_state.get("puits_projet")
+    series, params = {}, {}
+    if puits is not None:
+        with phase("parse"):
+            series = magasin().lire_series(puits[0], SECTION)
+            params = magasin().lire_parametres(puits[0], SECTION)
+        st.caption(f"📁 Puits **{puits[1]}**" + (" — données du projet" if series else ""))
+    suffixe = puits[0] if puits else ""
+    defauts = {"Q": "10, 20, 30, 40, 50, 60, 70, 80, 90, 100", "s": "1, 2, 3, 4, 5, 6.1, 7.4, 8.9, 10.6, 12.5",
+               "t": "60, 120, 180, 240, 300, 360, 420, 480, 540, 600"}
+    defauts.update({nom: texte_serie(x) for nom, x in series.items()})
+
+    q_input = st.text_area("Débits Q (m³/h)", defauts["Q"], key=f"Q_{suffixe}")
+    s_input = st.text_area("Rabattements s (m)", defauts["s"], key=f"s_{suffixe}")
+    t_input = st.text_area("Temps t (min)", defauts["t"], key=f"t_{suffixe}")
+    H = st.number_input("Épaisseur H (m)", value=float(params.get("H", 5.0)), key=f"H_{suffixe}")
+    nappes = ["libre", "captive"]
+    nappe_type = st.radio("Type de nappe", nappes, index=nappes.index(params.get("nappe_type", "libre")),
+                          key=f"nappe_{suffixe}")
+    method_options = st.multiselect("Méthodes", METHODES, default=params.get("methodes", METHODES),
+                                    key=f"methodes_{suffixe}")
+
+    # Un puits déjà interprété s'affiche à l'ouverture, sans recalcul ; une
+    # fois lancée, l'interprétation suit la saisie (tâche de fond annulée et
+    # relancée si les données changent)
+    interpreter = st.button("Interpréter")
+    if interpreter or series or tache_session(f"{SECTION} interpretation") is not None:
+        try:
+            with phase("parse"):
+                Q = lire_serie(q_input, "m3/h", "Q")
+                s = lire_serie(s_input, "m", "s")
+                t = lire_serie(t_input, "min", "t")
+                anomalies = controler({"Q": Q, "s": s, "t": t}, strictement_positives=["Q", "s"],
+                                      strictement_croissantes=["t"])
+
+            if anomalies:
+                for message, _ in anomalies:
+                    st.error(f"❌ {message}")
+            else:
+                if puits is not None and interpreter:
+                    magasin().ecrire_series(puits[0], SECTION, {"Q": Q, "s": s, "t": t},
+                                            unites={"Q": "m3/h", "s": "m", "t": "min"})
+                    magasin().ecrire_parametres(puits[0], SECTION, {"H": H, "nappe_type": nappe_type,
+                                                                    "methodes": method_options})
+                entrees = {"Q": Q, "s": s, "t": t, "H": H, "nappe_type": nappe_type,
+                           "avec_rorabaugh": "Méthode de Rorabaugh" in method_options,
+                           "avec_gosselin": "Méthode de Gosselin" in method_options}
+                tache = lancer(f"{SECTION} interpretation", GRAPHE_ESSAI.evaluer,
+                               ["interpretation", "rorabaugh", "gosselin", "figure"], entrees, memoire_essai(puits),
+                               relancer=interpreter)
+                if suivre(tache, "Interprétation"):
+                    afficher_interpretation(Q, s, t, *tache.resultat)
+                    intervalles_confiance(Q, s, H, nappe_type, entrees["avec_rorabaugh"] or entrees["avec_gosselin"])
+        except Exception as e:
+            st.error(f"❌ Erreur : {e}")
+
+    with st.expander("Traitement par lot (plusieurs puits)"):
+        traitement_par_lot()
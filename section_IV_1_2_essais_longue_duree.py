@@ -1,12 +1,22 @@
 import streamlit as st
 import numpy as np
-import matplotlib.pyplot as plt
 import pandas as pd
-from scipy.special import expi
-from scipy.optimize import curve_fit
 
-st.markdown("## IV.1. Régime transitoire")
-st.markdown("## IV.1.2 Essais de longue durée en mode transitoire (48h - 72h)")
+from graphiques import afficher_figure, decimer, nouvelle_figure
+from calcul_IV_1_2_essais_longue_duree import (
+    decimer_log, ajuster_essai, theis, COLONNES_PIEZOMETRES, preparer_piezometres, ajuster_theis_multi, jacob_composite,
+    distance_rabattement, theis_remontee, temps_agarwal, derivee_bourdet, detecter_regimes, suggerer_aquifere,
+    bootstrap_essai
+)
+from enregistreurs import UNITES_TEMPS, charger_enregistreur, empreinte
+from instrumentation import phase
+from projets import magasin, texte_serie
+from reechantillonnage import METHODES as METHODES_BOOTSTRAP, N_TIRAGES, NIVEAU
+from taches import lancer, suivre, tache_session
+from saisie import lire_serie, lire_valeur, valider
+
+SECTION = "IV.1.2"
+POINTS_DIAGNOSTIC = 300  # classes de log t pour le tracé de la dérivée
 
 # === Interface utilisateur ===
 aquifer_options = [
@@ -17,86 +27,343 @@ aquifer_options = [
     'Recharge latérale', 'Barrière imperméable'
 ]
 
-aquifer = st.selectbox("Aquifère :", aquifer_options)
-Q = st.text_input("Q (m³/h)", "200")
-r = st.number_input("Distance r (m)", value=110.0)
-t_pomp = st.text_area("Temps pompage (h)", "1 2 3 4")
-s_pomp = st.text_area("Rabatt. pompage (m)", "0.5 1.2 1.8 2.5")
-t_rem = st.text_area("Temps remontée (h)", "")
-s_rem = st.text_area("Rabatt. remontée (m)", "")
-
-def parse(text):
-    return np.array([float(x) for x in text.strip().split()]) if text.strip() else None
-
-def plot_data(tp, sp, tr=None, sr=None):
-    fig, axs = plt.subplots(1, 3, figsize=(18, 4))
+def figure_pompage(tp, sp):
+    tp, sp = decimer(np.asarray(tp, dtype=float), np.asarray(sp, dtype=float))
+    fig, axs = nouvelle_figure(1, 3, figsize=(18, 4))
     axs[0].plot(tp, sp, 'o-')
     axs[0].invert_yaxis(); axs[0].set_title("Pompage : s=f(t)")
     axs[1].semilogx(tp, sp, 'o-')
     axs[1].invert_yaxis(); axs[1].set_title("Pompage : s=f(log t)")
-    axs[2].plot(1/np.array(tp), sp, 'o-')
+    axs[2].plot(1/tp, sp, 'o-')
     axs[2].invert_yaxis(); axs[2].set_title("Pompage : s=f(1/t)")
     for ax in axs: ax.grid(True)
-    st.pyplot(fig)
+    return fig
+
+def figure_remontee(tr, sr, t_arret, rapport_max=None):
+    tr, sr = np.asarray(tr, dtype=float), np.asarray(sr, dtype=float)
+    # Le débit n'intervient pas dans la droite : Q = 1
+    _, rapport_S, pente = theis_remontee(1.0, t_arret, tr, sr, rapport_max)
+    rapport = (t_arret + tr) / tr
+    fig, ax2 = nouvelle_figure()
+    ax2.semilogx(*decimer(rapport, sr), 'o', ms=4, color='green', label="Mesures")
+    x = np.geomspace(1, rapport.max(), 50)
+    ax2.semilogx(x, pente * (np.log10(x) + np.log10(rapport_S)), '-', color='red',
+                 label=f"Δs' ≈ {pente:.3f} m par décade")
+    ax2.invert_xaxis()
+    ax2.set_title("Remontée (Theis) : s' = f(log t/t')")
+    ax2.set_xlabel("t/t'")
+    ax2.set_ylabel("Rabattement résiduel (m)")
+    ax2.grid(True, which="both", alpha=0.4)
+    ax2.legend()
+    return fig
+
+def figure_diagnostic(t, s, ds, segments, titre):
+    fig, ax = nouvelle_figure(figsize=(8, 5))
+    if len(t) > 2 * POINTS_DIAGNOSTIC:
+        # Dérivée et rabattement moyennés par classes de log t pour l'affichage
+        t_s, s = decimer_log(t, s, POINTS_DIAGNOSTIC)
+        t_d, ds = decimer_log(t, ds, POINTS_DIAGNOSTIC)
+    else:
+        t_s = t_d = t
+    ax.loglog(t_s, s, '.', ms=4, label="Rabattement s")
+    ax.loglog(t_d, np.where(ds > 0, ds, np.nan), '.', ms=4, color='red', label="Dérivée ds/d ln t")
+    couleurs = {}
+    for regime, debut, fin in segments[["régime", "t début (h)", "t fin (h)"]].itertuples(index=False):
+        nouveau = regime not in couleurs
+        couleur = couleurs.setdefault(regime, f"C{len(couleurs) + 2}")
+        ax.axvspan(debut, fin, color=couleur, alpha=0.15, label=regime if nouveau else None)
+    ax.set_xlabel("Temps (h)")
+    ax.set_ylabel("s, ds/d ln t (m)")
+    ax.set_title(titre)
+    ax.grid(True, which="both", alpha=0.4)
+    ax.legend(fontsize=8)
+    return fig
+
+def diagnostic(t, s, Q_val, L, titre, aquifere):
+    with phase("model"):
+        t, s, ds = derivee_bourdet(t, s, L)
+        segments = detecter_regimes(t, ds, Q_val)
+    st.markdown(f"#### {titre}")
+    afficher_figure(figure_diagnostic, t, s, ds, segments, titre)
+    if len(segments):
+        st.dataframe(segments, hide_index=True)
+    propose, explication = suggerer_aquifere(segments)
+    if propose is None or propose == aquifere:
+        st.info(f"🩺 {explication}")
+    else:
+        st.warning(f"🩺 {explication} Aquifère proposé : **{propose}** (sélectionné : {aquifere}).")
+
+def figure_ajustement(tp, sp, s_modele, nom):
+    fig, ax = nouvelle_figure(figsize=(8, 5))
+    tp_d, sp_d = decimer(tp, sp)
+    ax.loglog(tp_d, sp_d, 'o', ms=4, label="Mesures")
+    ax.loglog(tp, s_modele, '-', color='red', label=nom)
+    ax.set_xlabel("Temps (h)")
+    ax.set_ylabel("Rabattement (m)")
+    ax.set_title(f"Ajustement : {nom}")
+    ax.grid(True, which="both", alpha=0.4)
+    ax.legend()
+    return fig
+
+def figure_bootstrap(tirages, niveau):
+    fig, axs = nouvelle_figure(1, 2, figsize=(14, 4))
+    for ax, parametre, unite in zip(axs, ("T", "S"), (" (m²/j)", "")):
+        for (methode, p), x in tirages.items():
+            x = x[np.isfinite(x) & (x > 0)] if p == parametre else []
+            if len(x):
+                ax.hist(x, bins=np.geomspace(x.min(), x.max(), 50) if x.max() > x.min() else 10,
+                        histtype="step", label=methode)
+        ax.set_xscale("log")
+        ax.set_xlabel(parametre + unite)
+        ax.set_title(f"{parametre} : tirages bootstrap (intervalles à {100 * niveau:g} %)")
+        if ax.patches:
+            ax.legend(fontsize=8)
+        else:
+            ax.text(0.5, 0.5, "Aucun tirage valide", ha="center", va="center", transform=ax.transAxes)
+    return fig
+
+def intervalles_confiance(aquifere, Q_val, tp, sp, r, tr, sr, t_arret, rapport_max):
+    st.markdown("### 🎲 Intervalles de confiance (bootstrap)")
+    st.caption("Blocs : blocs de résidus consécutifs (séries d'enregistreur autocorrélées) ; Résidus : tirage "
+               "point par point. Chaque méthode est réajustée sur chaque pseudo-série.")
+    c1, c2, c3 = st.columns(3)
+    methode = c1.selectbox("Rééchantillonnage", METHODES_BOOTSTRAP, index=1, key="bootstrap_essai")
+    n_tirages = c2.select_slider("Tirages", [500, 1000, 2000, 5000], value=N_TIRAGES, key="tirages_essai")
+    niveau = c3.select_slider("Niveau de confiance", [0.8, 0.9, 0.95, 0.99], value=NIVEAU,
+                              format_func=lambda x: f"{100 * x:g} %", key="niveau_essai")
+    calculer = st.button("🎲 Calculer les intervalles")
+    if calculer or tache_session(f"{SECTION} bootstrap") is not None:
+        tache = lancer(f"{SECTION} bootstrap", bootstrap_essai, aquifere, Q_val, tp, sp, r, tr, sr, t_arret,
+                       rapport_max, n_tirages, methode, niveau=niveau, relancer=calculer)
+        if suivre(tache, "Bootstrap"):
+            tableau, tirages = tache.resultat
+            st.dataframe(tableau, hide_index=True)
+            afficher_figure(figure_bootstrap, tirages, niveau)
+
+def figure_composite(piezos, T, S, Q_val):
+    fig, axs = nouvelle_figure(1, 2, figsize=(16, 5))
+    for k, nom in enumerate(piezos["noms"]):
+        m = piezos["groupe"] == k
+        t, s, r = piezos["t"][m], piezos["s"][m], piezos["r_piezo"][k]
+        x, y = decimer(t / r**2, s)
+        axs[0].semilogx(x, y, '.', ms=3, label=f"{nom} (r = {r:g} m)")
+        t_d, s_d = decimer(t, s)
+        points = axs[1].loglog(t_d, s_d, '.', ms=3)[0]
+        t_m = np.geomspace(t.min(), t.max(), 200)
+        axs[1].loglog(t_m, theis(Q_val, t_m, r, T, S), '-', lw=1, color=points.get_color())
+    axs[0].set_xlabel("t / r² (h/m²)")
+    axs[0].set_title("Courbe composite")
+    axs[0].invert_yaxis()
+    axs[0].legend(fontsize=8)
+    axs[1].set_xlabel("Temps (h)")
+    axs[1].set_title(f"Theis conjoint : T ≈ {T:.1f} m²/j, S ≈ {S:.2e}")
+    for ax in axs:
+        ax.set_ylabel("Rabattement (m)")
+        ax.grid(True, which="both", alpha=0.4)
+    return fig
+
+def figure_distance(r_piezo, temps, s_t, tableau):
+    fig, ax = nouvelle_figure(figsize=(8, 5))
+    r = np.geomspace(r_piezo.min() / 2, r_piezo.max() * 2, 50)
+    for j, t in enumerate(temps):
+        points = ax.semilogx(r_piezo, s_t[:, j], 'o', label=f"t = {t:g} h")[0]
+        pente, r0 = tableau["Δs par décade (m)"].iloc[j], tableau["r0 (m)"].iloc[j]
+        if np.isfinite(pente):
+            ax.semilogx(r, pente * np.log10(r0 / r), '-', color=points.get_color())
+    ax.set_xlabel("Distance (m)")
+    ax.set_ylabel("Rabattement (m)")
+    ax.set_title("Distance-rabattement")
+    ax.invert_yaxis()
+    ax.grid(True, which="both", alpha=0.4)
+    ax.legend()
+    return fig
+
+def multi_piezometres(Q):
+    st.markdown("### 🧭 Inversion conjointe multi-piézomètres")
+    st.caption(f"Fichier CSV en table longue : {', '.join(COLONNES_PIEZOMETRES)} (r en m, t en h, s en m)")
+    fichier = st.file_uploader("Séries des piézomètres (CSV)", type=["csv", "txt"], key="piezometres")
+    if fichier is None:
+        return
+    cle = empreinte(fichier.getvalue())
+    if st.session_state.get("piezometres_cle") != cle:
+        with phase("parse"):
+            st.session_state["piezometres"] = pd.read_csv(fichier, sep=None, engine="python")
+        st.session_state["piezometres_cle"] = cle
+    df = st.session_state["piezometres"]
+    if "piezometre" not in df.columns:
+        st.error("❌ Colonne manquante : piezometre")
+        return
+    noms = sorted(df["piezometre"].unique(), key=str)
+    choisis = st.multiselect("Piézomètres retenus", noms, default=noms)
+    c1, c2 = st.columns(2)
+    u_max = c1.number_input("Jacob : u maximal", min_value=0.001, max_value=1.0, value=0.05, format="%.3f")
+    temps = c2.text_input("Temps de la distance-rabattement (h)", "1 10 24")
+
+    if st.button("🧭 Ajuster T et S sur tous les piézomètres"):
+        try:
+            Q_val = lire_valeur(Q, "m3/h", "Débit Q")
+            temps = lire_serie(temps, "h", "Temps")
+            with phase("parse"):
+                piezos = preparer_piezometres(df[df["piezometre"].isin(choisis)])
+            if not len(piezos["noms"]):
+                st.error("❌ Aucun piézomètre retenu.")
+                return
+            with phase("fit"):
+                T, S, rmse, rmse_piezo = ajuster_theis_multi(
+                    Q_val, piezos["t"], piezos["s"], piezos["r"], piezos["groupe"], len(piezos["noms"]))
+                T_j, S_j, pente = jacob_composite(Q_val, piezos["t"], piezos["s"], piezos["r"], u_max=u_max)
+            st.success(f"✅ Theis conjoint : T ≈ {T:.2f} m²/j, S ≈ {S:.2e}, écart quadratique ≈ {rmse:.3f} m")
+            st.success(f"✅ Jacob composite (t/r²) : T ≈ {T_j:.2f} m²/j, S ≈ {S_j:.2e}, "
+                       f"Δs par décade ≈ {pente:.3f} m")
+            st.dataframe(pd.DataFrame({
+                "Piézomètre": piezos["noms"], "r (m)": piezos["r_piezo"],
+                "Points": np.bincount(piezos["groupe"], minlength=len(piezos["noms"])),
+                "Écart quadratique Theis (m)": rmse_piezo,
+            }), hide_index=True)
+            afficher_figure(figure_composite, piezos, T, S, Q_val)
 
+            if temps is not None:
+                with phase("fit"):
+                    tableau, s_t = distance_rabattement(Q_val, piezos, temps)
+                st.markdown("#### 📏 Distance-rabattement")
+                st.dataframe(tableau, hide_index=True)
+                afficher_figure(figure_distance, piezos["r_piezo"], temps, s_t, tableau)
+        except Exception as e:
+            st.error(f"❌ Erreur : {e}")
+
+def plot_data(tp, sp, tr=None, sr=None, t_arret=None, rapport_max=None):
+    afficher_figure(figure_pompage, tp, sp)
     if tr is not None and sr is not None:
-        fig2, ax2 = plt.subplots()
-        ax2.plot(tr, sr, 'o-', color='green')
-        ax2.invert_yaxis()
-        ax2.set_title("Remontée : s = f(t)")
-        ax2.set_xlabel("Temps (h)")
-        ax2.set_ylabel("Remontée (m)")
-        ax2.grid(True)
-        st.pyplot(fig2)
-
-def jacob(Q_m3h, t, s, r):
-    Q = Q_m3h * 24  # conversion m³/h → m³/j
-    log_t = np.log10(t)
-    slope, intercept = np.polyfit(log_t, s, 1)
-    T = 2.3 * Q / (4 * np.pi * slope)
-    t0 = 10 ** (-intercept / slope)
-    S = (2.25 * T * t0) / (r**2)
-    return T, S, slope
-
-if st.button("📈 Lancer l'analyse"):
-    try:
-        Q_val = float(Q)
-        tp = parse(t_pomp)
-        sp = parse(s_pomp)
-        tr = parse(t_rem)
-        sr = parse(s_rem)
-
-        st.write(f"🔍 Aquifère sélectionné : **{aquifer}**")
-        plot_data(tp, sp, tr, sr)
-
-        synthese = []
-
-        # Méthode de Jacob (pompage)
-        if aquifer in ['Nappe captive', 'Nappe semi-captive', 'Nappe captive (gradient initial)']:
-            if tp is not None and sp is not None:
-                T, S, slope = jacob(Q_val, tp, sp, r)
-                st.success(f"✅ Jacob (pompage) : T ≈ {T:.2f} m²/j, S ≈ {S:.2e}, pente ≈ {slope:.3f}")
-                synthese.append({"Méthode": "Jacob (pompage)", "T (m²/j)": T, "S": S, "Note": "s = f(log t)"})
-
-        # Méthode de Jacob (remontée)
-        if tr is not None and sr is not None and len(tr) == len(sr):
-            T, S, slope = jacob(Q_val, tr, sr, r)
-            st.success(f"✅ Jacob (remontée) : T ≈ {T:.2f} m²/j, S ≈ {S:.2e}")
-            synthese.append({"Méthode": "Jacob (remontée)", "T (m²/j)": T, "S": S, "Note": "s = f(log t) remontée"})
-
-        # Méthode de Theis (approximée)
-        if aquifer in ['Nappe captive', 'Nappe captive (gradient initial)']:
-            T_est, S_est = 250, 1e-4
-            st.info(f"ℹ️ Theis : T ≈ {T_est} m²/j, S ≈ {S_est} (valeurs estimées)")
-            synthese.append({"Méthode": "Theis (approximé)", "T (m²/j)": T_est, "S": S_est, "Note": "expi(-u) non inversé"})
-
-        if aquifer in ['Nappe libre', 'Nappe semi-libre (débit retardé)', 'Puits à pénétration partielle', 'Aquifère bicouche']:
-            st.warning("⚠️ Méthodes spécifiques (Neuman, Boulton, Hantush) à intégrer dans une version étendue.")
-
-        if synthese:
-            df = pd.DataFrame(synthese)
-            st.markdown("### 🧾 Synthèse des résultats")
-            st.dataframe(df.fillna("-"))
-
-    except Exception as e:
-        st.error(f"❌ Erreur : {e}")
+        afficher_figure(figure_remontee, tr, sr, t_arret, rapport_max)
+
+
+def render():
+    st.markdown("## IV.1. Régime transitoire")
+    st.markdown("## IV.1.2 Essais de longue durée en mode transitoire (48h - 72h)")
+
+    # Saisies reprises du projet si un puits est ouvert
+    puits = st.session_state.get("puits_projet")
+    series, params = {}, {}
+    if puits is not None:
+        with phase("parse"):
+            series = magasin().lire_series(puits[0], SECTION)
+            params = magasin().lire_parametres(puits[0], SECTION)
+        st.caption(f"📁 Puits **{puits[1]}**" + (" — données du projet" if series else ""))
+    suffixe = puits[0] if puits else ""
+    defauts = {"tp": "1 2 3 4", "sp": "0.5 1.2 1.8 2.5", "tr": "", "sr": ""}
+    defauts.update({nom: texte_serie(x) for nom, x in series.items()})
+
+    aquifer = st.selectbox("Aquifère :", aquifer_options,
+                           index=aquifer_options.index(params.get("aquifere", aquifer_options[0])),
+                           key=f"aquifere_{suffixe}")
+    Q = st.text_input("Q (m³/h)", params.get("Q", "200"), key=f"Q_{suffixe}")
+    r = st.number_input("Distance r (m)", value=float(params.get("r", 110.0)), key=f"r_{suffixe}")
+    t_pomp = st.text_area("Temps pompage (h)", defauts["tp"], key=f"tp_{suffixe}")
+    s_pomp = st.text_area("Rabatt. pompage (m)", defauts["sp"], key=f"sp_{suffixe}")
+    t_rem = st.text_area("Temps remontée (h)", defauts["tr"], key=f"tr_{suffixe}")
+    s_rem = st.text_area("Rabatt. remontée (m)", defauts["sr"], key=f"sr_{suffixe}")
+    st.caption("Remontée : temps depuis l'arrêt du pompage (t') et rabattement résiduel (s').")
+    c1, c2 = st.columns(2)
+    duree = c1.text_input("Durée du pompage (h), vide : dernier temps du pompage", params.get("t_arret", ""),
+                          key=f"t_arret_{suffixe}")
+    rapport_max = c2.number_input("Remontée : t/t' maximal retenu (0 : tous les points)", min_value=0.0,
+                                  value=float(params.get("rapport_max", 0.0)), key=f"rapport_max_{suffixe}")
+    L = st.slider("Dérivée de Bourdet : fenêtre L (en ln t)", 0.05, 1.0, float(params.get("L", 0.2)), step=0.05,
+                  key=f"L_{suffixe}")
+
+    # === Fichier d'enregistreur (remplace la saisie du pompage) ===
+    enregistreur = None
+    with st.expander("📂 Fichier d'enregistreur de pression (CSV / TSV)"):
+        fichier = st.file_uploader("Enregistreur (1re colonne : temps)", type=["csv", "tsv", "txt"])
+        unite_temps = st.selectbox("Unité du temps (si numérique)", list(UNITES_TEMPS.keys()))
+        niveaux = st.checkbox("Valeurs en niveaux (rabattement = valeur − valeur initiale)")
+        n_classes = st.slider("Nombre de classes de temps (échelle log)", 50, 1000, 200, step=50)
+        if fichier is not None:
+            try:
+                with phase("parse"):
+                    noms, donnees = charger_enregistreur(fichier, unite_temps)
+                colonne = st.selectbox("Colonne de rabattement", noms[1:])
+                j = noms.index(colonne)
+                # Valeurs illisibles : NaN dans la colonne, écartées à l'usage
+                lues = np.isfinite(donnees[:, j])
+                if not lues.any():
+                    raise ValueError(f"Colonne « {colonne} » sans valeur numérique")
+                enregistreur = donnees, j, donnees[np.argmax(lues), j]
+                st.caption(f"{int(lues.sum()):,} enregistrements lus")
+            except ValueError as e:
+                st.error(f"❌ Erreur : {e}")
+
+    analyser = st.button("📈 Lancer l'analyse")
+    if analyser or tache_session(f"{SECTION} analyse") is not None:
+        try:
+            Q_val = lire_valeur(Q, "m3/h", "Q")
+            with phase("parse"):
+                if enregistreur is not None:
+                    donnees, j, initiale = enregistreur
+                    tp, sp = decimer_log(donnees[:, 0], donnees[:, j], n_classes)
+                    if niveaux:
+                        sp = sp - initiale
+                else:
+                    tp = lire_serie(t_pomp, "h", "Temps pompage")
+                    sp = lire_serie(s_pomp, "m", "Rabatt. pompage")
+                tr = lire_serie(t_rem, "h", "Temps remontée")
+                sr = lire_serie(s_rem, "m", "Rabatt. remontée")
+                valider({"Temps pompage": tp, "Rabatt. pompage": sp}, strictement_positives=["Temps pompage"],
+                        strictement_croissantes=["Temps pompage"])
+                if tr is not None or sr is not None:
+                    valider({"Temps remontée": tr, "Rabatt. remontée": sr}, strictement_positives=["Temps remontée"],
+                            strictement_croissantes=["Temps remontée"])
+                t_arret = lire_valeur(duree, "h", "Durée du pompage") if duree.strip() else float(tp.max())
+            if puits is not None and analyser:
+                magasin().ecrire_series(puits[0], SECTION, {"tp": tp, "sp": sp, "tr": tr, "sr": sr},
+                                        unites={"tp": "h", "sp": "m", "tr": "h", "sr": "m"})
+                magasin().ecrire_parametres(puits[0], SECTION, {"aquifere": aquifer, "Q": Q, "r": r, "t_arret": duree,
+                                                                "rapport_max": rapport_max, "L": L})
+
+            st.write(f"🔍 Aquifère sélectionné : **{aquifer}**")
+            plot_data(tp, sp, tr, sr, t_arret, rapport_max or None)
+
+            # Diagnostic sur la série complète de l'enregistreur (dérivée vectorisée, en O(n log n))
+            st.markdown("### 🩺 Diagnostic par la dérivée de Bourdet")
+            if enregistreur is not None:
+                donnees, j, initiale = enregistreur
+                diagnostic(donnees[:, 0], donnees[:, j] - initiale if niveaux else donnees[:, j],
+                           Q_val, L, "Pompage", aquifer)
+            else:
+                diagnostic(tp, sp, Q_val, L, "Pompage", aquifer)
+            if tr is not None and sr is not None:
+                diagnostic(temps_agarwal(t_arret, tr), np.interp(t_arret, tp, sp) - sr, Q_val, L,
+                           "Remontée (temps équivalent d'Agarwal)", aquifer)
+
+            # Les ajustements tournent en tâche de fond ; une saisie modifiée annule la précédente
+            tache = lancer(f"{SECTION} analyse", ajuster_essai, aquifer, Q_val, tp, sp, r, tr, sr, t_arret,
+                           rapport_max or None, relancer=analyser)
+            if suivre(tache, "Ajustements"):
+                synthese = []
+                for res in tache.resultat:
+                    texte = f"✅ {res['methode']} : T ≈ {res['T']:.2f} m²/j"
+                    if np.isfinite(res["S"]):
+                        texte += f", S ≈ {res['S']:.2e}"
+                    if "s_modele" in res or not np.isfinite(res["S"]):
+                        texte += f", {res['note']}"
+                    if "pente" in res:
+                        texte += f", pente ≈ {res['pente']:.3f}"
+                    if "rmse" in res:
+                        texte += f", écart quadratique ≈ {res['rmse']:.3f} m"
+                    st.success(texte)
+                    if "s_modele" in res:
+                        afficher_figure(figure_ajustement, tp, sp, res["s_modele"], res["methode"])
+                    synthese.append({"Méthode": res["methode"], "T (m²/j)": res["T"], "S": res["S"],
+                                     "Note": res["note"]})
+
+                if synthese:
+                    df = pd.DataFrame(synthese)
+                    st.markdown("### 🧾 Synthèse des résultats")
+                    st.dataframe(df.fillna({"Note": "-"}))
+                intervalles_confiance(aquifer, Q_val, tp, sp, r, tr, sr, t_arret, rapport_max or None)
+
+        except Exception as e:
+            st.error(f"❌ Erreur : {e}")
+
+    with st.expander("Inversion conjointe multi-piézomètres"):
+        multi_piezometres(Q)
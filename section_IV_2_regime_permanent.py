@@ -1,134 +1,257 @@
 import streamlit as st
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import scipy.special as sc
-
-st.markdown("## IV.2 Régime permanent : Essais de nappe en mode permanent")
-
-# === Fonctions fondamentales ===
-def calc_transmissivite(K, e):
-    return K * e
-
-def calc_permeabilite(T, e):
-    return T / e
-
-def calc_rayon_influence(H, s):
-    return H * np.exp(2 * np.pi * s / H)
-
-def calc_vitesse(Q, S, n):
-    return Q / (S * n)
-
-# === Méthodes ===
-def thiem(Q, T, r, R):
-    return (Q / (2 * np.pi * T)) * np.log(R / r)
-
-def thiem_dupuit(Q, T, r, R, h0):
-    s = thiem(Q, T, r, R)
-    return h0 - s, s
-
-def de_glee(Q, T, r, L):
-    u = r / L
-    return (Q / (4 * np.pi * T)) * sc.expn(0, u)
-
-def hantush_drainance(Q, T, r, L):
-    u = r / L
-    return (Q / (4 * np.pi * T)) * sc.expn(0, u)
-
-def gradient_initial(Q, T, r, R, i):
-    return thiem(Q, T, r, R) + i * r
-
-def huisman(Q, T, r, R, H, h):
-    return thiem(Q, T, r, R) * (H / h)
-
-def dietz(Q, T, r, a):
-    return (Q / (4 * np.pi * T)) * np.log((a + np.sqrt(a**2 + r**2)) / r)
-
-# === Contexte
-contexts = {
-    'Nappe libre sans réalimentation': ['Q', 'T', 'r1', 'R', 'h0'],
-    'Nappe captive sans réalimentation': ['Q', 'T', 'r1', 'R'],
-    'Nappe semi-captive (drainance)': ['Q', 'T', 'r1', 'L'],
-    'Nappe libre réalimentée': ['Q', 'T', 'r1', 'L'],
-    'Nappe libre à substratum incliné': ['Q', 'T', 'r1', 'L'],
-    'Nappe captive avec gradient initial': ['Q', 'T', 'r1', 'R', 'i'],
-    'Aquifère à frontière rectiligne': ['Q', 'T', 'r1', 'a'],
-    'Aquifère à pénétration partielle': ['Q', 'T', 'r1', 'R', 'H', 'h'],
-    'Aquifère bicouche': ['Q', 'T', 'r1', 'L'],
-    'Aquifère incliné à épaisseur constante': ['Q', 'T', 'r1', 'R', 'i'],
-    'Nappe semi-libre': ['Q', 'T', 'r1', 'r2', 'h1', 'h2', 'e']
-}
-
-contexte = st.selectbox("Contexte", list(contexts.keys()))
-inputs = {}
-for param in contexts[contexte]:
-    inputs[param] = st.number_input(param, value=1.0, step=0.1)
-
-K = st.number_input("K (m/s)", value=0.002)
-e = st.number_input("Épaisseur e (m)", value=30.0)
-n = st.number_input("Porosité n", value=0.25)
-H = st.number_input("Hauteur nappe H (m)", value=20.0)
-
-if st.button("▶️ Calculer"):
+
+from graphiques import afficher_figure, nouvelle_figure
+from instrumentation import phase
+from projets import magasin
+from taches import lancer, suivre, tache_session
+from calcul_IV_2_regime_permanent import (
+    calc_transmissivite, calc_rayon_influence, calc_vitesse,
+    contexts, rabattement_contexte, estimation_K_semi_libre,
+    LOIS, PERCENTILES, monte_carlo_contexte, tornade, MODELES_CHAMP, NATURES_FRONTIERE, grille_rabattement, rabattement_points,
+    optimiser_champ
+)
+
+SECTION = "IV.2"
+
+
+def figure_cone(Q, T, r1, R):
+    r_vals = np.linspace(r1, R, 100)
+    s_vals = (Q / (2 * np.pi * T)) * np.log(R / r_vals)
+    fig, ax = nouvelle_figure()
+    ax.plot(r_vals, s_vals)
+    ax.set_title("Cône de rabattement")
+    ax.set_xlabel("r (m)")
+    ax.set_ylabel("s (m)")
+    ax.grid(True)
+    return fig
+
+def figure_champ(x, y, s, puits_xy, points_xy=None):
+    fig, ax = nouvelle_figure(figsize=(9, 7))
+    cs = ax.contourf(x, y, s, levels=20, cmap="viridis_r")
+    ax.contour(x, y, s, levels=cs.levels, colors="k", linewidths=0.3)
+    fig.colorbar(cs, ax=ax, label="s (m)")
+    ax.plot(puits_xy[:, 0], puits_xy[:, 1], 'r^', label="Puits")
+    if points_xy is not None and len(points_xy):
+        ax.plot(points_xy[:, 0], points_xy[:, 1], 'kx', label="Points de contrôle")
+    ax.set_aspect("equal")
+    ax.set_xlabel("x (m)")
+    ax.set_ylabel("y (m)")
+    ax.set_title("Carte de rabattement")
+    ax.legend()
+    return fig
+
+def figure_incertitude(s, s_ref, lignes):
+    fig, axs = nouvelle_figure(1, 2, figsize=(14, 4))
+    axs[0].hist(s, bins=100, color='steelblue')
+    for p, v in zip(PERCENTILES, np.percentile(s, PERCENTILES)):
+        axs[0].axvline(v, color='red', linestyle=':')
+        axs[0].annotate(f"P{p}", (v, 0), textcoords="offset points", xytext=(2, 5), color='red')
+    axs[0].set_title("Distribution du rabattement")
+    axs[0].set_xlabel("s (m)")
+
+    noms = [l[0] for l in lignes]
+    bas = np.array([l[1] for l in lignes]) - s_ref
+    haut = np.array([l[2] for l in lignes]) - s_ref
+    y = np.arange(len(noms))
+    axs[1].barh(y, bas, color='tab:blue', label="P10 du paramètre")
+    axs[1].barh(y, haut, color='tab:orange', label="P90 du paramètre")
+    axs[1].set_yticks(y, noms)
+    axs[1].invert_yaxis()
+    axs[1].axvline(0, color='k', linewidth=0.8)
+    axs[1].set_title(f"Tornade autour de s(P50) = {s_ref:.2f} m")
+    axs[1].set_xlabel("Δs (m)")
+    axs[1].legend()
+    return fig
+
+def incertitude(contexte, inputs, H):
+    st.markdown("### 🎲 Incertitude : tirages Monte-Carlo")
+    st.caption("Fixe (a) ; Uniforme (min a, max b) ; Normale (moyenne a, écart-type b) ; "
+               "Lognormale (médiane a, écart-type de ln b)")
+    lois = st.data_editor(
+        pd.DataFrame({"Paramètre": list(inputs), "Loi": "Fixe",
+                      "a": list(inputs.values()), "b": 0.0}),
+        column_config={"Loi": st.column_config.SelectboxColumn("Loi", options=LOIS, required=True)},
+        disabled=["Paramètre"], hide_index=True, key=f"lois_{contexte}")
+    n_tirages = st.select_slider("Nombre de tirages", [1_000, 10_000, 100_000, 1_000_000], value=100_000)
+
+    # Les tirages tournent en tâche de fond ; des lois modifiées annulent la précédente
+    tirer = st.button("🎲 Lancer les tirages")
+    if not (tirer or tache_session(f"{SECTION} tirages") is not None):
+        return
     try:
-        s = 0
-        if contexte == 'Nappe libre sans réalimentation':
-            _, s = thiem_dupuit(inputs['Q'], inputs['T'], inputs['r1'], inputs['R'], inputs['h0'])
-            methode = "Thiem-Dupuit"
-        elif contexte == 'Nappe captive sans réalimentation':
-            s = thiem(inputs['Q'], inputs['T'], inputs['r1'], inputs['R'])
-            methode = "Thiem"
-        elif contexte == 'Nappe semi-captive (drainance)':
-            s = (de_glee(inputs['Q'], inputs['T'], inputs['r1'], inputs['L']) +
-                 hantush_drainance(inputs['Q'], inputs['T'], inputs['r1'], inputs['L'])) / 2
-            methode = "De Glee & Hantush"
-        elif contexte == 'Nappe libre réalimentée':
-            s = hantush_drainance(inputs['Q'], inputs['T'], inputs['r1'], inputs['L'])
-            methode = "Hantush"
-        elif contexte == 'Nappe libre à substratum incliné':
-            s = hantush_drainance(inputs['Q'], inputs['T'], inputs['r1'], inputs['L'])
-            methode = "Hantush inclinée"
-        elif contexte == 'Nappe captive avec gradient initial':
-            s = gradient_initial(inputs['Q'], inputs['T'], inputs['r1'], inputs['R'], inputs['i'])
-            methode = "Hantush + gradient"
-        elif contexte == 'Aquifère à frontière rectiligne':
-            s = dietz(inputs['Q'], inputs['T'], inputs['r1'], inputs['a'])
-            methode = "Dietz"
-        elif contexte == 'Aquifère à pénétration partielle':
-            s = huisman(inputs['Q'], inputs['T'], inputs['r1'], inputs['R'], inputs['H'], inputs['h'])
-            methode = "Huisman"
-        elif contexte == 'Aquifère bicouche':
-            s = de_glee(inputs['Q'], inputs['T'], inputs['r1'], inputs['L'])
-            methode = "De Glee (bicouche)"
-        elif contexte == 'Aquifère incliné à épaisseur constante':
-            s = gradient_initial(inputs['Q'], inputs['T'], inputs['r1'], inputs['R'], inputs['i'])
-            methode = "Hantush incliné"
-        elif contexte == 'Nappe semi-libre':
-            delta_h = inputs['h1'] - inputs['h2']
-            ln_ratio = np.log(inputs['r2'] / inputs['r1'])
-            K_est = (delta_h * inputs['e'] * np.pi) / (ln_ratio * inputs['Q'])
-            s = delta_h
-            methode = "Estimation semi-libre"
-            st.info(f"Estimation K = {K_est:.2e} m/s")
-
-        Tcalc = calc_transmissivite(K, e)
-        vcalc = calc_vitesse(inputs['Q'], e, n)
-        Rcalc = calc_rayon_influence(H, s)
-
-        st.success(f"Méthode : {methode}")
-        st.write(f"🔹 Rabattement : {s:.2f} m")
-        st.write(f"🔹 Transmissivité T : {Tcalc:.2f} m²/j")
-        st.write(f"🔹 Vitesse d’écoulement v : {vcalc:.2e} m/s")
-        st.write(f"🔹 Rayon d’influence R : {Rcalc:.2f} m")
-
-        if 'R' in inputs and inputs['R'] > 0:
-            r_vals = np.linspace(inputs['r1'], inputs['R'], 100)
-            s_vals = (inputs['Q'] / (2 * np.pi * Tcalc)) * np.log(inputs['R'] / r_vals)
-            plt.plot(r_vals, s_vals)
-            plt.title("Cône de rabattement")
-            plt.xlabel("r (m)")
-            plt.ylabel("s (m)")
-            plt.grid(True)
-            st.pyplot(plt.gcf())
+        lois = {l["Paramètre"]: (l["Loi"], l["a"], l["b"]) for l in lois.to_dict("records")}
+        tache = lancer(f"{SECTION} tirages", monte_carlo_contexte, contexte, lois, n_tirages, H=H,
+                       phase="model", relancer=tirer)
+        if suivre(tache, "Tirages Monte-Carlo"):
+            res = tache.resultat
+            if res["n_valides"] == 0:
+                st.error("Aucun tirage valide : vérifier les lois des paramètres.")
+                return
+            st.dataframe(pd.DataFrame(res["percentiles"], index=[f"P{p}" for p in PERCENTILES]).T)
+            if res["n_valides"] < res["n"]:
+                st.warning(f"{res['n'] - res['n_valides']} tirages écartés (rabattement non défini).")
+
+            with phase("model"):
+                s_ref, lignes = tornade(contexte, lois)
+            afficher_figure(figure_incertitude, res["s"], s_ref, lignes)
+            st.dataframe(pd.DataFrame({"Indice de Sobol (1er ordre)": res["sobol"]}))
     except Exception as e:
         st.error(f"Erreur de calcul : {e}")
+
+def champ_de_puits():
+    st.markdown("### 🗺️ Champ de puits : carte de rabattement 2-D")
+    puits = st.data_editor(pd.DataFrame({"x (m)": [0.0, 300.0, 150.0], "y (m)": [0.0, 0.0, 250.0],
+                                         "Q": [1.0, 1.0, 1.0]}), num_rows="dynamic", key="puits_champ")
+    modele = st.selectbox("Modèle", MODELES_CHAMP)
+    T = st.number_input("T", value=1.0, key="T_champ")
+    R = L = None
+    if modele == "Thiem":
+        R = st.number_input("Rayon d'influence R (m)", value=1000.0)
+    else:
+        L = st.number_input("Facteur de drainance L (m)", value=500.0)
+    rw = st.number_input("Rayon du puits rw (m)", value=0.1)
+    resolution = st.slider("Résolution de la grille (points par côté)", 100, 1000, 300, step=50)
+    marge = st.number_input("Marge autour des puits (m)", value=500.0)
+
+    frontiere = None
+    if st.checkbox("Frontière rectiligne (méthode des puits images)"):
+        c1, c2, c3, c4 = st.columns(4)
+        x0 = c1.number_input("x frontière (m)", value=-200.0)
+        y0 = c2.number_input("y frontière (m)", value=0.0)
+        angle = c3.number_input("Angle de la normale (°)", value=0.0)
+        nature = c4.selectbox("Nature", NATURES_FRONTIERE)
+        frontiere = (x0, y0, angle, nature)
+
+    points = st.data_editor(pd.DataFrame({"x (m)": [150.0], "y (m)": [100.0]}),
+                            num_rows="dynamic", key="points_champ")
+
+    if st.button("🗺️ Calculer le champ"):
+        try:
+            puits = puits.dropna()
+            puits_xy = puits[["x (m)", "y (m)"]].to_numpy(dtype=float)
+            Q = puits["Q"].to_numpy(dtype=float)
+            points_xy = points.dropna()[["x (m)", "y (m)"]].to_numpy(dtype=float)
+            etendue = (puits_xy[:, 0].min() - marge, puits_xy[:, 0].max() + marge,
+                       puits_xy[:, 1].min() - marge, puits_xy[:, 1].max() + marge)
+            options = dict(modele=modele, R=R, L=L, rw=rw, frontiere=frontiere)
+
+            with phase("model"):
+                x, y, s = grille_rabattement(puits_xy, Q, T, etendue, (resolution, resolution), **options)
+            afficher_figure(figure_champ, x, y, s, puits_xy, points_xy)
+            st.write(f"🔹 Rabattement maximal sur la grille : {s.max():.2f} m")
+            if len(points_xy):
+                with phase("model"):
+                    s_points = rabattement_points(points_xy, puits_xy, Q, T, **options)
+                st.dataframe(pd.DataFrame({"x (m)": points_xy[:, 0], "y (m)": points_xy[:, 1],
+                                           "s (m)": s_points}))
+        except Exception as e:
+            st.error(f"Erreur de calcul : {e}")
+
+def optimisation_champ():
+    st.markdown("### ⚙️ Optimisation des débits d'un champ captant")
+    st.caption("Débit total maximal sous s ≤ s_max à chaque puits (ou s_max de IV.1.1 à partir de H), puissance "
+               "de pompe (HMT = hmt + s_max, formule de II.1), débit maximal et rabattement limite aux points "
+               "de contrôle. Q en m³/h, T en m²/j.")
+    puits = st.data_editor(pd.DataFrame({"x": [0.0, 300.0, 150.0, 450.0], "y": [0.0, 0.0, 250.0, 250.0],
+                                         "s_max": [8.0, 8.0, 8.0, 8.0], "puissance_kW": [15.0, 15.0, 15.0, 15.0],
+                                         "hmt": [60.0, 60.0, 60.0, 60.0], "rendement": [0.7, 0.7, 0.7, 0.7],
+                                         "q_max": [100.0, 100.0, 100.0, 100.0]}),
+                           num_rows="dynamic", key="puits_optimisation")
+    points = st.data_editor(pd.DataFrame({"x": [225.0], "y": [120.0], "s_lim": [10.0]}),
+                            num_rows="dynamic", key="points_optimisation")
+    c1, c2, c3 = st.columns(3)
+    T = c1.number_input("T (m²/j)", value=500.0, key="T_optimisation")
+    R = c2.number_input("Rayon d'influence R (m)", value=1500.0, key="R_optimisation")
+    rw = c3.number_input("Rayon du puits rw (m)", value=0.1, key="rw_optimisation")
+    c1, c2 = st.columns(2)
+    cible = c1.number_input("Débit total imposé (m³/h, 0 = maximal)", value=0.0, min_value=0.0)
+    budget = c2.number_input("Puissance totale disponible (kW, 0 = sans limite)", value=0.0, min_value=0.0)
+
+    if st.button("⚙️ Optimiser les débits"):
+        try:
+            puits = puits.dropna(subset=["x", "y"]).reset_index(drop=True)
+            points = points.dropna().reset_index(drop=True)
+            with phase("fit"):
+                tableau, tableau_points, res = optimiser_champ(puits, T, points if len(points) else None,
+                                                               cible=cible or None, budget_kW=budget or None,
+                                                               R=R, rw=rw)
+            if tableau is None:
+                st.error(f"❌ Pas de solution : {res['statut']}")
+                return
+            st.success(f"✅ Débit total {res['Q_total']:.1f} m³/h, puissance absorbée "
+                       f"{res['puissance_totale_kW']:.1f} kW")
+            st.dataframe(pd.concat([puits[["x", "y"]], tableau], axis=1))
+            if tableau_points is not None:
+                st.dataframe(pd.concat([points[["x", "y"]], tableau_points], axis=1))
+
+            puits_xy = puits[["x", "y"]].to_numpy(dtype=float)
+            points_xy = points[["x", "y"]].to_numpy(dtype=float)
+            marge = 0.3 * R
+            etendue = (puits_xy[:, 0].min() - marge, puits_xy[:, 0].max() + marge,
+                       puits_xy[:, 1].min() - marge, puits_xy[:, 1].max() + marge)
+            with phase("model"):
+                # Q en m³/j pour T en m²/j
+                x, y, s = grille_rabattement(puits_xy, 24 * res["Q"], T, etendue, (200, 200), R=R, rw=rw)
+            afficher_figure(figure_champ, x, y, s, puits_xy, points_xy)
+        except Exception as e:
+            st.error(f"Erreur de calcul : {e}")
+
+
+def render():
+    st.markdown("## IV.2 Régime permanent : Essais de nappe en mode permanent")
+
+    # Contexte repris du projet si un puits est ouvert
+    puits = st.session_state.get("puits_projet")
+    params = magasin().lire_parametres(puits[0], SECTION) if puits is not None else {}
+    suffixe = puits[0] if puits else ""
+
+    noms_contextes = list(contexts.keys())
+    contexte = st.selectbox("Contexte", noms_contextes,
+                            index=noms_contextes.index(params.get("contexte", noms_contextes[0])),
+                            key=f"contexte_{suffixe}")
+    valeurs = params.get("valeurs", {}) if params.get("contexte") == contexte else {}
+    inputs = {}
+    for param in contexts[contexte]:
+        inputs[param] = st.number_input(param, value=float(valeurs.get(param, 1.0)), step=0.1,
+                                        key=f"{contexte}_{param}_{suffixe}")
+
+    K = st.number_input("K (m/s)", value=float(params.get("K", 0.002)), key=f"K_{suffixe}")
+    e = st.number_input("Épaisseur e (m)", value=float(params.get("e", 30.0)), key=f"e_{suffixe}")
+    n = st.number_input("Porosité n", value=float(params.get("n", 0.25)), key=f"n_{suffixe}")
+    H = st.number_input("Hauteur nappe H (m)", value=float(params.get("H", 20.0)), key=f"H_{suffixe}")
+
+    if st.button("▶️ Calculer"):
+        try:
+            if puits is not None:
+                magasin().ecrire_parametres(puits[0], SECTION, {"contexte": contexte, "valeurs": inputs,
+                                                                "K": K, "e": e, "n": n, "H": H})
+            with phase("model"):
+                s, methode = rabattement_contexte(contexte, inputs)
+            if contexte == 'Nappe semi-libre':
+                st.info(f"Estimation K = {estimation_K_semi_libre(inputs):.2e} m/s")
+
+            Tcalc = calc_transmissivite(K, e)
+            vcalc = calc_vitesse(inputs['Q'], e, n)
+            Rcalc = calc_rayon_influence(H, s)
+
+            st.success(f"Méthode : {methode}")
+            st.write(f"🔹 Rabattement : {s:.2f} m")
+            st.write(f"🔹 Transmissivité T : {Tcalc:.2f} m²/j")
+            st.write(f"🔹 Vitesse d’écoulement v : {vcalc:.2e} m/s")
+            st.write(f"🔹 Rayon d’influence R : {Rcalc:.2f} m")
+
+            if 'R' in inputs and inputs['R'] > 0:
+                afficher_figure(figure_cone, inputs['Q'], Tcalc, inputs['r1'], inputs['R'])
+        except Exception as e:
+            st.error(f"Erreur de calcul : {e}")
+
+    with st.expander("Champ de puits (plusieurs puits, carte 2-D)"):
+        champ_de_puits()
+
+    with st.expander("Optimisation des débits d'un champ captant"):
+        optimisation_champ()
+
+    with st.expander("Incertitude et sensibilité (Monte-Carlo)"):
+        incertitude(contexte, inputs, H)
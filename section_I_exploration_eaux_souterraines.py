@@ -1,7 +1,137 @@
 import streamlit as st
+import numpy as np
+import pandas as pd
 
-# Titre de la section
-st.markdown("## I. EXPLORATION DES EAUX SOUTERRAINES")
+from calcul_I_exploration_eaux_souterraines import (
+    DISPOSITIFS, COLONNES_SONDAGES, resistivite_apparente, preparer_sondages, inverser_multidepart, inverser_lot,
+    tableau_couches
+)
+from graphiques import afficher_figure, nouvelle_figure
+from instrumentation import phase
+from saisie import lire_serie, valider
+from taches import lancer, suivre, tache_session
 
-# Message d'information
-st.info("Cette partie sera développée dans le futur avec des technologies de reconnaissance des eaux souterraines.")
+SECTION = "I"
+
+
+# === Figures ===
+def figure_sondage(espacements, rho_a, rho, h, rho_a_modele, dispositif):
+    fig, axs = nouvelle_figure(1, 2, figsize=(14, 5), width_ratios=[2, 1])
+    axs[0].loglog(espacements, rho_a, 'o', label="Mesures")
+    s = np.geomspace(espacements.min(), espacements.max(), 100)
+    axs[0].loglog(s, resistivite_apparente(rho, h, s, dispositif), '-', color='red', label="Modèle")
+    if rho_a_modele is not None:
+        axs[0].loglog(espacements, rho_a_modele, '.', color='red')
+    axs[0].set_xlabel("AB/2 (m)" if dispositif == "Schlumberger" else "a (m)")
+    axs[0].set_ylabel("ρa (Ω·m)")
+    axs[0].set_title(f"Sondage électrique ({dispositif})")
+    axs[0].legend()
+
+    # Coupe en escalier : résistivité en fonction de la profondeur
+    toits = np.r_[0.0, np.cumsum(h)]
+    fond = max(toits[-1] * 1.5, espacements.max() / 3)
+    axs[1].step(np.r_[rho, rho[-1]], np.r_[toits, fond], where="post", color='k')
+    axs[1].set_xscale("log")
+    axs[1].set_ylim(fond, 0)
+    axs[1].set_xlabel("ρ (Ω·m)")
+    axs[1].set_ylabel("Profondeur (m)")
+    axs[1].set_title("Modèle tabulaire")
+    for ax in axs:
+        ax.grid(True, which="both", alpha=0.4)
+    return fig
+
+# === Sondage isolé ===
+def sondage_isole(dispositif, n_couches, n_departs):
+    st.markdown("### 📈 Inversion d'un sondage")
+    c1, c2 = st.columns(2)
+    esp = c1.text_area("AB/2 ou a (m)", "1 1.5 2 3 5 7 10 15 20 30 50 70 100 150 200")
+    rho = c2.text_area("ρa (Ω·m)", "98 95 88 74 52 38 30 29 33 45 70 95 130 170 200")
+    inverser = st.button("🧮 Inverser le sondage")
+    if inverser or tache_session(f"{SECTION} sondage") is not None:
+        try:
+            with phase("parse"):
+                espacements = lire_serie(esp, "m", "Espacements")
+                rho_a = lire_serie(rho, None, "ρa")
+                valider({"Espacements": espacements, "ρa": rho_a}, strictement_positives=["Espacements", "ρa"],
+                        strictement_croissantes=["Espacements"])
+            if len(espacements) < 2 * n_couches - 1:
+                st.error(f"❌ Au moins {2 * n_couches - 1} mesures pour {n_couches} couches.")
+                return
+            tache = lancer(f"{SECTION} sondage", inverser_multidepart, espacements, rho_a, n_couches, n_departs,
+                           dispositif, graine=0, relancer=inverser)
+            if suivre(tache, "Inversion"):
+                meilleur, departs = tache.resultat
+                st.success(f"✅ Écart quadratique ≈ {100 * meilleur['rmse']:.2f} % (en log), "
+                           f"{meilleur['iterations']} itérations, meilleur de {len(departs)} départs")
+                st.dataframe(tableau_couches(meilleur["rho"], meilleur["h"]), hide_index=True)
+                afficher_figure(figure_sondage, espacements, rho_a, meilleur["rho"], meilleur["h"],
+                                meilleur["rho_a_modele"], dispositif)
+                with st.expander("Tous les départs"):
+                    st.dataframe(departs, hide_index=True)
+        except Exception as e:
+            st.error(f"❌ Erreur : {e}")
+
+# === Campagne de sondages ===
+def campagne(dispositif, n_couches):
+    st.markdown("### 🗂️ Campagne de sondages")
+    st.caption(f"Fichier CSV en table longue : {', '.join(COLONNES_SONDAGES)} (espacement en m, rho_a en Ω·m)")
+    fichier = st.file_uploader("Sondages (CSV)", type=["csv", "txt"], key="sondages")
+    n_departs = st.number_input("Départs par sondage", min_value=1, max_value=64, value=4)
+    try:
+        if fichier is not None and st.button("Inverser tous les sondages"):
+            with phase("parse"):
+                sondages = preparer_sondages(pd.read_csv(fichier, sep=None, engine="python"))
+            st.session_state["sondages_campagne"] = sondages
+            lancer(f"{SECTION} campagne", inverser_lot, sondages, n_couches, int(n_departs), dispositif,
+                   relancer=True)
+        tache = tache_session(f"{SECTION} campagne")
+        if tache is not None and suivre(tache, "Inversion des sondages"):
+            tableau, modeles = tache.resultat
+            sondages = st.session_state["sondages_campagne"]
+            st.success(f"✅ {len(tableau)} sondages inversés en {tache.duree_s:.1f} s")
+            st.dataframe(tableau, hide_index=True)
+            st.download_button("💾 Télécharger les modèles", tableau.to_csv(index=False),
+                               file_name="sondages_electriques_modeles.csv", mime="text/csv")
+            nom = st.selectbox("Sondage affiché", list(modeles))
+            res = modeles[nom]
+            afficher_figure(figure_sondage, *sondages[nom], res["rho"], res["h"], res["rho_a_modele"], dispositif)
+    except Exception as e:
+        st.error(f"❌ Erreur : {e}")
+
+# === Modèle direct ===
+def modele_direct(dispositif):
+    st.markdown("### 🧱 Modèle direct")
+    c1, c2 = st.columns(2)
+    rho = c1.text_input("Résistivités des couches (Ω·m)", "100 20 500")
+    h = c2.text_input("Épaisseurs (m), dernière couche infinie", "3 12")
+    try:
+        rho = lire_serie(rho, None, "Résistivités")
+        h = lire_serie(h, "m", "Épaisseurs")
+        valider({"Résistivités": rho, "Épaisseurs": h}, longueur_commune=False,
+                strictement_positives=["Résistivités", "Épaisseurs"])
+        if len(h) != len(rho) - 1:
+            st.error("❌ Il faut une épaisseur de moins que de résistivités.")
+            return
+        espacements = np.geomspace(1, 1000, 31)
+        with phase("model"):
+            rho_a = resistivite_apparente(rho, h, espacements, dispositif)
+        afficher_figure(figure_sondage, espacements, rho_a, rho, h, None, dispositif)
+    except Exception as e:
+        st.error(f"❌ Erreur : {e}")
+
+
+def render():
+    # Titre de la section
+    st.markdown("## I. EXPLORATION DES EAUX SOUTERRAINES")
+    st.markdown("### ⚡ Sondages électriques verticaux")
+
+    c1, c2, c3 = st.columns(3)
+    dispositif = c1.selectbox("Dispositif", DISPOSITIFS)
+    n_couches = c2.slider("Nombre de couches", 2, 6, 3)
+    n_departs = c3.number_input("Départs de l'inversion", min_value=1, max_value=256, value=16)
+
+    sondage_isole(dispositif, n_couches, int(n_departs))
+    with st.expander("Campagne de sondages (CSV)"):
+        campagne(dispositif, n_couches)
+    with st.expander("Modèle direct"):
+        modele_direct(dispositif)
@@ -1,5 +1,10 @@
+import pandas as pd
 import streamlit as st
 
+import instrumentation
+import projets
+from registre_sections import afficher_section
+
 st.set_page_config(page_title="SoufiLab Conception Forages", layout="wide")
 
 st.title("SoufiLab – Conception d'Ouvrages de Forage")
@@ -22,6 +27,54 @@ sections = {
 
 choice = st.sidebar.radio("📘 Naviguer entre les sections :", list(sections.keys()))
 
-# Importation dynamique (chaque section dans un fichier séparé)
-with st.spinner("Chargement de la section..."):
-    exec(open(f"{sections[choice]}.py", encoding="utf-8").read())
+# === Projet (puits enregistrés) ===
+# Le puits ouvert est partagé par les sections : elles y relisent leurs
+# séries et paramètres, et y rangent leurs résultats.
+with st.sidebar.expander("📁 Projet"):
+    try:
+        base = projets.magasin()
+        nouveau = st.text_input("Nouveau puits")
+        campagne_nouveau = st.text_input("Campagne")
+        if st.button("Créer / ouvrir") and nouveau.strip():
+            base.puits(nouveau.strip(), campagne_nouveau.strip() or None)
+            st.session_state["choix_puits"] = nouveau.strip()
+        campagne = st.selectbox("Filtrer par campagne", ["(toutes)"] + base.campagnes())
+        liste = base.liste_puits(None if campagne == "(toutes)" else campagne)
+        noms = ["(aucun)"] + liste["nom"].tolist()
+        if st.session_state.get("choix_puits") not in noms:
+            st.session_state["choix_puits"] = "(aucun)"
+        choix_puits = st.selectbox("Puits ouvert", noms, key="choix_puits")
+        if choix_puits == "(aucun)":
+            st.session_state["puits_projet"] = None
+        else:
+            ligne = liste[liste["nom"] == choix_puits].iloc[0]
+            st.session_state["puits_projet"] = (int(ligne["id"]), choix_puits)
+            st.caption(f"{ligne['series']} série(s) enregistrée(s), modifié le {ligne['modifie']}")
+        st.caption(f"Fichier : {base.chemin}")
+    except Exception as e:
+        st.session_state["puits_projet"] = None
+        st.error(f"❌ Projet indisponible : {e}")
+
+# === Instrumentation (panneau optionnel) ===
+panneau = st.sidebar.checkbox("⏱️ Performances du rerun")
+memoire = panneau and st.sidebar.checkbox("Suivre le pic mémoire (tracemalloc, ralentit)")
+if "session_trace" not in st.session_state:
+    st.session_state["session_trace"] = instrumentation.nouvelle_session()
+
+# Chargement de la section (module importé une seule fois, rechargé si le fichier change)
+with instrumentation.rerun(sections[choice], st.session_state["session_trace"], memoire) as trace:
+    with st.spinner("Chargement de la section..."):
+        afficher_section(sections[choice])
+
+if panneau:
+    with st.sidebar.expander("Dernier rerun", expanded=True):
+        st.metric("Durée totale", f"{trace.duree_s * 1e3:.1f} ms")
+        if trace.pic_octets is not None:
+            st.metric("Pic d'allocation", f"{trace.pic_octets / 1024**2:.2f} Mo")
+        st.dataframe(pd.DataFrame([
+            {"Phase": nom, "Appels": p["n"], "Durée (ms)": round(p["duree_s"] * 1e3, 2),
+             "Pic (Mo)": None if p["pic_octets"] is None else round(p["pic_octets"] / 1024**2, 2)}
+            for nom, p in trace.phases.items()
+        ]), hide_index=True)
+        if instrumentation.FICHIER_TRACES:
+            st.caption(f"Traces : {instrumentation.FICHIER_TRACES}")
@@ -0,0 +1,330 @@
+"""Traitement par lot en ligne de commande (sans Streamlit).
+
+    python soufilab_lot.py IV.1.1 archive/paliers/ -o resultats/ -j 8 --figures
+    python soufilab_lot.py IV.1.2 "archive/longue_duree/*.csv" --aquifere "Nappe libre" --Q 120 --r 50
+    python soufilab_lot.py II.1 sites_2024.csv sites_2025.csv --format parquet
+    python soufilab_lot.py I campagne_ves/ --couches 4 --dispositif Wenner
+
+Chaque fichier d'entrée (CSV/TSV, séparateur détecté) est traité par un
+processus du pool ; les résultats de tous les fichiers sont réunis dans
+<sortie>/<section>.csv (ou .parquet), avec une colonne « fichier ». Un fichier
+en erreur n'arrête pas le lot : il est listé dans <sortie>/<section>_erreurs.csv
+et le code de sortie vaut 1. Les figures (--figures) sont rendues par les
+mêmes processus, dans <sortie>/figures/.
+
+Formats d'entrée :
+  I       table longue sondage, espacement (AB/2 ou a, m), rho_a (Ω·m) ;
+          une ligne de résultats par sondage
+  II.1    une ligne par site, colonnes de calcul_II_1.DEFAUTS
+  II.2    une campagne par fichier : well_id, region, profondeur (foreuse, priorite)
+  III     une ligne par forage, colonnes de calcul_III.DEFAUTS ; ou programme
+          d'équipement (une ligne par intervalle, colonnes de
+          calcul_III.COLONNES_PROGRAMME) : une ligne de résultats par forage
+  IV.1.1  table longue well_id, Q, s, t (sans well_id : un seul essai, nommé
+          d'après le fichier) ; colonnes optionnelles H, nappe_type
+  IV.1.2  un essai par fichier : t (h), s (m), et si besoin t_remontee
+          (depuis l'arrêt), s_remontee (résiduel) ; colonnes optionnelles Q,
+          r, aquifere, t_arret (sinon options / dernier temps du pompage)
+  IV.2    une ligne par calcul : contexte et paramètres du contexte
+          (colonnes optionnelles K, e, n, H)
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import calcul_I_exploration_eaux_souterraines as c_I
+import calcul_II_1_techniques_de_forage as c_II_1
+import calcul_II_2_technique_de_forage_facturation as c_II_2
+import calcul_III_equipement_et_mise_en_production as c_III
+import calcul_IV_1_1_essais_par_paliers as c_IV_1_1
+import calcul_IV_1_2_essais_longue_duree as c_IV_1_2
+import calcul_IV_2_regime_permanent as c_IV_2
+from graphiques import decimer, nouvelle_figure, rendre_png
+
+EXTENSIONS = (".csv", ".tsv", ".txt")
+PUITS_MAX_FIGURE = 12
+
+
+# === Traitements par section (un fichier -> un DataFrame) ===
+def traiter_I(table, options, nom=""):
+    if "sondage" not in table:
+        table = table.assign(sondage=nom)
+    sondages = c_I.preparer_sondages(table)
+    return c_I.inverser_lot(sondages, options.couches, options.departs, options.dispositif,
+                            graine=options.graine, n_workers=1)[0]
+
+def traiter_II_1(table, options):
+    return pd.concat([table, c_II_1.recommander_lot(table)], axis=1)
+
+def traiter_II_2(table, options):
+    res = c_II_2.simuler_campagne(table, vitesse=options.vitesse, n_scenarios=options.scenarios,
+                                  n_foreuses=options.foreuses, graine=options.graine)
+    ligne = {"puits": len(table), "metrage_m": table["profondeur"].sum(),
+             "scenarios_planning": res["scenarios_planning"]}
+    for p, cout, duree in zip(c_II_2.PERCENTILES, res["cout"], res["duree"]):
+        ligne[f"cout_P{p}"], ligne[f"duree_P{p}_j"] = cout, duree
+    return pd.DataFrame([ligne])
+
+def traiter_III(table, options):
+    if "element" in table:
+        return c_III.conception_lot(table)[0]
+    return pd.concat([table, c_III.equipement_lot(table)], axis=1)
+
+def traiter_IV_1_1(table, options, nom=""):
+    if "well_id" not in table:
+        table = table.assign(well_id=nom)
+    # Un seul processus par fichier : le parallélisme est au niveau des fichiers
+    return c_IV_1_1.interpreter_lot(table, H=options.H, nappe_type=options.nappe,
+                                    non_lineaire=not options.sans_non_lineaire, n_workers=1)
+
+def _parametres_IV_1_2(table, options):
+    Q = float(table["Q"].iloc[0]) if "Q" in table else options.Q
+    r = float(table["r"].iloc[0]) if "r" in table else options.r
+    aquifere = str(table["aquifere"].iloc[0]) if "aquifere" in table else options.aquifere
+    return Q, r, aquifere
+
+def _series_IV_1_2(table):
+    tp, sp = table["t"].to_numpy(dtype=float), table["s"].to_numpy(dtype=float)
+    garder = np.isfinite(tp) & np.isfinite(sp)
+    tr = sr = None
+    if "t_remontee" in table and "s_remontee" in table:
+        tr, sr = table["t_remontee"].to_numpy(dtype=float), table["s_remontee"].to_numpy(dtype=float)
+        m = np.isfinite(tr) & np.isfinite(sr)
+        tr, sr = (tr[m], sr[m]) if m.any() else (None, None)
+    return tp[garder], sp[garder], tr, sr
+
+def _ajuster_IV_1_2(table, options):
+    # Retourne aussi les courbes modélisées, pour la figure
+    Q, r, aquifere = _parametres_IV_1_2(table, options)
+    tp, sp, tr, sr = _series_IV_1_2(table)
+    t_arret = float(table["t_arret"].iloc[0]) if "t_arret" in table else None
+    res = c_IV_1_2.ajuster_essai(aquifere, Q, tp, sp, r, tr, sr, t_arret, options.rapport_max)
+    t, _, ds = c_IV_1_2.derivee_bourdet(tp, sp, options.L)
+    suggere, _ = c_IV_1_2.suggerer_aquifere(c_IV_1_2.detecter_regimes(t, ds, Q))
+    resultats = pd.DataFrame([{"aquifere": aquifere, "Q_m3h": Q, "r_m": r, "methode": x["methode"],
+                               "T_m2j": x["T"], "S": x["S"], "rmse_m": x.get("rmse", np.nan), "note": x["note"],
+                               "aquifere_suggere": suggere}
+                              for x in res])
+    # Courbes sur des temps décimés (figure bornée pour les enregistreurs) ;
+    # Theis seulement si S est estimé (pas en remontée)
+    t_figure = decimer(tp, sp)[0]
+    courbes = [(x["methode"], *decimer(tp, x["s_modele"])) for x in res if "s_modele" in x]
+    courbes += [(x["methode"], t_figure, c_IV_1_2.theis(Q, t_figure, r, x["T"], x["S"]))
+                for x in res if x["methode"].startswith("Theis") and np.isfinite(x["S"])]
+    return resultats, (tp, sp, courbes)
+
+def traiter_IV_1_2(table, options):
+    return _ajuster_IV_1_2(table, options)[0]
+
+def traiter_IV_2(table, options):
+    sortie = pd.DataFrame(index=table.index, columns=["s_m", "methode"], dtype=object)
+    for contexte, groupe in table.groupby("contexte"):
+        if contexte not in c_IV_2.contexts:
+            raise ValueError(f"Contexte inconnu : {contexte}")
+        manquants = [p for p in c_IV_2.contexts[contexte] if p not in groupe]
+        if manquants:
+            raise ValueError(f"{contexte} : colonnes manquantes {', '.join(manquants)}")
+        p = {k: groupe[k].to_numpy(dtype=float) for k in c_IV_2.contexts[contexte]}
+        s, methode = c_IV_2.rabattement_contexte(contexte, p)
+        sortie.loc[groupe.index, "s_m"] = s
+        sortie.loc[groupe.index, "methode"] = methode
+    sortie["s_m"] = sortie["s_m"].astype(float)
+    if "K" in table and "e" in table:
+        sortie["T_m2s"] = c_IV_2.calc_transmissivite(table["K"], table["e"])
+        if "n" in table and "Q" in table:
+            sortie["v_m_s"] = c_IV_2.calc_vitesse(table["Q"], table["e"], table["n"])
+    if "H" in table:
+        sortie["R_m"] = c_IV_2.calc_rayon_influence(table["H"], sortie["s_m"])
+    return pd.concat([table, sortie], axis=1)
+
+# === Figures (API objet de matplotlib, comme dans les sections) ===
+def figure_IV_1_1(table, resultats):
+    fig, ax = nouvelle_figure(figsize=(8, 5))
+    for (puits, groupe), (_, ligne) in zip(table.groupby("well_id", sort=True),
+                                           resultats.head(PUITS_MAX_FIGURE).iterrows()):
+        Q, s = groupe["Q"].to_numpy(dtype=float), groupe["s"].to_numpy(dtype=float)
+        points = ax.plot(Q, s, 'o', label=str(puits))[0]
+        q = np.linspace(0, Q.max(), 100)
+        ax.plot(q, ligne["A"] * q + ligne["B"] * q**2, '--', color=points.get_color())
+    ax.set_xlabel("Q (m³/h)")
+    ax.set_ylabel("Rabattement s (m)")
+    ax.set_title("s = AQ + BQ²")
+    ax.invert_yaxis()
+    ax.grid(True, alpha=0.4)
+    ax.legend(fontsize=7)
+    return fig
+
+def figure_IV_1_2(tp, sp, courbes):
+    fig, ax = nouvelle_figure(figsize=(8, 5))
+    ax.semilogx(*decimer(tp, sp), 'o', ms=3, label="Mesures")
+    for nom, t_modele, s_modele in courbes:
+        ax.semilogx(t_modele, s_modele, '-', label=nom)
+    ax.set_xlabel("Temps (h)")
+    ax.set_ylabel("Rabattement (m)")
+    ax.invert_yaxis()
+    ax.grid(True, which="both", alpha=0.4)
+    ax.legend()
+    return fig
+
+TRAITEMENTS = {
+    "I": traiter_I, "II.1": traiter_II_1, "II.2": traiter_II_2, "III": traiter_III,
+    "IV.1.1": traiter_IV_1_1, "IV.1.2": traiter_IV_1_2, "IV.2": traiter_IV_2,
+}
+SECTIONS_FIGURES = ("IV.1.1", "IV.1.2")
+
+
+# === Lot ===
+def lister_fichiers(entrees, recursif=False):
+    # Répertoires, motifs glob ou fichiers ; liste triée sans doublons
+    fichiers = set()
+    for entree in entrees:
+        if os.path.isdir(entree):
+            motif = os.path.join(entree, "**", "*") if recursif else os.path.join(entree, "*")
+            candidats = glob.glob(motif, recursive=recursif)
+        else:
+            candidats = glob.glob(entree, recursive=recursif) or [entree]
+        fichiers.update(c for c in candidats if os.path.isfile(c) and c.lower().endswith(EXTENSIONS))
+    return sorted(fichiers)
+
+def traiter_fichier(section, chemin, options, repertoire_figures=None):
+    # Exécuté dans un processus du pool : (chemin, résultats, erreur, durée)
+    warnings.simplefilter("ignore", RuntimeWarning)
+    debut = time.perf_counter()
+    nom = os.path.splitext(os.path.basename(chemin))[0]
+    try:
+        table = pd.read_csv(chemin, sep=None, engine="python")
+        if section == "I":
+            resultats, figure = traiter_I(table, options, nom), None
+        elif section == "IV.1.1":
+            resultats = traiter_IV_1_1(table, options, nom)
+            figure = (figure_IV_1_1, table if "well_id" in table else table.assign(well_id=nom), resultats)
+        elif section == "IV.1.2":
+            resultats, (tp, sp, courbes) = _ajuster_IV_1_2(table, options)
+            figure = (figure_IV_1_2, tp, sp, courbes)
+        else:
+            resultats, figure = TRAITEMENTS[section](table, options), None
+        if repertoire_figures is not None and figure is not None:
+            with open(os.path.join(repertoire_figures, f"{nom}.png"), "wb") as f:
+                f.write(rendre_png(*figure))
+        return chemin, resultats, None, time.perf_counter() - debut
+    except Exception as e:
+        return chemin, None, f"{type(e).__name__}: {e}", time.perf_counter() - debut
+
+def _traiter_paquet(args):
+    section, chemins, options, repertoire_figures = args
+    return [traiter_fichier(section, c, options, repertoire_figures) for c in chemins]
+
+def executer(section, fichiers, options, n_workers=None, repertoire_figures=None, taille_paquet=None,
+             journal=print):
+    # Les fichiers sont envoyés par paquets (moins d'allers-retours entre
+    # processus pour des milliers de petits essais) ; les résultats arrivent
+    # dans l'ordre des fichiers.
+    n_workers = n_workers or os.cpu_count() or 1
+    taille_paquet = taille_paquet or max(1, min(64, len(fichiers) // (4 * n_workers)))
+    paquets = [(section, fichiers[i:i + taille_paquet], options, repertoire_figures)
+               for i in range(0, len(fichiers), taille_paquet)]
+    sorties, faits, debut = [], 0, time.perf_counter()
+
+    def suivre(lot):
+        nonlocal faits
+        sorties.extend(lot)
+        faits += len(lot)
+        journal(f"[{section}] {faits}/{len(fichiers)} fichiers ({time.perf_counter() - debut:.1f} s)")
+
+    if n_workers == 1 or len(paquets) == 1:
+        for paquet in paquets:
+            suivre(_traiter_paquet(paquet))
+    else:
+        with ProcessPoolExecutor(max_workers=min(n_workers, len(paquets))) as pool:
+            for lot in pool.map(_traiter_paquet, paquets):
+                suivre(lot)
+
+    resultats = [r.assign(fichier=c) for c, r, erreur, _ in sorties if erreur is None]
+    resultats = pd.concat(resultats, ignore_index=True) if resultats else pd.DataFrame()
+    erreurs = pd.DataFrame([{"fichier": c, "erreur": erreur} for c, _, erreur, _ in sorties if erreur is not None],
+                           columns=["fichier", "erreur"])
+    return resultats, erreurs
+
+def ecrire(table, chemin_sans_extension, format_sortie):
+    if format_sortie == "parquet":
+        chemin = f"{chemin_sans_extension}.parquet"
+        table.to_parquet(chemin, index=False)
+    else:
+        chemin = f"{chemin_sans_extension}.csv"
+        table.to_csv(chemin, index=False)
+    return chemin
+
+def _moteur_parquet():
+    for module in ("pyarrow", "fastparquet"):
+        try:
+            __import__(module)
+            return True
+        except ImportError:
+            pass
+    return False
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Traitement par lot SoufiLab (sans interface)",
+                                     formatter_class=argparse.RawDescriptionHelpFormatter, epilog=__doc__)
+    parser.add_argument("section", choices=list(TRAITEMENTS), help="section dont on lance les calculs")
+    parser.add_argument("entrees", nargs="+", help="fichiers, répertoires ou motifs glob")
+    parser.add_argument("-o", "--sortie", default="resultats_lot", help="répertoire des résultats")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="processus (défaut : nombre de cœurs)")
+    parser.add_argument("--paquet", type=int, default=None, help="fichiers par tâche envoyée à un processus")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv", dest="format_sortie")
+    parser.add_argument("--figures", action="store_true", help=f"exporter les figures ({', '.join(SECTIONS_FIGURES)})")
+    parser.add_argument("-r", "--recursif", action="store_true", help="parcourir les sous-répertoires")
+    parser.add_argument("-q", "--silencieux", action="store_true", help="pas de suivi d'avancement")
+    options_section = parser.add_argument_group("options des sections")
+    options_section.add_argument("--couches", type=int, default=3, help="I : nombre de couches")
+    options_section.add_argument("--dispositif", choices=c_I.DISPOSITIFS, default="Schlumberger",
+                                 help="I : dispositif de mesure")
+    options_section.add_argument("--departs", type=int, default=4, help="I : départs de l'inversion par sondage")
+    options_section.add_argument("--vitesse", type=float, default=5.0, help="II.2 : vitesse de forage (m/j)")
+    options_section.add_argument("--scenarios", type=int, default=10_000, help="II.2 : tirages Monte-Carlo")
+    options_section.add_argument("--foreuses", type=int, default=1, help="II.2 : foreuses (si non affectées)")
+    options_section.add_argument("--graine", type=int, default=0, help="I, II.2 : graine (résultats reproductibles)")
+    options_section.add_argument("--H", type=float, default=5.0, help="IV.1.1 : épaisseur H par défaut (m)")
+    options_section.add_argument("--nappe", choices=["libre", "captive"], default="libre",
+                                 help="IV.1.1 : type de nappe par défaut")
+    options_section.add_argument("--sans-non-lineaire", action="store_true",
+                                 help="IV.1.1 : pas d'ajustements Rorabaugh / Gosselin")
+    options_section.add_argument("--Q", type=float, default=100.0, help="IV.1.2 : débit par défaut (m³/h)")
+    options_section.add_argument("--r", type=float, default=0.1, help="IV.1.2 : distance par défaut (m)")
+    options_section.add_argument("--aquifere", default="Nappe captive", help="IV.1.2 : aquifère par défaut")
+    options_section.add_argument("--rapport-max", type=float, default=None,
+                                 help="IV.1.2 : remontée, t/t' maximal retenu (défaut : tous les points)")
+    options_section.add_argument("--L", type=float, default=0.2, help="IV.1.2 : fenêtre de la dérivée (ln t)")
+    args = parser.parse_args(argv)
+
+    if args.format_sortie == "parquet" and not _moteur_parquet():
+        parser.error("--format parquet demande pyarrow ou fastparquet")
+    fichiers = lister_fichiers(args.entrees, args.recursif)
+    if not fichiers:
+        parser.error("aucun fichier d'entrée")
+    os.makedirs(args.sortie, exist_ok=True)
+    repertoire_figures = None
+    if args.figures and args.section in SECTIONS_FIGURES:
+        repertoire_figures = os.path.join(args.sortie, "figures")
+        os.makedirs(repertoire_figures, exist_ok=True)
+
+    journal = (lambda message: None) if args.silencieux else (lambda message: print(message, file=sys.stderr))
+    resultats, erreurs = executer(args.section, fichiers, args, args.workers, repertoire_figures, args.paquet,
+                                  journal)
+
+    base = os.path.join(args.sortie, args.section)
+    print(f"{len(fichiers) - len(erreurs)} fichier(s) traité(s) → {ecrire(resultats, base, args.format_sortie)}")
+    if len(erreurs):
+        print(f"{len(erreurs)} fichier(s) en erreur → {ecrire(erreurs, f'{base}_erreurs', 'csv')}")
+    return 1 if len(erreurs) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,343 @@
+import contextvars
+import hashlib
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+
+import numpy as np
+
+from instrumentation import phase as phase_trace, rerun, trace_courante
+
+# === Exécution des calculs longs en arrière-plan ===
+# Les ajustements et simulations lourds ne tournent plus dans le thread du
+# script Streamlit : ils sont confiés à un exécuteur partagé par toutes les
+# sessions du processus. Chaque session a sa propre file d'attente et au plus
+# TACHES_PAR_SESSION tâches en cours ; les places libres du pool sont
+# distribuées à tour de rôle entre les sessions qui attendent, si bien qu'un
+# utilisateur qui lance un gros calcul n'en bloque pas un autre.
+#
+# Une tâche est identifiée par (session, clé) : la soumettre à nouveau avec
+# les mêmes arguments redonne la tâche existante (un rerun ne relance rien),
+# avec des arguments différents annule la précédente (saisie modifiée). Une
+# tâche annulée ou échouée n'est relancée à l'identique que sur demande
+# (relancer=True, typiquement le bouton de la section).
+#
+# Dans un thread, le calcul rend compte de son avancement avec rapporter(),
+# qui sert aussi de point d'annulation ; rapporter() ne fait rien hors tâche
+# (CLI, benchmarks).
+#
+# Une tâche s'exécute dans une copie du contexte de la soumission. Lancée
+# depuis un rerun instrumenté, elle a sa propre trace « <section> (tâche) »,
+# écrite à sa fin, où son calcul forme la phase indiquée (fit par défaut) :
+# le rerun qui l'a soumise est déjà terminé à ce moment-là.
+#
+# Les parties lourdes en calcul sont découpées en blocs (executer_blocs) et
+# confiées à un unique pool de processus, partagé par toutes les tâches : le
+# nombre de processus ne dépasse jamais PROCESSUS, quel que soit le nombre de
+# sessions. Chaque appel garde au plus n_workers blocs en vol, de sorte que les
+# blocs de deux calculs simultanés s'intercalent. Le serveur Streamlit étant
+# multithreadé, les processus sont créés par forkserver (spawn à défaut),
+# jamais par fork.
+
+TACHES_SIMULTANEES = max(4, os.cpu_count() or 1)
+TACHES_PAR_SESSION = 1
+PROCESSUS = os.cpu_count() or 1
+CONTEXTE_PROCESSUS = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+DUREE_CONSERVATION = 3600  # s, tâches terminées gardées pour la remise du résultat
+INTERVALLE_SUIVI = 0.5     # s, rafraîchissement de la barre de progression
+ATTENTE_INITIALE = 0.3     # s, une tâche courte s'affiche dans le même rerun
+
+EN_ATTENTE, EN_COURS, TERMINEE, ECHOUEE, ANNULEE = "en attente", "en cours", "terminée", "échouée", "annulée"
+
+_tache_courante = contextvars.ContextVar("tache", default=None)
+_numeros = itertools.count(1)
+
+
+class TacheAnnulee(Exception):
+    pass
+
+
+class Tache:
+    def __init__(self, session, cle, empreinte, fonction, args, kwargs, phase="fit"):
+        self.id = next(_numeros)
+        self.session, self.cle, self.empreinte = session, cle, empreinte
+        self.fonction, self.args, self.kwargs = fonction, args, kwargs
+        self.phase = phase
+        self.contexte = contextvars.copy_context()
+        self.etat = EN_ATTENTE
+        self.progression = 0.0
+        self.message = ""
+        self.resultat = None
+        self.erreur = None
+        self.soumise = time.time()
+        self.debut = self.fin = None
+        self._annulee = threading.Event()
+        self._finie = threading.Event()
+
+    @property
+    def finie(self):
+        return self._finie.is_set()
+
+    @property
+    def duree_s(self):
+        if self.debut is None:
+            return 0.0
+        return (self.fin or time.time()) - self.debut
+
+    def annuler(self):
+        self._annulee.set()
+
+    def attendre(self, delai=None):
+        self._finie.wait(delai)
+        return self.finie
+
+    def _terminer(self, etat, resultat=None, erreur=None):
+        self.etat, self.resultat, self.erreur = etat, resultat, erreur
+        self.fin = time.time()
+        if etat == TERMINEE:
+            self.progression = 1.0
+        self._finie.set()
+
+
+def rapporter(fraction, message=None):
+    tache = _tache_courante.get()
+    if tache is None:
+        return
+    if tache._annulee.is_set():
+        raise TacheAnnulee()
+    tache.progression = min(max(float(fraction), 0.0), 1.0)
+    if message is not None:
+        tache.message = message
+
+def _ajouter_empreinte(h, valeur):
+    if isinstance(valeur, np.ndarray):
+        h.update(f"{valeur.dtype.str}{valeur.shape}".encode())
+        h.update(np.ascontiguousarray(valeur).tobytes())
+    elif isinstance(valeur, dict):
+        for k in sorted(valeur, key=repr):
+            h.update(repr(k).encode())
+            _ajouter_empreinte(h, valeur[k])
+    elif isinstance(valeur, (list, tuple)):
+        h.update(f"{type(valeur).__name__}{len(valeur)}".encode())
+        for v in valeur:
+            _ajouter_empreinte(h, v)
+    else:
+        h.update(repr(valeur).encode())
+
+def empreinte_appel(fonction, args, kwargs):
+    h = hashlib.sha1(f"{fonction.__module__}.{fonction.__qualname__}".encode())
+    _ajouter_empreinte(h, args)
+    _ajouter_empreinte(h, kwargs)
+    return h.hexdigest()
+
+
+class Executeur:
+    def __init__(self, n_threads=TACHES_SIMULTANEES, par_session=TACHES_PAR_SESSION):
+        self.n_threads = n_threads
+        self.par_session = par_session
+        self._threads = ThreadPoolExecutor(max_workers=n_threads, thread_name_prefix="soufilab-tache")
+        self._processus = None
+        self._verrou = threading.Lock()
+        self._files = {}        # session -> deque des tâches en attente
+        self._tour = deque()    # sessions ayant des tâches en attente, à tour de rôle
+        self._actives = {}      # session -> nombre de tâches en cours
+        self._taches = {}       # (session, clé) -> dernière tâche soumise
+
+    def soumettre(self, session, cle, fonction, *args, relancer=False, empreinte=None, phase="fit",
+                  **kwargs):
+        empreinte = empreinte or empreinte_appel(fonction, args, kwargs)
+        with self._verrou:
+            self._purger()
+            precedente = self._taches.get((session, cle))
+            if precedente is not None and precedente.empreinte == empreinte:
+                if not (relancer and precedente.etat in (ANNULEE, ECHOUEE)):
+                    return precedente
+            if precedente is not None and not precedente.finie:
+                self._annuler(precedente)
+            tache = Tache(session, cle, empreinte, fonction, args, kwargs, phase)
+            self._taches[(session, cle)] = tache
+            if session not in self._files:
+                self._files[session] = deque()
+                self._tour.append(session)
+            self._files[session].append(tache)
+            self._distribuer()
+            return tache
+
+    def tache(self, session, cle):
+        return self._taches.get((session, cle))
+
+    def annuler(self, session, cle):
+        with self._verrou:
+            tache = self._taches.get((session, cle))
+            if tache is not None and not tache.finie:
+                self._annuler(tache)
+
+    def etat(self):
+        # Vue d'ensemble : tâches en cours et en attente par session
+        with self._verrou:
+            return {s: {"en cours": self._actives.get(s, 0), "en attente": len(self._files.get(s, ()))}
+                    for s in set(self._actives) | set(self._files)}
+
+    # --- Ordonnancement (appelé sous verrou) ---
+    def _annuler(self, tache):
+        tache.annuler()
+        if tache.etat == EN_ATTENTE:
+            self._files[tache.session].remove(tache)
+            tache._terminer(ANNULEE)
+
+    def _distribuer(self):
+        en_cours = sum(self._actives.values())
+        for _ in range(len(self._tour)):
+            if en_cours >= self.n_threads:
+                break
+            session = self._tour[0]
+            self._tour.rotate(-1)
+            file = self._files[session]
+            if file and self._actives.get(session, 0) < self.par_session:
+                tache = file.popleft()
+                self._actives[session] = self._actives.get(session, 0) + 1
+                tache.etat = EN_COURS
+                tache.debut = time.time()
+                self._threads.submit(self._executer, tache)
+                en_cours += 1
+        for session in [s for s in self._tour if not self._files[s]]:
+            self._tour.remove(session)
+            del self._files[session]
+
+    def _purger(self):
+        limite = time.time() - DUREE_CONSERVATION
+        for cle in [c for c, t in self._taches.items() if t.finie and t.fin < limite]:
+            del self._taches[cle]
+
+    # --- Exécution (thread du pool) ---
+    def _executer(self, tache):
+        try:
+            tache.contexte.run(self._calculer, tache)
+        finally:
+            with self._verrou:
+                self._actives[tache.session] -= 1
+                if not self._actives[tache.session]:
+                    del self._actives[tache.session]
+                self._distribuer()
+
+    def _calculer(self, tache):
+        # Dans le contexte copié à la soumission
+        _tache_courante.set(tache)
+        origine = trace_courante()
+        try:
+            if tache._annulee.is_set():
+                raise TacheAnnulee()
+            if origine is None:
+                resultat = tache.fonction(*tache.args, **tache.kwargs)
+            else:
+                with rerun(f"{origine.section} (tâche)", origine.session, origine.memoire):
+                    with phase_trace(tache.phase):
+                        resultat = tache.fonction(*tache.args, **tache.kwargs)
+            tache._terminer(TERMINEE, resultat)
+        except TacheAnnulee:
+            tache._terminer(ANNULEE)
+        except Exception as e:
+            tache._terminer(ECHOUEE, erreur=e)
+
+    # --- Pool de processus partagé ---
+    def pool_processus(self):
+        with self._verrou:
+            if self._processus is None:
+                self._processus = ProcessPoolExecutor(
+                    max_workers=PROCESSUS, mp_context=multiprocessing.get_context(CONTEXTE_PROCESSUS))
+            return self._processus
+
+    def _abandonner_pool(self, pool):
+        # Pool cassé (processus tué) : le suivant en recrée un
+        with self._verrou:
+            if self._processus is pool:
+                self._processus = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+@lru_cache(maxsize=None)
+def executeur():
+    return Executeur()
+
+def executer_blocs(fonction, blocs, n_workers=None, message="calcul"):
+    # Blocs indépendants confiés au pool de processus partagé, résultats dans
+    # l'ordre des blocs ; avancement rapporté bloc par bloc. Une tâche annulée
+    # abandonne ses blocs pas encore commencés. « fonction » doit être définie
+    # au niveau d'un module (les processus l'importent).
+    n_workers = min(n_workers or PROCESSUS, PROCESSUS)
+    if n_workers == 1 or len(blocs) == 1:
+        resultats = []
+        for k, b in enumerate(blocs):
+            rapporter(k / len(blocs), f"{message} : bloc {k + 1}/{len(blocs)}")
+            resultats.append(fonction(b))
+        return resultats
+    pool = executeur().pool_processus()
+    suivants = iter(enumerate(blocs))
+    en_vol = {k: pool.submit(fonction, b) for k, b in itertools.islice(suivants, n_workers)}
+    resultats = []
+    try:
+        for k in range(len(blocs)):
+            rapporter(k / len(blocs), f"{message} : bloc {k + 1}/{len(blocs)}")
+            resultats.append(en_vol.pop(k).result())
+            en_vol.update((j, pool.submit(fonction, b)) for j, b in itertools.islice(suivants, 1))
+    except BrokenProcessPool:
+        executeur()._abandonner_pool(pool)
+        raise
+    finally:
+        for futur in en_vol.values():
+            futur.cancel()
+    return resultats
+
+# === Côté page (Streamlit importé à l'appel : le module reste utilisable en CLI) ===
+def lancer(cle, fonction, *args, **kwargs):
+    # Soumission pour la session courante ; la tâche est rangée dans
+    # st.session_state, d'où les reruns suivants récupèrent le résultat.
+    import streamlit as st
+
+    if "session_trace" not in st.session_state:
+        st.session_state["session_trace"] = uuid.uuid4().hex[:12]
+    tache = executeur().soumettre(st.session_state["session_trace"], cle, fonction, *args, **kwargs)
+    st.session_state[f"tache_{cle}"] = tache
+    return tache
+
+def tache_session(cle):
+    import streamlit as st
+
+    return st.session_state.get(f"tache_{cle}")
+
+def suivre(tache, titre="Calcul en cours"):
+    # Affiche l'avancement d'une tâche dans un fragment rafraîchi
+    # périodiquement ; la page entière est relancée dès que la tâche se
+    # termine. Retourne True si le résultat est disponible.
+    import streamlit as st
+
+    tache.attendre(ATTENTE_INITIALE)
+    if tache.finie:
+        if tache.etat == ECHOUEE:
+            raise tache.erreur
+        if tache.etat == ANNULEE:
+            st.warning(f"⏹️ {titre} : annulé")
+        return tache.etat == TERMINEE
+
+    @st.fragment(run_every=INTERVALLE_SUIVI)
+    def avancement():
+        if tache.finie:
+            st.rerun()
+        texte = f"⏳ {titre} ({tache.etat}"
+        texte += f", {tache.duree_s:.1f} s)" if tache.etat == EN_COURS else ")"
+        if tache.message:
+            texte += f" : {tache.message}"
+        st.progress(tache.progression, text=texte)
+        if st.button("⏹️ Annuler", key=f"annuler_tache_{tache.id}"):
+            executeur().annuler(tache.session, tache.cle)
+            st.rerun()
+
+    avancement()
+    return False
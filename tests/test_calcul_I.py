@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import calcul_I_exploration_eaux_souterraines as c
+
+
+def images(rho1, rho2, h, espacements, dispositif):
+    # Série des images pour deux couches, k = (ρ2 − ρ1) / (ρ2 + ρ1)
+    k = (rho2 - rho1) / (rho2 + rho1)
+    n = np.arange(1, 20_001)[:, None]
+    x = 2 * n * h / np.asarray(espacements, dtype=float)[None, :]
+    if dispositif == "Schlumberger":
+        return rho1 * (1 + 2 * (k**n * (1 + x**2) ** -1.5).sum(axis=0))
+    return rho1 * (1 + 4 * (k**n * (1 / np.sqrt(1 + x**2) - 1 / np.sqrt(4 + x**2))).sum(axis=0))
+
+
+@pytest.mark.parametrize("dispositif", c.DISPOSITIFS)
+@pytest.mark.parametrize("rho1, rho2", [(100.0, 10.0), (20.0, 500.0), (50.0, 60.0)])
+def test_deux_couches_serie_des_images(dispositif, rho1, rho2):
+    espacements = np.geomspace(1, 1000, 31)
+    rho_a = c.resistivite_apparente([rho1, rho2], [8.0], espacements, dispositif)
+    np.testing.assert_allclose(rho_a, images(rho1, rho2, 8.0, espacements, dispositif), rtol=1e-4)
+
+
+def test_terrain_homogene_et_lot():
+    espacements = np.geomspace(1, 300, 20)
+    np.testing.assert_allclose(c.resistivite_apparente([42.0], [], espacements), 42.0, rtol=1e-6)
+    # Plusieurs modèles d'un coup, par blocs, comme un à un
+    rho = np.array([[100.0, 10.0, 300.0], [30.0, 200.0, 5.0]])
+    h = np.array([[5.0, 20.0], [2.0, 50.0]])
+    lot = c.resistivite_apparente(rho, h, espacements)
+    for k in range(2):
+        np.testing.assert_allclose(lot[k], c.resistivite_apparente(rho[k], h[k], espacements))
+
+
+def test_inversion_trois_couches():
+    espacements = np.geomspace(1.5, 400, 25)
+    vrai = (np.array([150.0, 15.0, 400.0]), np.array([6.0, 25.0]))
+    rho_a = c.resistivite_apparente(*vrai, espacements)
+    meilleur, tableau = c.inverser_multidepart(espacements, rho_a, 3, n_departs=6, graine=0, n_workers=1)
+    assert meilleur["rmse"] < 1e-3
+    np.testing.assert_allclose(meilleur["rho_a_modele"], rho_a, rtol=5e-3)
+    assert len(tableau) == 6
+
+
+def test_preparer_sondages():
+    df = pd.DataFrame({"sondage": ["B", "A", "B", "A", "A"], "espacement": [10, 3, 1, 1, -2],
+                       "rho_a": [5.0, 7.0, 4.0, 6.0, 1.0]})
+    sondages = c.preparer_sondages(df)
+    np.testing.assert_array_equal(sondages["A"][0], [1, 3])
+    np.testing.assert_array_equal(sondages["B"][1], [4.0, 5.0])
+    with pytest.raises(ValueError, match="rho_a"):
+        c.preparer_sondages(df.drop(columns="rho_a"))
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import calcul_III_equipement_et_mise_en_production as c_III
+
+
+def programme(forages):
+    # Par forage : tube cimenté 0-20 m, crépine 20-20+h m
+    lignes = []
+    for forage, h in forages:
+        lignes.append({"forage": forage, "de": 0.0, "a": 20.0, "element": "tube", "D_tube_pouce": 6.0,
+                       "D_trou_pouce": 9.5, "annulaire": "ciment"})
+        lignes.append({"forage": forage, "de": 20.0, "a": 20.0 + h, "element": "crepine", "D_tube_pouce": 6.0,
+                       "D_trou_pouce": 9.5, "coeff_ouverture": 20.0})
+    return pd.DataFrame(lignes)
+
+
+def test_identifiants_numeriques():
+    resultats, _ = c_III.conception_lot(programme([(1, 10.0), (2, 30.0), (10, 80.0)]))
+    par_forage = resultats.set_index("forage")
+    assert par_forage.loc["10", "profondeur_m"] == 100.0
+    assert par_forage.loc["2", "profondeur_m"] == 50.0
+    assert par_forage.loc["10", "crepine_m"] == 80.0
+
+
+def test_totaux_par_forage():
+    resultats, bordereau = c_III.conception_lot(programme([("F1", 12.0)]), debits={"F1": 1.0})
+    r = resultats.iloc[0]
+    assert r["tube_m"] == 20.0 and r["crepine_m"] == 12.0
+    q_metre, _ = c_III.debit_crepine(25.4 * 6.0, 1.0, 20.0)
+    assert r["capacite_crepine_m3h"] == pytest.approx(12.0 * q_metre)
+    assert r["gravier_L"] == pytest.approx(c_III.volume_gravier(9.5, 6.0, 12.0))
+    assert r["laitier_L"] == pytest.approx(c_III.volume_gravier(9.5, 6.0, 20.0))
+    assert r["ciment_kg"] * (c_III.RAPPORT_EAU_CIMENT + 0.25) == pytest.approx(r["laitier_L"])
+    assert r["crepine"] == ("suffisante" if r["capacite_sur_Q"] >= 1 else "insuffisante")
+    elements = bordereau.set_index("article")["quantite_theorique"]
+    assert elements["Tube plein 6\", éléments de 6 m"] == np.ceil(20.0 / 6.0)
+
+
+def test_colonne_discontinue():
+    p = programme([("F1", 12.0)])
+    p.loc[1, "de"] = 22.0
+    with pytest.raises(ValueError, match="discontinue"):
+        c_III.conception_lot(p)
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import calcul_II_2_technique_de_forage_facturation as c
+
+
+def test_planifier_premiere_foreuse_libre():
+    foreuse, debut, fin = c.planifier([3.0, 1.0, 2.0], 2)
+    np.testing.assert_array_equal(foreuse, [0, 1, 1])
+    np.testing.assert_allclose(debut, [0, 0, 1])
+    np.testing.assert_allclose(fin, [3, 1, 3])
+
+
+def test_planifier_par_priorite():
+    foreuse, debut, _ = c.planifier([3.0, 1.0, 2.0], 1, priorite=[3, 1, 2])
+    np.testing.assert_allclose(debut, [3, 0, 1])
+
+
+def test_planning_impose():
+    debut, fin = c.planning_impose(np.array([1.0, 2, 3, 4]), np.array([0, 1, 0, 1]))
+    np.testing.assert_allclose(debut, [0, 0, 1, 2])
+    np.testing.assert_allclose(fin, [1, 2, 4, 6])
+
+
+def campagne(n=30, graine=0):
+    rng = np.random.default_rng(graine)
+    return pd.DataFrame({"well_id": [f"P{k}" for k in range(n)],
+                         "region": rng.choice(list(c.region_tarifs), n),
+                         "profondeur": rng.uniform(40, 120, n)})
+
+
+def test_campagne_sans_alea():
+    puits = campagne()
+    res = c.simuler_campagne(puits, vitesse=8.0, cv_vitesse=0, cv_tarif=0, n_scenarios=50,
+                             n_foreuses=3, mobilisation=0.5, graine=1)
+    cout = sum(c.region_tarifs[r] * p for r, p in zip(puits["region"], puits["profondeur"]))
+    np.testing.assert_allclose(res["cout"], cout)
+    np.testing.assert_allclose(res["duree"], res["planning"]["fin (j)"].max())
+    assert res["foreuses"]["puits"].sum() == len(puits)
+
+
+def test_campagne_reproductible():
+    puits = campagne()
+    a = c.simuler_campagne(puits, n_scenarios=1000, n_foreuses=2, graine=3)
+    b = c.simuler_campagne(puits, n_scenarios=1000, n_foreuses=2, graine=3)
+    np.testing.assert_array_equal(a["couts"], b["couts"])
+    assert a["duree"][0] <= a["duree"][1] <= a["duree"][2]
+
+
+def test_region_sans_tarif():
+    puits = campagne().assign(region="Lune")
+    with pytest.raises(ValueError, match="Lune"):
+        c.simuler_campagne(puits, n_scenarios=10)
+
+
+def test_planning_refait_par_scenario():
+    # Scénario par scénario, mêmes foreuses que planifier() aux vitesses tirées
+    rng = np.random.default_rng(4)
+    profondeur, r = rng.uniform(40, 120, 25), rng.integers(0, 3, 25)
+    v_region, v_foreuse = rng.uniform(0.5, 2, (6, 3)), rng.uniform(2, 8, (6, 4))
+    occupation = c.planifier_scenarios(profondeur, r, np.arange(25), v_region, v_foreuse, 0.5)
+    for s in range(6):
+        libres = [0.0] * 4
+        for w in range(25):
+            k = int(np.argmin(libres))
+            libres[k] += profondeur[w] / (v_region[s, r[w]] * v_foreuse[s, k]) + 0.5
+        np.testing.assert_allclose(occupation[s], libres)
+
+
+def test_sous_echantillon_de_planning():
+    res = c.simuler_campagne(campagne(), n_scenarios=5000, n_foreuses=3, graine=0)
+    assert len(res["couts"]) == 5000 and len(res["durees"]) == res["scenarios_planning"] == c.SCENARIOS_REPLANIFIES
+    affectees = c.simuler_campagne(campagne().assign(foreuse="A"), n_scenarios=5000, graine=0)
+    assert affectees["scenarios_planning"] == 5000
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import calcul_IV_1_1_essais_par_paliers as c
+
+
+def essais(n_puits=40, graine=1):
+    rng = np.random.default_rng(graine)
+    lignes = []
+    for k in range(n_puits):
+        n = rng.integers(4, 9)  # à 3 paliers, la pente varie partout pareil : Qc à égalité près
+        Q = np.sort(rng.uniform(2, 40, n)) + np.arange(n)
+        s = 0.1 * Q + rng.uniform(1e-3, 5e-3) * Q**2 + rng.normal(0, 0.02, n)
+        lignes.append(pd.DataFrame({"well_id": f"P{k:02d}", "Q": Q, "s": s, "t": np.arange(n),
+                                    "H": rng.uniform(5, 30), "nappe_type": rng.choice(["libre", "captive"])}))
+    return pd.concat(lignes, ignore_index=True)
+
+
+def test_lot_identique_aux_essais_isoles():
+    df = essais()
+    lot = c.interpreter_lot(df, non_lineaire=False).set_index("well_id")
+    for puits, essai in df.groupby("well_id"):
+        seul = c.interpreter_essai(essai["Q"].to_numpy(), essai["s"].to_numpy(), essai["H"].iloc[0],
+                                   essai["nappe_type"].iloc[0])
+        for cle in ["A", "B", "Qc", "s_Qc", "eta", "q_spec", "Qmax"]:
+            assert lot.loc[puits, cle] == pytest.approx(seul[cle], rel=1e-7, abs=1e-10), cle
+        assert lot.loc[puits, "type_puits"] == seul["type_puits"]
+
+
+def test_trop_peu_de_paliers():
+    df = pd.DataFrame({"well_id": ["a", "a"], "Q": [1.0, 2.0], "s": [0.1, 0.3], "t": [0, 1]})
+    with pytest.raises(ValueError, match="3 paliers"):
+        c.interpreter_lot(df)
+
+
+def test_rorabaugh_et_gosselin_exacts():
+    Q = np.array([5.0, 10.0, 15.0, 20.0, 30.0])
+    A, B, n = c.rorabaugh(Q, 0.2 * Q + 0.004 * Q**2.4)[:3]
+    assert (A, B, n) == pytest.approx((0.2, 0.004, 2.4), rel=1e-5)
+    B, n = c.gosselin(Q, 0.05 * Q**1.3)[:2]
+    assert (B, n) == pytest.approx((0.05, 1.3), rel=1e-6)
+
+
+def test_non_lineaire_lot_identique_aux_ajustements_isoles():
+    series = [(np.array([5.0, 10, 15, 20]), np.array([1.2, 2.6, 4.3, 6.1]) * f) for f in (1.0, 1.3, 0.8)]
+    lot = c.ajuster_non_lineaire_lot(series, n_workers=1, taille_bloc=2)
+    for (Q, s), ligne in zip(series, lot):
+        np.testing.assert_allclose(ligne[:3], c.rorabaugh(Q, s)[:3], rtol=1e-6)
+        np.testing.assert_allclose(ligne[3:], c.gosselin(Q, s)[:2], rtol=1e-6)
+
+
+def test_bootstrap_reproductible():
+    Q = np.array([5.0, 10, 15, 20, 25, 30])
+    s = 0.1 * Q + 0.003 * Q**2 + np.array([0.02, -0.01, 0.015, -0.02, 0.01, -0.005])
+    tableau, tirages = c.bootstrap_paliers(Q, s, 20.0, "libre", n_tirages=300, n_workers=1)
+    bis, _ = c.bootstrap_paliers(Q, s, 20.0, "libre", n_tirages=300, n_workers=1)
+    pd.testing.assert_frame_equal(tableau, bis)
+    bas, haut = tableau.columns[3], tableau.columns[4]
+    quadratique = tableau[tableau["Méthode"] == "Quadratique"].set_index("Paramètre")
+    assert quadratique.loc["A", bas] < quadratique.loc["A", "Estimation"] < quadratique.loc["A", haut]
+    assert len(tirages[("Rorabaugh", "n")]) == 300
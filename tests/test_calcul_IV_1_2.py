@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+from scipy.integrate import quad
+from scipy.special import exp1, k0
+
+import calcul_IV_1_2_essais_longue_duree as c
+from calcul_IV_1_2_essais_longue_duree import jacob
+
+
+def test_jacob_unites():
+    # Droite de Jacob exacte : Q en m³/h, t en h, T en m²/j
+    Q, T, S, r = 10.0, 50.0, 1e-4, 20.0
+    t = np.geomspace(5, 100, 20)
+    s = 2.3 * Q * 24 / (4 * np.pi * T) * np.log10(2.25 * T * (t / 24) / (r**2 * S))
+    T_j, S_j, _ = jacob(Q, t, s, r)
+    np.testing.assert_allclose([T_j, S_j], [T, S], rtol=1e-9)
+
+
+def hantush_quadrature(u, beta):
+    # ∫_u^∞ exp(-y - β²/4y) dy/y, en ln y
+    return quad(lambda x: np.exp(-np.exp(x) - beta**2 / (4 * np.exp(x))), np.log(u), np.log(u) + 60,
+                limit=500, epsabs=0, epsrel=1e-10)[0]
+
+
+def test_theis_W():
+    u = np.geomspace(1e-14, 200, 500)   # table et prolongements hors table
+    np.testing.assert_allclose(c.theis_W(u), exp1(u), rtol=1e-4)
+
+
+@pytest.mark.parametrize("beta", [1e-3, 0.1, 1.0, 3.0, 9.0])
+@pytest.mark.parametrize("u", [1e-8, 1e-2, 1.0, 5.0])
+def test_hantush_W(u, beta):
+    assert c.hantush_W(u, beta) == pytest.approx(hantush_quadrature(u, beta), rel=3e-3)
+
+
+@pytest.mark.filterwarnings("ignore::scipy.integrate.IntegrationWarning")   # table linéaire par morceaux
+@pytest.mark.parametrize("beta", [0.05, 0.5, 2.0])
+@pytest.mark.parametrize("p", [0.1, 1.0, 10.0])
+def test_boulton_courbe_B(beta, p):
+    # Transformée de Laplace de la table (en τ = 1/4u) comparée à W̄(p)
+    table = c.tables_puits()["boulton_b"]
+    tau_min = 1 / (4 * np.exp(c.LN_U_MAX))
+    palier = 2 * k0(beta) * (1 - np.exp(-p * tau_min)) / p
+    queue = quad(lambda x: np.exp(x - p * np.exp(x)) * c._interpoler_2d(table, np.exp(-x) / 4, beta),
+                 np.log(tau_min), np.log(60 / p), limit=1000)[0]
+    assert palier + queue == pytest.approx(2 / p * k0(np.sqrt(beta**2 * p / (p + beta**2))), rel=1e-3)
+
+
+def test_boulton_raccorde_theis_et_hantush():
+    beta, u = 0.3, np.geomspace(1e-6, 10, 50)
+    # Temps courts (courbe A) : Hantush ; temps longs (courbe B) : Theis en u_B
+    np.testing.assert_allclose(c.boulton_W(u, 1e6, beta), c.hantush_W(u, beta), atol=1e-3)
+    np.testing.assert_allclose(c.boulton_W(1e-12, u[:10], beta), c.theis_W(u[:10]), rtol=5e-3)
+
+
+@pytest.mark.parametrize("nom, params", [
+    ("Hantush–Jacob (drainance)", {"T": 80.0, "S": 2e-4, "r/B": 0.2}),
+    ("Boulton (débit retardé)", {"T": 150.0, "S": 1e-3, "Sy": 0.08, "r/B": 0.3}),
+])
+def test_ajuster_modele(nom, params):
+    t = np.geomspace(0.01, 200, 80)
+    s = c.rabattement_transitoire(nom, 20.0, t, 30.0, params)
+    ajuste = c.ajuster_modele(nom, 20.0, t, s, 30.0)
+    assert {k: ajuste[k] for k in params} == pytest.approx(params, rel=1e-2)
+    assert ajuste["rmse"] < 1e-3
+
+
+def test_ajuster_theis():
+    t = np.geomspace(0.05, 48, 60)
+    s = c.theis(12.0, t, 25.0, 60.0, 3e-4)
+    T, S, rmse = c.ajuster_theis(12.0, t, s, 25.0)
+    assert (T, S) == pytest.approx((60.0, 3e-4), rel=1e-4) and rmse < 1e-6
+
+
+def test_derivee_bourdet_regime_radial():
+    # Aux temps longs de Theis, ds/d ln t = Q/(4πT)
+    t = np.geomspace(10, 1000, 2000)
+    _, _, ds = c.derivee_bourdet(t, c.theis(10.0, t, 1.0, 100.0, 1e-4), L=0.2)
+    np.testing.assert_allclose(ds[100:-100], 10.0 * 24 / (4 * np.pi * 100.0), rtol=1e-3)
+
+
+def test_decimer_log_memmap(tmp_path):
+    t = np.geomspace(1e-3, 1e3, 100_001)
+    s = np.log(t)
+    chemin = tmp_path / "s.f8"
+    np.column_stack([t, s]).tofile(chemin)
+    donnees = np.memmap(chemin, dtype=np.float64, mode="r", shape=(len(t), 2))
+    t_d, s_d = c.decimer_log(donnees[:, 0], donnees[:, 1], n_classes=60, taille_bloc=7_000)
+    assert len(t_d) == 60
+    np.testing.assert_allclose(s_d, np.log(t_d), atol=1e-3)
+
+
+def test_bootstrap_essai():
+    t = np.geomspace(0.05, 48, 80)
+    bruit = 0.01 * np.sin(np.arange(80))
+    s = c.theis(12.0, t, 25.0, 60.0, 3e-4) + bruit
+    tableau, tirages = c.bootstrap_essai("Nappe captive", 12.0, t, s, 25.0, n_tirages=200, n_workers=1)
+    theis = tableau[(tableau["Méthode"] == "Theis (pompage)") & (tableau["Paramètre"] == "T")].iloc[0]
+    assert theis.iloc[3] < theis["Estimation"] < theis.iloc[4]
+    assert theis["Tirages valides"] == 200
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+import calcul_IV_2_regime_permanent as c
+
+PUITS = np.array([[0.0, 0.0], [80.0, 30.0], [-40.0, 60.0]])
+POINTS = np.array([[10.0, 5.0], [50.0, -20.0], [200.0, 150.0], [-30.0, 40.0]])
+
+
+@pytest.mark.parametrize("modele, options", [("Thiem", {"R": 150.0}), ("De Glee", {"L": 300.0})])
+def test_superposition(modele, options):
+    Q = np.array([1200.0, 800.0, 500.0])
+    s = c.rabattement_points(POINTS, PUITS, Q, 400.0, modele=modele, **options)
+    r = np.hypot(*(POINTS[:, None, :] - PUITS[None, :, :]).transpose(2, 0, 1))
+    if modele == "Thiem":
+        attendu = np.where(r < options["R"], c.thiem(Q, 400.0, r, options["R"]), 0.0).sum(axis=1)
+    else:
+        attendu = c.de_glee(Q, 400.0, r, options["L"]).sum(axis=1)
+    np.testing.assert_allclose(s, attendu, rtol=1e-12)
+
+
+@pytest.mark.parametrize("nature, facteur", [("Imperméable", 2.0), ("Alimentation", 0.0)])
+def test_frontiere_rectiligne(nature, facteur):
+    # Sur la frontière, le puits image est à la même distance que le puits réel
+    frontiere = (100.0, 0.0, 0.0, nature)
+    bord = np.array([[100.0, -50.0], [100.0, 20.0], [100.0, 90.0]])
+    seul = c.rabattement_points(bord, [0.0, 0.0], 1000.0, 300.0, modele="De Glee", L=500.0)
+    avec = c.rabattement_points(bord, [0.0, 0.0], 1000.0, 300.0, modele="De Glee", L=500.0,
+                                frontiere=frontiere)
+    np.testing.assert_allclose(avec, facteur * seul, atol=1e-12)
+
+
+def test_grille_rabattement():
+    x, y, s = c.grille_rabattement(PUITS, [1000.0, 500.0, 200.0], 400.0, (-100, 100, -50, 50), n=(7, 5),
+                                   R=250.0)
+    assert s.shape == (5, 7)
+    np.testing.assert_allclose(s[2, 3], c.rabattement_points([x[3], y[2]], PUITS, [1000.0, 500.0, 200.0],
+                                                             400.0, R=250.0)[0])
+
+
+def test_monte_carlo_lois_fixes():
+    lois = {"Q": ("Fixe", 1200.0, 0), "T": ("Fixe", 300.0, 0), "r1": ("Fixe", 0.2, 0), "R": ("Fixe", 250.0, 0)}
+    res = c.monte_carlo_contexte("Nappe captive sans réalimentation", lois, n=1000, graine=0, n_workers=1)
+    s = c.thiem(1200.0, 300.0, 0.2, 250.0)
+    np.testing.assert_allclose(res["percentiles"]["s (m)"], s)
+    assert res["n_valides"] == 1000 and not any(res["sobol"].values())
+
+
+def test_monte_carlo_sobol():
+    lois = {"Q": ("Uniforme", 500.0, 1500.0), "T": ("Fixe", 300.0, 0), "r1": ("Fixe", 0.2, 0),
+            "R": ("Fixe", 250.0, 0)}
+    res = c.monte_carlo_contexte("Nappe captive sans réalimentation", lois, n=20_000, graine=0, n_workers=1)
+    # s linéaire en Q, seul paramètre aléatoire
+    assert res["sobol"]["Q"] == pytest.approx(1.0, abs=0.01)
+
+
+@pytest.mark.parametrize("frontiere", [None, (150.0, 0.0, 0.0, "Imperméable")])
+def test_matrice_influence(frontiere):
+    # Q en m³/h dans la matrice, en m³/j dans rabattement_points
+    Q = np.array([30.0, 50.0, 20.0])
+    A = c.matrice_influence(POINTS, PUITS, 400.0, R=250.0, frontiere=frontiere)
+    s = c.rabattement_points(POINTS, PUITS, 24 * Q, 400.0, R=250.0, frontiere=frontiere)
+    np.testing.assert_allclose(A @ Q, s, rtol=1e-12)
+
+
+def test_optimiser_debits_symetrique():
+    A = np.array([[0.10, 0.02], [0.02, 0.10]])
+    res = c.optimiser_debits(A, [3.0, 3.0])
+    np.testing.assert_allclose(res["Q"], [25.0, 25.0])
+    np.testing.assert_allclose(res["s"], 3.0)
+    # Un mètre de s_max en plus sur chaque puits : Σ gains = 2 / (0.10 + 0.02)
+    assert res["gain_s_max"].sum() == pytest.approx(2 / 0.12)
+
+
+def test_optimiser_debits_cible_au_moindre_cout():
+    A = np.array([[0.10, 0.02], [0.02, 0.10]])
+    res = c.optimiser_debits(A, [3.0, 3.0], q_max=[40.0, 40.0], cout=[1.0, 2.0], cible=30.0)
+    np.testing.assert_allclose(res["Q"], [30.0, 0.0])
+    assert res["objectif"] == pytest.approx(30.0)
@@ -0,0 +1,75 @@
+import io
+import os
+
+import numpy as np
+import pytest
+
+import enregistreurs
+from enregistreurs import charger_enregistreur, empreinte, empreinte_fichier, purger
+
+
+@pytest.fixture(autouse=True)
+def repertoire(tmp_path, monkeypatch):
+    monkeypatch.setattr(enregistreurs, "REPERTOIRE_TRAVAIL", str(tmp_path))
+    return tmp_path
+
+
+def csv(n, decalage=0.0):
+    lignes = "".join(f"{60 * k}\t{k + decalage}\t{2 * k}\n" for k in range(n))
+    return ("temps\tp1\tp2\n" + lignes).encode()
+
+
+def test_lecture_par_blocs():
+    contenu = csv(1001)
+    fichier = io.BytesIO(contenu)
+    noms, donnees = charger_enregistreur(fichier, "s", taille_bloc=100)
+    assert noms == ["t (h)", "p1", "p2"] and donnees.shape == (1001, 3)
+    np.testing.assert_allclose(donnees[-1], [1000 / 60, 1000, 2000])
+    # Le fichier téléversé reste utilisable, la clé ne dépend que du contenu
+    assert not fichier.closed and fichier.tell() == 0
+    assert empreinte_fichier(fichier, taille_morceau=7) == empreinte(contenu)
+
+
+def test_chemin_et_octets(repertoire):
+    chemin = repertoire / "essai.tsv"
+    chemin.write_bytes(csv(10))
+    _, a = charger_enregistreur(str(chemin), "min")
+    _, b = charger_enregistreur(csv(10), "min")
+    np.testing.assert_array_equal(a, b)
+
+
+@pytest.mark.parametrize("contenu", [b"", b"  \n\n"])
+def test_fichier_vide(contenu):
+    with pytest.raises(ValueError, match="vide"):
+        charger_enregistreur(io.BytesIO(contenu))
+
+
+def test_purge(repertoire):
+    for k in range(3):
+        charger_enregistreur(csv(50, decalage=k))
+    conversions = sorted(repertoire.glob("*.json"), key=os.path.getmtime)
+    os.utime(conversions[0], (0, 0))
+    purger()
+    assert not conversions[0].exists() and conversions[1].exists()
+    purger(taille_max=0, garder={conversions[2].stem})
+    assert [c.exists() for c in conversions] == [False, False, True]
+    assert len(list(repertoire.glob("*.f8"))) == 1
+
+
+@pytest.mark.parametrize("contenu", [b"temps;niveau\n1;2,5\n2;2,7\n3;2,9\n", b"1;2,5\n2;2,7\n3;2,9\n",
+                                     b"temps\tniveau\n1\t2,5\n2\t2,7\n3\t2,9\n", b"1 2,5\n2 2,7\n3 2,9\n"])
+def test_virgule_decimale(contenu):
+    _, donnees = charger_enregistreur(contenu, "h")
+    np.testing.assert_allclose(donnees, [[1, 2.5], [2, 2.7], [3, 2.9]])
+
+
+def test_valeur_illisible_gardee_en_nan():
+    noms, donnees = charger_enregistreur(b"t;p1;p2\n1;2,5;x\n2;;3\nx;4;4\n", "h")
+    assert noms == ["t (h)", "p1", "p2"]
+    np.testing.assert_allclose(donnees, [[1, 2.5, np.nan], [2, np.nan, 3]])
+
+
+def test_aucune_mesure_lisible_pas_en_cache(repertoire):
+    with pytest.raises(ValueError, match="Aucune mesure lisible"):
+        charger_enregistreur(b"t;p\n1;x\n2;y\n")
+    assert not list(repertoire.iterdir())
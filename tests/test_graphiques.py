@@ -0,0 +1,38 @@
+import numpy as np
+
+import graphiques
+
+
+def test_lttb_garde_les_extremites_et_les_pics():
+    x = np.linspace(0, 10, 10_000)
+    y = np.sin(x)
+    y[4321] = 5.0
+    xs, ys = graphiques.lttb(x, y, 200)
+    assert len(xs) == 200 and (xs[0], xs[-1]) == (x[0], x[-1])
+    assert (np.diff(xs) > 0).all() and ys.max() == 5.0
+
+
+def test_decimer_sans_effet_sous_le_seuil():
+    x = np.arange(50.0)
+    assert graphiques.decimer(x, x, n_max=100)[0] is x
+
+
+def construire(x, titre=""):
+    construire.appels += 1
+    fig, ax = graphiques.nouvelle_figure(figsize=(2, 2))
+    ax.plot(x)
+    ax.set_title(titre)
+    return fig
+
+
+def test_rendre_png_en_cache():
+    graphiques.vider_cache()
+    construire.appels = 0
+    x = np.arange(5.0)
+    png = graphiques.rendre_png(construire, x, titre="a")
+    assert png.startswith(b"\x89PNG")
+    assert graphiques.rendre_png(construire, x.copy(), titre="a") is png
+    assert construire.appels == 1
+    graphiques.rendre_png(construire, x, titre="b")
+    graphiques.rendre_png(construire, x + 1, titre="a")
+    assert construire.appels == 3
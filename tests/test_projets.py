@@ -0,0 +1,48 @@
+import threading
+
+import numpy as np
+import pytest
+
+from projets import Graphe, Magasin, MemoireLocale
+
+
+def test_puits_ouvert_par_deux_sessions(tmp_path):
+    chemin = str(tmp_path / "projets.sqlite")
+    Magasin(chemin)
+    ids, depart = [], threading.Barrier(8)
+
+    def ouvrir():
+        magasin = Magasin(chemin)
+        depart.wait()
+        ids.append(magasin.puits("F1", "Campagne A"))
+
+    fils = [threading.Thread(target=ouvrir) for _ in range(8)]
+    for f in fils:
+        f.start()
+    for f in fils:
+        f.join()
+    assert len(ids) == 8 and len(set(ids)) == 1
+    assert len(Magasin(chemin).liste_puits()) == 1
+
+
+def test_series_en_blobs():
+    magasin = Magasin(":memory:")
+    puits = magasin.puits("F2")
+    Q = np.linspace(1, 10, 1000)
+    magasin.ecrire_series(puits, "IV.1.1", {"Q": Q})
+    np.testing.assert_array_equal(magasin.lire_series(puits, "IV.1.1")["Q"], Q)
+
+
+def carre(x):
+    return x**2
+
+
+def test_graphe_declaration_idempotente():
+    graphe = Graphe()
+    graphe.noeud("y", "x")(carre)
+    graphe.noeud("y", "x")(carre)
+    with pytest.raises(ValueError, match="déjà déclaré"):
+        graphe.noeud("y", "x", version=2)(carre)
+    memoire = MemoireLocale()
+    assert graphe.evaluer(["y"], {"x": 3}, memoire) == ({"y": 9}, ["y"])
+    assert graphe.evaluer(["y"], {"x": 3}, memoire) == ({"y": 9}, [])
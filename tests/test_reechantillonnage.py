@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+from scipy.optimize import least_squares
+
+import reechantillonnage as rb
+
+
+def test_indices_par_blocs_consecutifs():
+    idx = rb.indices(20, n_tirages=50, methode="Blocs", taille_bloc=4, graine=2)
+    assert idx.shape == (50, 20)
+    # Chaque bloc de 4 est une suite circulaire consécutive
+    blocs = idx.reshape(50, 5, 4)
+    assert (np.diff(blocs, axis=2) % 20 == 1).all()
+
+
+def test_indices_reproductibles():
+    np.testing.assert_array_equal(rb.indices(30, 10, graine=5), rb.indices(30, 10, graine=5))
+
+
+def test_levenberg_marquardt_lot_identique_a_scipy():
+    t = np.linspace(0.1, 5, 40)
+    rng = np.random.default_rng(0)
+    Y = 3.0 * np.exp(-0.7 * t) + rng.normal(0, 0.05, (25, len(t)))
+
+    def residus(P, lignes):
+        return P[:, :1] * np.exp(-P[:, 1:] * t) - Y[lignes]
+
+    def jacobien(P, lignes):
+        e = np.exp(-P[:, 1:] * t)
+        return np.stack([e, -P[:, :1] * t * e], axis=2)
+
+    P = rb.levenberg_marquardt_lot(residus, jacobien, np.tile([1.0, 0.2], (25, 1)), [0, 0], [10, 10])
+    for y, p in zip(Y, P):
+        attendu = least_squares(lambda q: q[0] * np.exp(-q[1] * t) - y, [1.0, 0.2], bounds=([0, 0], [10, 10])).x
+        np.testing.assert_allclose(p, attendu, rtol=1e-5)
+
+
+def test_levenberg_marquardt_borne_active():
+    t = np.linspace(0, 1, 10)
+    y = 2.0 * t
+
+    def residus(P, lignes):
+        return P[:, :1] * t - y
+
+    P = rb.levenberg_marquardt_lot(residus, lambda P, lignes: np.broadcast_to(t[None, :, None], (len(lignes), 10, 1)),
+                                   [[0.5]], [0.0], [1.5])
+    assert P[0, 0] == pytest.approx(1.5)
+
+
+def test_jacobien_differences():
+    t = np.linspace(0, 2, 5)
+    P = np.array([[1.5, 0.3], [2.0, 0.8]])
+
+    def residus(P, lignes):
+        return P[:, :1] * np.exp(-P[:, 1:] * t)
+
+    e = np.exp(-P[:, 1:] * t)
+    np.testing.assert_allclose(rb.jacobien_differences(residus, P, np.arange(2)),
+                               np.stack([e, -P[:, :1] * t * e], axis=2), rtol=1e-4, atol=1e-6)
+
+
+def test_intervalles_ignorent_les_echecs():
+    tirages = {("M", "a"): np.r_[np.arange(1.0, 101.0), np.nan]}
+    tableau = rb.intervalles({("M", "a"): 50.0}, tirages, niveau=0.9)
+    ligne = tableau.iloc[0]
+    assert ligne["Tirages valides"] == 100
+    assert ligne["Borne basse (90 %)"] == pytest.approx(np.percentile(np.arange(1.0, 101.0), 5))
+    assert ligne["Borne haute (90 %)"] == pytest.approx(np.percentile(np.arange(1.0, 101.0), 95))
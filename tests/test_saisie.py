@@ -0,0 +1,17 @@
+import numpy as np
+import pytest
+
+from saisie import ErreurSaisie, lire_serie
+
+
+def test_unites_detachees():
+    np.testing.assert_allclose(lire_serie("12 m 5 cm 3", "m"), [12.0, 0.05, 3.0])
+    np.testing.assert_allclose(lire_serie("5 min\t2 h", "s"), [300.0, 7200.0])
+    np.testing.assert_allclose(lire_serie("20 m³/h 3 l/s", "m3/h"), [20.0, 10.8])
+
+
+@pytest.mark.parametrize("texte, indices", [("1 2 abc 4", [2]), ("1 2 mx 3 y", [2, 4])])
+def test_numero_des_valeurs_illisibles(texte, indices):
+    with pytest.raises(ErreurSaisie, match=f"n° {indices[0] + 1}") as erreur:
+        lire_serie(texte, "m")
+    np.testing.assert_array_equal(erreur.value.indices, indices)
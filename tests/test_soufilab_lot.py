@@ -0,0 +1,42 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+import calcul_IV_1_2_essais_longue_duree as c_IV_1_2
+import soufilab_lot
+from graphiques import POINTS_MAX
+
+
+def test_lot_paliers_avec_fichier_en_erreur(tmp_path, capsys):
+    entrees = tmp_path / "paliers"
+    entrees.mkdir()
+    for k, f in enumerate([1.0, 1.4]):
+        Q = pd.Series([5.0, 10, 15, 20])
+        pd.DataFrame({"Q": Q, "s": f * (0.1 * Q + 0.004 * Q**2), "t": range(4)}).to_csv(
+            entrees / f"P{k}.csv", index=False)
+    (entrees / "casse.csv").write_text("Q;s\n1;2\n")
+    sortie = tmp_path / "resultats"
+    code = soufilab_lot.main(["IV.1.1", str(entrees), "-o", str(sortie), "-j", "1", "-q"])
+    assert code == 1
+    resultats = pd.read_csv(sortie / "IV.1.1.csv")
+    assert sorted(resultats["well_id"]) == ["P0", "P1"]
+    erreurs = pd.read_csv(sortie / "IV.1.1_erreurs.csv")
+    assert list(erreurs["fichier"].map(lambda c: c.rsplit("/", 1)[-1])) == ["casse.csv"]
+    assert "2 fichier(s) traité(s)" in capsys.readouterr().out
+
+
+def test_courbes_IV_1_2_decimees_et_finies():
+    t = np.geomspace(0.01, 48, 20_000)
+    tr = np.geomspace(0.01, 24, 5000)
+    table = pd.DataFrame({"t": t, "s": c_IV_1_2.theis(100.0, t, 20.0, 150.0, 1e-4)})
+    # Remontée par superposition : résiduel s(t_arret + t') - s(t')
+    residuel = c_IV_1_2.theis(100.0, 48 + tr, 20.0, 150.0, 1e-4) - c_IV_1_2.theis(100.0, tr, 20.0, 150.0, 1e-4)
+    remontee = pd.DataFrame({"t_remontee": tr, "s_remontee": residuel})
+    table = pd.concat([table, remontee], axis=1)
+    options = SimpleNamespace(Q=100.0, r=20.0, aquifere="Nappe captive", rapport_max=None, L=0.2)
+    resultats, (_, _, courbes) = soufilab_lot._ajuster_IV_1_2(table, options)
+    assert "Theis (remontée)" in set(resultats["methode"])
+    assert "Theis (remontée)" not in {nom for nom, _, _ in courbes}
+    for nom, t_modele, s_modele in courbes:
+        assert len(t_modele) == len(s_modele) <= POINTS_MAX and np.isfinite(s_modele).any(), nom
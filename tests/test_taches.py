@@ -0,0 +1,23 @@
+import instrumentation
+import taches
+
+
+def doubler(x):
+    return 2 * x
+
+
+def test_trace_de_la_tache(monkeypatch):
+    ecrites = []
+    monkeypatch.setattr(instrumentation, "ecrire_trace", ecrites.append)
+    with instrumentation.rerun("IV.1.1", "session"):
+        tache = taches.Executeur().soumettre("session", "essai", doubler, 21)
+    assert tache.attendre(10) and tache.resultat == 42
+    tache_trace = [t for t in ecrites if t.section == "IV.1.1 (tâche)"]
+    assert len(tache_trace) == 1 and tache_trace[0].session == "session"
+    assert tache_trace[0].phases["fit"]["n"] == 1
+
+
+def test_executer_blocs_pool_dans_l_ordre(monkeypatch):
+    monkeypatch.setattr(taches, "PROCESSUS", 2)
+    assert taches.executer_blocs(doubler, list(range(7))) == [2 * k for k in range(7)]
+    assert taches.executer_blocs(doubler, list(range(7)), n_workers=1) == [2 * k for k in range(7)]